@@ -0,0 +1,21 @@
+import pytest
+from posts import urls as posts_urls
+from posts.tests.test_query_budget import WRITE_ROUTES
+
+from core.testing import namespace_urls
+
+
+class TestQueryBudget:
+
+    @pytest.mark.django_db
+    def test_posts_urls_query_ceiling(self, query_ceiling, user_client,
+                                      post_with_group):
+        urls = namespace_urls(
+            posts_urls,
+            post_id=post_with_group.id,
+            username=post_with_group.author.username,
+            slug=post_with_group.group.slug,
+        )
+        for view_name in WRITE_ROUTES:
+            urls.pop(view_name)
+        query_ceiling(user_client, urls)
@@ -0,0 +1,44 @@
+from concurrent.futures import ThreadPoolExecutor
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections
+
+_executor = None
+
+
+def executor():
+    """Пул потоков для ORM; у каждого потока свое соединение с базой"""
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=settings.ASYNC_DB_THREADS, thread_name_prefix='db')
+    return _executor
+
+
+def with_connection_cleanup(func):
+    """Закрывает устаревшие соединения потока, как это делает запрос"""
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        close_old_connections()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            close_old_connections()
+    return wrapper
+
+
+def db_call(func, *args, **kwargs):
+    """Корутина, выполняющая синхронный func с ORM вне цикла событий.
+
+    При ASYNC_PARALLEL_QUERIES вызов уходит в пул из ASYNC_DB_THREADS
+    потоков, поэтому независимые запросы одного view идут одновременно
+    в разных соединениях. Без нее вызовы идут по очереди в общем потоке
+    Django: так их видит транзакция TestCase.
+    """
+    if settings.ASYNC_PARALLEL_QUERIES:
+        return sync_to_async(
+            with_connection_cleanup(func), thread_sensitive=False,
+            executor=executor())(*args, **kwargs)
+    return sync_to_async(func)(*args, **kwargs)
@@ -0,0 +1,10 @@
+from django.conf import settings
+
+
+def set_sqlite_pragmas(sender, connection, **kwargs):
+    """Выставляет SQLITE_PRAGMAS новому соединению SQLite"""
+    if connection.vendor != 'sqlite':
+        return
+    # сырое соединение: настройка не считается запросами view
+    for name, value in settings.SQLITE_PRAGMAS.items():
+        connection.connection.execute(f'PRAGMA {name} = {value}')
@@ -0,0 +1,137 @@
+import asyncio
+import logging
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+from .routers import replicas, stop_tracking_writes, track_writes
+
+logger = logging.getLogger(__name__)
+
+
+class SyncAndAsyncMiddleware:
+    """Основа middleware, которое работает и под WSGI, и под ASGI.
+
+    Под ASGI Django вызывает синхронное middleware в единственном
+    общем потоке, и тот ждет ответа view; так все запросы шли бы
+    по одному. Наследники задают __call__ и async_call.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = asyncio.iscoroutinefunction(get_response)
+        if self.is_async:
+            # как MiddlewareMixin в Django 4.0: так экземпляр
+            # распознается asyncio.iscoroutinefunction
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+
+
+def query_budget(view_name):
+    """Допустимое число SQL-запросов для view из QUERY_BUDGETS"""
+    return settings.QUERY_BUDGETS.get(
+        view_name, settings.QUERY_BUDGET_DEFAULT)
+
+
+class QueryCounter:
+    """Обертка execute, считающая число и время SQL-запросов"""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - start
+            self.count += 1
+
+
+class QueryBudgetMiddleware(SyncAndAsyncMiddleware):
+    """Считает SQL-запросы запроса и сообщает о превышении бюджета.
+
+    Результат отдается в заголовке Server-Timing, а запросы сверх
+    бюджета view пишутся в лог. Включается настройкой
+    QUERY_BUDGET_ENABLED. Async-view ходят в базу из пула потоков,
+    чужие соединения не обернуть, поэтому для них отдается только
+    общее время.
+    """
+
+    def __init__(self, get_response):
+        if not settings.QUERY_BUDGET_ENABLED:
+            raise MiddlewareNotUsed
+        super().__init__(get_response)
+
+    async def async_call(self, request):
+        start = time.perf_counter()
+        response = await self.get_response(request)
+        response['Server-Timing'] = (
+            f'total;dur={(time.perf_counter() - start) * 1000:.1f}')
+        return response
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.async_call(request)
+        counter = QueryCounter()
+        start = time.perf_counter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(counter))
+            response = self.get_response(request)
+        total = time.perf_counter() - start
+
+        response['Server-Timing'] = (
+            f'db;dur={counter.duration * 1000:.1f};'
+            f'desc="{counter.count} queries", '
+            f'total;dur={total * 1000:.1f}'
+        )
+        match = request.resolver_match
+        view_name = match.view_name if match else request.path
+        budget = query_budget(view_name)
+        if counter.count > budget:
+            logger.warning(
+                'Запрос %s %s (%s) выполнил %d SQL-запросов при бюджете %d',
+                request.method, request.path, view_name,
+                counter.count, budget,
+            )
+        return response
+
+
+class PrimaryStickinessMiddleware(SyncAndAsyncMiddleware):
+    """После записи ставит куку, по которой чтения идут в основную базу.
+
+    Так пользователь сразу видит свои посты, нравлики и комментарии,
+    даже если реплика еще не догнала основную базу.
+    """
+
+    async def async_call(self, request):
+        token = track_writes()
+        try:
+            response = await self.get_response(request)
+        finally:
+            wrote = stop_tracking_writes(token)
+        return self.stick_to_primary(response, wrote)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.async_call(request)
+        token = track_writes()
+        try:
+            response = self.get_response(request)
+        finally:
+            wrote = stop_tracking_writes(token)
+        return self.stick_to_primary(response, wrote)
+
+    def stick_to_primary(self, response, wrote):
+        if wrote and replicas():
+            response.set_cookie(
+                settings.REPLICA_STICKY_COOKIE, '1',
+                max_age=settings.REPLICA_STICKY_SECONDS,
+                httponly=True, samesite='Lax')
+        return response
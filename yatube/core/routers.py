@@ -0,0 +1,102 @@
+import asyncio
+import random
+from contextvars import ContextVar
+from functools import wraps
+
+from django.conf import settings
+
+from .asyncdb import db_call
+
+PRIMARY = 'default'
+# приложения, которые всегда читаются из основной базы
+PRIMARY_APPS = {'sessions', 'jobs'}
+
+# чтение идет на реплику только внутри view с @read_from_replica
+_replica_reads = ContextVar('replica_reads', default=False)
+# была ли за запрос запись в основную базу
+_wrote_to_primary = ContextVar('wrote_to_primary', default=False)
+
+
+def replicas():
+    return settings.DATABASE_REPLICAS
+
+
+def is_sticky(request):
+    """Пользователь недавно писал и должен видеть свои изменения"""
+    return settings.REPLICA_STICKY_COOKIE in request.COOKIES
+
+
+def read_from_replica(view):
+    """Отправляет чтения view на случайную реплику.
+
+    Пользователь загружается из основной базы до переключения,
+    а после недавней записи view целиком читает основную базу.
+    """
+    if asyncio.iscoroutinefunction(view):
+        @wraps(view)
+        async def async_wrapper(request, *args, **kwargs):
+            if not replicas() or is_sticky(request):
+                return await view(request, *args, **kwargs)
+            await db_call(lambda: request.user.is_authenticated)
+            token = _replica_reads.set(True)
+            try:
+                return await view(request, *args, **kwargs)
+            finally:
+                _replica_reads.reset(token)
+        return async_wrapper
+
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if not replicas() or is_sticky(request):
+            return view(request, *args, **kwargs)
+        # сессия и пользователь читаются из основной базы
+        request.user.is_authenticated
+        token = _replica_reads.set(True)
+        try:
+            return view(request, *args, **kwargs)
+        finally:
+            _replica_reads.reset(token)
+    return wrapper
+
+
+def track_writes():
+    """Начинает учет записей в основную базу, возвращает токен сброса"""
+    return _wrote_to_primary.set(False)
+
+
+def stop_tracking_writes(token):
+    """Заканчивает учет, возвращает, была ли запись"""
+    wrote = _wrote_to_primary.get()
+    _wrote_to_primary.reset(token)
+    return wrote
+
+
+class ReplicaRouter:
+    """Маршрутизатор основной базы и реплик.
+
+    Чтения view с @read_from_replica уходят на случайную реплику,
+    все остальное — в основную базу.
+    """
+
+    def db_for_read(self, model, **hints):
+        if (_replica_reads.get()
+                and model._meta.app_label not in PRIMARY_APPS):
+            aliases = replicas()
+            if aliases:
+                return random.choice(aliases)
+        return PRIMARY
+
+    def db_for_write(self, model, **hints):
+        _wrote_to_primary.set(True)
+        return PRIMARY
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # реплика — копия основной базы, объекты из них можно связывать
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db == PRIMARY:
+            return True
+        # у реплик PostgreSQL схема приходит репликацией, а файлу SQLite
+        # ее создает migrate
+        return settings.DATABASES[db]['ENGINE'].endswith('sqlite3')
@@ -0,0 +1,84 @@
+"""Запуск тестов и проверка бюджета SQL-запросов."""
+import pytest
+from django.db import connection, connections
+from django.test import override_settings
+from django.test.runner import DiscoverRunner
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from .middleware import query_budget
+
+
+# реплика для теста маршрутизации: отдельная база SQLite в памяти
+TEST_REPLICA = 'replica_test'
+
+
+class TestRunner(DiscoverRunner):
+    """Тесты получают свой кэш в памяти, а не Redis из REDIS_URL.
+
+    Реплики из окружения выключаются: их тестовые базы пусты, и ленты
+    ничего бы не нашли. Вместо них объявляется TEST_REPLICA; раннер
+    создает ее базу, только если она есть в databases какого-то теста.
+    """
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        connections.settings.setdefault(TEST_REPLICA, {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': ':memory:',
+        })
+        connections.configure_settings(connections.settings)
+        self.cache_settings = override_settings(CACHES={'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'tests',
+        }}, DATABASE_REPLICAS=[])
+        self.cache_settings.enable()
+
+    def teardown_test_environment(self, **kwargs):
+        self.cache_settings.disable()
+        super().teardown_test_environment(**kwargs)
+
+
+def namespace_urls(urlconf, **url_kwargs):
+    """Адреса всех маршрутов urlconf, аргументы берутся из url_kwargs"""
+    urls = {}
+    for pattern in urlconf.urlpatterns:
+        view_name = f'{urlconf.app_name}:{pattern.name}'
+        kwargs = {name: url_kwargs[name]
+                  for name in pattern.pattern.converters}
+        urls[view_name] = reverse(view_name, kwargs=kwargs)
+    return urls
+
+
+def count_queries(client, url):
+    """Число SQL-запросов, выполненных при GET-запросе к url"""
+    with CaptureQueriesContext(connection) as queries:
+        client.get(url)
+    return len(queries)
+
+
+def query_counts(client, urls):
+    return {view_name: count_queries(client, url)
+            for view_name, url in urls.items()}
+
+
+def over_budget(counts):
+    """Маршруты, превысившие бюджет, вида {view_name: (запросов, бюджет)}"""
+    return {
+        view_name: (count, query_budget(view_name))
+        for view_name, count in counts.items()
+        if count > query_budget(view_name)
+    }
+
+
+def assert_query_ceiling(client, urls):
+    """Проверяет бюджет запросов для каждого адреса и возвращает счетчики"""
+    counts = query_counts(client, urls)
+    failures = over_budget(counts)
+    assert not failures, f'Превышен бюджет SQL-запросов: {failures}'
+    return counts
+
+
+@pytest.fixture
+def query_ceiling():
+    """Фикстура для проверки бюджета запросов: query_ceiling(client, urls)"""
+    return assert_query_ceiling
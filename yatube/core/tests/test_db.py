@@ -0,0 +1,105 @@
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.contrib.sessions.models import Session
+from django.db import connection
+from django.http import HttpResponse
+from django.test import (RequestFactory, SimpleTestCase, TestCase,
+                         override_settings)
+from posts.models import Post
+
+from ..middleware import PrimaryStickinessMiddleware
+from ..routers import PRIMARY, ReplicaRouter, read_from_replica
+
+REPLICA = 'replica_1'
+REPLICAS = {
+    REPLICA: {'ENGINE': 'django.db.backends.sqlite3'},
+    'pg_replica': {'ENGINE': 'django.db.backends.postgresql'},
+}
+
+
+class SqlitePragmasTest(TestCase):
+    """Тестирование PRAGMA новых соединений SQLite"""
+
+    def test_busy_timeout_is_set(self):
+        """Соединение ждет блокировку, а не падает сразу"""
+        if connection.vendor != 'sqlite':
+            self.skipTest('PRAGMA есть только в SQLite')
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA busy_timeout')
+            self.assertEqual(cursor.fetchone()[0], 5000)
+
+
+class ReplicaRouterTest(SimpleTestCase):
+    """Тестирование маршрутизации чтения на реплики"""
+
+    def setUp(self):
+        self.router = ReplicaRouter()
+
+    def read_db(self, model=Post):
+        return self.router.db_for_read(model)
+
+    def test_reads_go_to_primary_outside_replica_views(self):
+        """Без @read_from_replica чтение идет в основную базу"""
+        with override_settings(DATABASE_REPLICAS=[REPLICA]):
+            self.assertEqual(self.read_db(), PRIMARY)
+
+    def test_replica_view_reads_from_replica(self):
+        """Во view с @read_from_replica чтение идет на реплику"""
+        reads = []
+
+        @read_from_replica
+        def view(request):
+            reads.append(self.read_db())
+            reads.append(self.read_db(Session))
+            return HttpResponse()
+
+        with override_settings(DATABASE_REPLICAS=[REPLICA]):
+            view(self.request())
+            view(self.request(sticky=True))
+        self.assertEqual(reads, [REPLICA, PRIMARY, PRIMARY, PRIMARY])
+
+    def test_without_replicas_reads_go_to_primary(self):
+        """Без настроенных реплик декоратор ничего не меняет"""
+        reads = []
+
+        @read_from_replica
+        def view(request):
+            reads.append(self.read_db())
+            return HttpResponse()
+
+        with override_settings(DATABASE_REPLICAS=[]):
+            view(self.request())
+        self.assertEqual(reads, [PRIMARY])
+
+    def test_writes_and_migrations_go_to_primary(self):
+        """Запись всегда в основную базу, схема — у основной и SQLite"""
+        self.assertEqual(self.router.db_for_write(Post), PRIMARY)
+        with mock.patch.dict(settings.DATABASES, REPLICAS):
+            self.assertTrue(self.router.allow_migrate(PRIMARY, 'posts'))
+            self.assertTrue(self.router.allow_migrate(REPLICA, 'posts'))
+            self.assertFalse(self.router.allow_migrate('pg_replica', 'posts'))
+
+    def test_write_marks_response_sticky(self):
+        """После записи ответ ставит куку основной базы"""
+        def view(request):
+            self.router.db_for_write(Post)
+            return HttpResponse()
+
+        with override_settings(DATABASE_REPLICAS=[REPLICA]):
+            response = PrimaryStickinessMiddleware(view)(self.request())
+            cookie = response.cookies[settings.REPLICA_STICKY_COOKIE]
+            self.assertEqual(cookie['max-age'],
+                             settings.REPLICA_STICKY_SECONDS)
+            response = PrimaryStickinessMiddleware(
+                lambda request: HttpResponse())(self.request())
+            self.assertNotIn(settings.REPLICA_STICKY_COOKIE,
+                             response.cookies)
+
+    def request(self, sticky=False):
+        request = RequestFactory().get('/')
+        request.user = AnonymousUser()
+        if sticky:
+            request.COOKIES[settings.REPLICA_STICKY_COOKIE] = '1'
+        return request
@@ -0,0 +1,51 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from posts.models import Post
+
+from ..testing import TEST_REPLICA
+
+User = get_user_model()
+
+
+@override_settings(DATABASE_REPLICAS=[TEST_REPLICA])
+class ReplicaReadsTest(TestCase):
+    """Ленты читаются с реплики, а после записи — из основной базы.
+
+    Основная база и реплика — разные файлы SQLite без репликации,
+    поэтому записанное в основную базу на реплике не видно.
+    """
+    databases = {'default', TEST_REPLICA}
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='user')
+        cls.post = Post.objects.create(author=cls.user, text='Пост')
+
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(self.user)
+
+    def test_feed_reads_from_replica(self):
+        """Главная берет посты с реплики, где их еще нет"""
+        response = self.client.get(reverse('posts:index'))
+        self.assertEqual(len(response.context['page_obj']), 0)
+        self.assertEqual(response.context['user'], self.user)
+
+    def test_reads_stick_to_primary_after_write(self):
+        """После своего поста пользователь читает основную базу"""
+        response = self.client.post(reverse('posts:post_create'),
+                                    {'text': 'Свежий пост'})
+        self.assertIn(settings.REPLICA_STICKY_COOKIE, response.cookies)
+        response = self.client.get(reverse('posts:index'))
+        self.assertEqual(
+            [post.text for post in response.context['page_obj']],
+            ['Свежий пост', 'Пост'])
+
+    def test_other_pages_read_from_primary(self):
+        """Страницы без @read_from_replica читают основную базу"""
+        response = self.client.get(
+            reverse('posts:post_edit', kwargs={'post_id': self.post.id}))
+        self.assertEqual(response.context['post'], self.post)
@@ -0,0 +1,15 @@
+from django.contrib import admin
+
+from .models import Job
+
+
+class JobAdmin(admin.ModelAdmin):
+    list_display = ('pk', 'name', 'status', 'attempts', 'run_after',
+                    'locked_by',)
+    search_fields = ('name', 'idempotency_key',)
+    list_filter = ('status', 'name',)
+    readonly_fields = ('last_error',)
+    empty_value_display = '-пусто-'
+
+
+admin.site.register(Job, JobAdmin)
@@ -0,0 +1,7 @@
+from .registry import job
+from .worker import prune_jobs
+
+
+@job('jobs.prune')
+def prune_jobs_job():
+    prune_jobs()
@@ -0,0 +1,90 @@
+import multiprocessing
+import os
+import signal
+import socket
+
+import django
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+
+def _worker_main(worker_id, stop_event, poll_interval):
+    # при spawn потомок стартует с чистого интерпретатора, при fork
+    # наследует соединения родителя: Django настраивается заново,
+    # а соединения открываются свои
+    django.setup()
+    connections.close_all()
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    from jobs.worker import work
+    work(worker_id, stop_event, poll_interval)
+
+
+class Command(BaseCommand):
+    help = 'Запускает пул процессов, выполняющих фоновые задачи'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=settings.JOBS_WORKERS,
+            help='Число процессов-обработчиков',
+        )
+        parser.add_argument(
+            '--poll',
+            type=float,
+            default=settings.JOBS_POLL_INTERVAL,
+            help='Пауза в секундах, когда очередь пуста',
+        )
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Поставить периодические задачи, выполнить готовые '
+                 'в этом процессе и выйти',
+        )
+
+    def handle(self, *args, **options):
+        # модели импортируются после настройки Django, в том числе
+        # когда потомок при spawn заново импортирует этот модуль
+        from jobs.worker import run_pending, schedule_periodic
+
+        if settings.CACHES['default']['BACKEND'].endswith('LocMemCache'):
+            self.stderr.write(
+                'Кэш LocMem виден только этому процессу: сайт не узнает '
+                'об изменениях из задач. Задайте REDIS_URL.')
+        if options['once']:
+            schedule_periodic()
+            processed = run_pending()
+            self.stdout.write(
+                self.style.SUCCESS(f'Выполнено задач: {processed}'))
+            return
+
+        connections.close_all()
+        context = multiprocessing.get_context(settings.JOBS_START_METHOD)
+        stop_event = context.Event()
+        prefix = f'{socket.gethostname()}:{os.getpid()}'
+        processes = [
+            context.Process(
+                target=_worker_main,
+                args=(f'{prefix}:{number}', stop_event, options['poll']),
+                daemon=True,
+            )
+            for number in range(options['workers'])
+        ]
+        for process in processes:
+            process.start()
+        self.stdout.write(
+            f'Запущено обработчиков: {len(processes)}, Ctrl+C для остановки')
+
+        def stop(signum, frame):
+            stop_event.set()
+
+        signal.signal(signal.SIGTERM, stop)
+        try:
+            for process in processes:
+                process.join()
+        except KeyboardInterrupt:
+            stop_event.set()
+            for process in processes:
+                process.join()
+        self.stdout.write(self.style.SUCCESS('Обработчики остановлены'))
@@ -0,0 +1,47 @@
+from django.db import models
+
+
+class Job(models.Model):
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUSES = (
+        (QUEUED, 'В очереди'),
+        (RUNNING, 'Выполняется'),
+        (DONE, 'Выполнена'),
+        (FAILED, 'Провалена'),
+    )
+
+    name = models.CharField('Задача', max_length=100)
+    payload = models.JSONField('Аргументы', default=dict, blank=True)
+    status = models.CharField(
+        'Статус', max_length=10, choices=STATUSES, default=QUEUED)
+    attempts = models.PositiveSmallIntegerField('Попыток', default=0)
+    max_attempts = models.PositiveSmallIntegerField('Максимум попыток')
+    idempotency_key = models.CharField(
+        'Ключ идемпотентности',
+        max_length=200,
+        unique=True,
+        blank=True,
+        null=True,
+        help_text=('Повторная постановка задачи с тем же ключом '
+                   'ничего не делает')
+    )
+    run_after = models.DateTimeField('Выполнить после')
+    locked_at = models.DateTimeField('Взята в работу', blank=True, null=True)
+    locked_by = models.CharField('Обработчик', max_length=100, blank=True)
+    last_error = models.TextField('Последняя ошибка', blank=True)
+    created_at = models.DateTimeField('Создана', auto_now_add=True)
+
+    class Meta:
+        ordering = ('run_after',)
+        verbose_name = 'Фоновая задача'
+        verbose_name_plural = 'Фоновые задачи'
+        indexes = [models.Index(
+            fields=['status', 'run_after'],
+            name='job_status_run_after_idx'
+        )]
+
+    def __str__(self) -> str:
+        return f'{self.name} [{self.status}]'
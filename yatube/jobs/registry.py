@@ -0,0 +1,38 @@
+import datetime
+
+from django.conf import settings
+from django.utils import timezone
+
+from .models import Job
+
+registry = {}
+
+
+def job(name):
+    """Регистрирует функцию как фоновую задачу с именем name"""
+    def decorator(func):
+        registry[name] = func
+        return func
+    return decorator
+
+
+def enqueue(name, payload=None, *, idempotency_key=None,
+            max_attempts=None, delay=0):
+    """Ставит задачу в очередь и возвращает ее.
+
+    Если задача с таким idempotency_key уже ставилась, возвращается
+    существующая запись, новая не создается.
+    """
+    if name not in registry:
+        raise KeyError(f'Неизвестная фоновая задача: {name}')
+    fields = {
+        'name': name,
+        'payload': payload or {},
+        'max_attempts': max_attempts or settings.JOBS_MAX_ATTEMPTS,
+        'run_after': timezone.now() + datetime.timedelta(seconds=delay),
+    }
+    if idempotency_key is None:
+        return Job.objects.create(**fields)
+    queued_job, _ = Job.objects.get_or_create(
+        idempotency_key=idempotency_key, defaults=fields)
+    return queued_job
@@ -0,0 +1,113 @@
+import datetime
+
+from django.conf import settings
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from ..models import Job
+from ..registry import enqueue, job
+from ..worker import claim_next, prune_jobs, run_pending, schedule_periodic
+
+calls = []
+
+
+@job('tests.record')
+def record(value):
+    calls.append(value)
+
+
+@job('tests.explode')
+def explode():
+    raise RuntimeError('Бум')
+
+
+@override_settings(JOBS_RETRY_DELAY=0)
+class JobQueueTest(TestCase):
+    """Тестирование очереди фоновых задач"""
+
+    def setUp(self):
+        calls.clear()
+
+    def test_enqueue_and_run(self):
+        """Задача из очереди выполняется и помечается выполненной"""
+        queued_job = enqueue('tests.record', {'value': 42})
+        self.assertEqual(run_pending(), 1)
+        queued_job.refresh_from_db()
+        self.assertEqual(queued_job.status, Job.DONE)
+        self.assertEqual(calls, [42])
+
+    def test_idempotency_key(self):
+        """Повторная постановка с тем же ключом не создает задачу"""
+        first = enqueue('tests.record', {'value': 1}, idempotency_key='one')
+        second = enqueue('tests.record', {'value': 2}, idempotency_key='one')
+        self.assertEqual(first.id, second.id)
+        run_pending()
+        self.assertEqual(calls, [1])
+
+    def test_retries_then_fails(self):
+        """Упавшая задача повторяется до max_attempts и проваливается"""
+        queued_job = enqueue('tests.explode', max_attempts=3)
+        self.assertEqual(run_pending(), 3)
+        queued_job.refresh_from_db()
+        self.assertEqual(queued_job.status, Job.FAILED)
+        self.assertEqual(queued_job.attempts, 3)
+        self.assertIn('RuntimeError', queued_job.last_error)
+
+    def test_claimed_job_is_not_claimed_twice(self):
+        """Взятую в работу задачу не получает второй обработчик"""
+        enqueue('tests.record', {'value': 1})
+        self.assertIsNotNone(claim_next('first'))
+        self.assertIsNone(claim_next('second'))
+
+    def test_stale_job_is_reclaimed_until_attempts_run_out(self):
+        """Зависшая задача возвращается в работу, пока есть попытки"""
+        queued_job = enqueue('tests.record', {'value': 1}, max_attempts=2)
+        stale = timezone.now() - datetime.timedelta(
+            seconds=settings.JOBS_LOCK_TIMEOUT + 1)
+        self.assertIsNotNone(claim_next('first'))
+        Job.objects.filter(id=queued_job.id).update(locked_at=stale)
+        self.assertEqual(claim_next('second').id, queued_job.id)
+        Job.objects.filter(id=queued_job.id).update(locked_at=stale)
+        self.assertIsNone(claim_next('third'))
+        queued_job.refresh_from_db()
+        self.assertEqual(queued_job.status, Job.FAILED)
+        self.assertEqual(queued_job.attempts, 2)
+        self.assertEqual(calls, [])
+
+    def test_delayed_job_waits(self):
+        """Отложенная задача не выполняется раньше срока"""
+        enqueue('tests.record', {'value': 1}, delay=60)
+        self.assertEqual(run_pending(), 0)
+        Job.objects.update(run_after=timezone.now())
+        self.assertEqual(run_pending(), 1)
+
+    def test_unknown_job(self):
+        """Нельзя поставить незарегистрированную задачу"""
+        with self.assertRaises(KeyError):
+            enqueue('tests.unknown')
+
+    @override_settings(JOBS_PERIODIC={'tests.record': 60})
+    def test_periodic_job_once_per_slot(self):
+        """Периодическая задача ставится один раз за период"""
+        now = timezone.now()
+        schedule_periodic(now)
+        schedule_periodic(now)
+        self.assertEqual(Job.objects.filter(name='tests.record').count(), 1)
+        schedule_periodic(now + datetime.timedelta(seconds=60))
+        self.assertEqual(Job.objects.filter(name='tests.record').count(), 2)
+
+    @override_settings(JOBS_RETENTION=60)
+    def test_prune_keeps_recent_and_failed(self):
+        """Удаляются только выполненные задачи старше JOBS_RETENTION"""
+        old = timezone.now() - datetime.timedelta(seconds=120)
+        done = enqueue('tests.record', {'value': 1})
+        failed = enqueue('tests.explode')
+        recent = enqueue('tests.record', {'value': 2})
+        Job.objects.filter(id__in=[done.id, failed.id]).update(run_after=old)
+        Job.objects.filter(id__in=[done.id, recent.id]).update(
+            status=Job.DONE)
+        Job.objects.filter(id=failed.id).update(status=Job.FAILED)
+        self.assertEqual(prune_jobs(), 1)
+        self.assertEqual(
+            set(Job.objects.values_list('id', flat=True)),
+            {failed.id, recent.id})
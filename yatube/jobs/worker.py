@@ -0,0 +1,139 @@
+import datetime
+import logging
+import traceback
+
+from django.conf import settings
+from django.db import close_old_connections
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import Job
+from .registry import enqueue, registry
+
+logger = logging.getLogger(__name__)
+
+
+def fail_stale(stale):
+    """Проваливает зависшие задачи, у которых кончились попытки"""
+    return Job.objects.filter(
+        status=Job.RUNNING, locked_at__lt=stale,
+        attempts__gte=F('max_attempts'),
+    ).update(
+        status=Job.FAILED,
+        locked_at=None,
+        last_error='Обработчик не завершил задачу за JOBS_LOCK_TIMEOUT',
+    )
+
+
+def claim_next(worker_id):
+    """Забирает из очереди одну готовую к выполнению задачу.
+
+    Задача помечается выполняемой условным UPDATE, поэтому одну
+    задачу не возьмут два обработчика. Задачи, зависшие у упавшего
+    обработчика дольше JOBS_LOCK_TIMEOUT, возвращаются в работу, пока
+    у них остаются попытки; исчерпавшие попытки проваливаются.
+    """
+    now = timezone.now()
+    stale = now - datetime.timedelta(seconds=settings.JOBS_LOCK_TIMEOUT)
+    fail_stale(stale)
+    ready = (
+        Q(status=Job.QUEUED, run_after__lte=now)
+        | Q(status=Job.RUNNING, locked_at__lt=stale,
+            attempts__lt=F('max_attempts'))
+    )
+    for candidate in Job.objects.filter(ready).values(
+            'id', 'status', 'locked_at')[:10]:
+        claimed = Job.objects.filter(
+            id=candidate['id'],
+            status=candidate['status'],
+            locked_at=candidate['locked_at'],
+        ).update(
+            status=Job.RUNNING,
+            locked_at=now,
+            locked_by=worker_id,
+            attempts=F('attempts') + 1,
+        )
+        if claimed:
+            return Job.objects.get(id=candidate['id'])
+    return None
+
+
+def run_job(queued_job):
+    """Выполняет задачу и назначает повтор с отсрочкой при ошибке"""
+    try:
+        func = registry[queued_job.name]
+        func(**queued_job.payload)
+    except Exception:
+        error = traceback.format_exc()
+        logger.exception('Задача %s #%d упала', queued_job.name,
+                         queued_job.id)
+        if queued_job.attempts < queued_job.max_attempts:
+            delay = settings.JOBS_RETRY_DELAY * 2 ** (queued_job.attempts - 1)
+            Job.objects.filter(id=queued_job.id).update(
+                status=Job.QUEUED,
+                run_after=timezone.now() + datetime.timedelta(seconds=delay),
+                locked_at=None,
+                last_error=error,
+            )
+        else:
+            Job.objects.filter(id=queued_job.id).update(
+                status=Job.FAILED, locked_at=None, last_error=error)
+        return False
+    Job.objects.filter(id=queued_job.id).update(
+        status=Job.DONE, locked_at=None)
+    return True
+
+
+def run_pending(worker_id='inline', limit=None):
+    """Выполняет готовые задачи, пока они есть; возвращает их число"""
+    processed = 0
+    while limit is None or processed < limit:
+        queued_job = claim_next(worker_id)
+        if queued_job is None:
+            break
+        run_job(queued_job)
+        processed += 1
+    return processed
+
+
+def schedule_periodic(now=None, scheduled=None):
+    """Ставит в очередь периодические задачи JOBS_PERIODIC.
+
+    Период делит время на слоты, номер слота входит в
+    idempotency_key, поэтому сколько бы обработчиков ни планировали
+    задачу, в слот она попадет один раз. scheduled запоминает уже
+    поставленные слоты, чтобы не ходить в базу на каждом опросе.
+    """
+    now = timezone.now() if now is None else now
+    scheduled = {} if scheduled is None else scheduled
+    for name, interval in settings.JOBS_PERIODIC.items():
+        slot = int(now.timestamp() // interval)
+        if scheduled.get(name) == slot:
+            continue
+        enqueue(name, idempotency_key=f'periodic:{name}:{slot}')
+        scheduled[name] = slot
+    return scheduled
+
+
+def prune_jobs(now=None):
+    """Удаляет выполненные задачи старше JOBS_RETENTION; возвращает их число.
+
+    Проваленные задачи остаются, чтобы по ним можно было разобраться.
+    """
+    now = timezone.now() if now is None else now
+    border = now - datetime.timedelta(seconds=settings.JOBS_RETENTION)
+    deleted, _ = Job.objects.filter(
+        status=Job.DONE, run_after__lt=border).delete()
+    return deleted
+
+
+def work(worker_id, stop_event, poll_interval):
+    """Цикл обработчика: берет задачи, пока не выставлен stop_event"""
+    logger.info('Обработчик %s запущен', worker_id)
+    scheduled = {}
+    while not stop_event.is_set():
+        close_old_connections()
+        schedule_periodic(scheduled=scheduled)
+        if not run_pending(worker_id, limit=settings.JOBS_BATCH_SIZE):
+            stop_event.wait(poll_interval)
+    logger.info('Обработчик %s остановлен', worker_id)
@@ -1,6 +1,47 @@
+import tempfile
+
 from django.contrib import admin
+from django.http import FileResponse, StreamingHttpResponse
+from django.utils import timezone
+
+from .analytics import stream_csv, write_parquet
+from .models import AuthorStats, Post, Group, Comment, Follow, Like
+from .search import build_match_query, fts_available, matching_post_ids
+
+
+def analytics_filename(report, extension):
+    return f'{report}-{timezone.now():%Y%m%d-%H%M}.{extension}'
+
+
+def csv_action(report, description):
+    """Действие, которое отдает отчет по выбранным постам в CSV"""
+    @admin.action(description=description)
+    def action(modeladmin, request, queryset):
+        response = StreamingHttpResponse(
+            stream_csv(report, queryset), content_type='text/csv')
+        response['Content-Disposition'] = (
+            f'attachment; filename="{analytics_filename(report, "csv")}"')
+        return response
+    action.__name__ = f'export_{report}_csv'
+    return action
 
-from .models import Post, Group, Comment, Follow, Like
+
+def parquet_action(report, description):
+    """Действие, которое отдает отчет по выбранным постам в Parquet.
+
+    Parquet пишет оглавление в конец файла, поэтому отчет собирается
+    во временном файле и отдается с диска блоками.
+    """
+    @admin.action(description=description)
+    def action(modeladmin, request, queryset):
+        target = tempfile.TemporaryFile()
+        write_parquet(report, target, queryset)
+        target.seek(0)
+        return FileResponse(
+            target, as_attachment=True,
+            filename=analytics_filename(report, 'parquet'))
+    action.__name__ = f'export_{report}_parquet'
+    return action
 
 
 class PostAdmin(admin.ModelAdmin):
@@ -9,6 +50,20 @@ class PostAdmin(admin.ModelAdmin):
     list_filter = ('pub_date',)
     list_editable = ('group',)
     empty_value_display = '-пусто-'
+    actions = (
+        csv_action('posts', 'Аналитика по постам (CSV)'),
+        csv_action('authors', 'Аналитика по авторам (CSV)'),
+        parquet_action('posts', 'Аналитика по постам (Parquet)'),
+        parquet_action('authors', 'Аналитика по авторам (Parquet)'),
+    )
+
+    def get_search_results(self, request, queryset, search_term):
+        """Ищет по полнотекстовому индексу вместо LIKE по всем постам"""
+        match_query = build_match_query(search_term)
+        if not fts_available() or not match_query:
+            return super().get_search_results(
+                request, queryset, search_term)
+        return queryset.filter(id__in=matching_post_ids(match_query)), False
 
 
 admin.site.register(Post, PostAdmin)
@@ -16,3 +71,11 @@ admin.site.register(Group)
 admin.site.register(Comment)
 admin.site.register(Follow)
 admin.site.register(Like)
+
+
+@admin.register(AuthorStats)
+class AuthorStatsAdmin(admin.ModelAdmin):
+    list_display = ('user', 'posts_count', 'followers_count',
+                    'following_count')
+    readonly_fields = ('posts_count', 'followers_count', 'following_count')
+    raw_id_fields = ('user',)
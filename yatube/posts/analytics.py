@@ -0,0 +1,145 @@
+import csv
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+from django.conf import settings
+from django.db.models import Count, F, Max, Min, Sum
+
+from .models import Comment, Post
+
+POST_COLUMNS = (
+    ('post_id', pa.int64()),
+    ('author', pa.string()),
+    ('group', pa.string()),
+    ('pub_date', pa.timestamp('us', tz='UTC')),
+    ('like_count', pa.int64()),
+    ('comment_count', pa.int64()),
+)
+AUTHOR_COLUMNS = (
+    ('author', pa.string()),
+    ('posts', pa.int64()),
+    ('likes', pa.int64()),
+    ('comments', pa.int64()),
+    ('first_post', pa.timestamp('us', tz='UTC')),
+    ('last_post', pa.timestamp('us', tz='UTC')),
+    ('hours_between_posts', pa.float64()),
+    ('posts_per_week', pa.float64()),
+)
+HOUR = 3600
+WEEK = 7 * 24 * HOUR
+
+
+def chunked_keys(queryset, key, chunk_size):
+    """Значения key по возрастанию порциями по chunk_size.
+
+    Порция выбирается условием key > последнего значения, поэтому
+    каждый запрос стоит одинаково на любой глубине таблицы.
+    """
+    last = None
+    while True:
+        keys = queryset.order_by(key).values_list(key, flat=True)
+        if last is not None:
+            keys = keys.filter(**{f'{key}__gt': last})
+        chunk = list(keys.distinct()[:chunk_size])
+        if not chunk:
+            return
+        yield chunk
+        last = chunk[-1]
+
+
+def post_rows(queryset, chunk_size):
+    """Порции строк по постам: нравлики и комментарии каждого поста"""
+    for ids in chunked_keys(queryset, 'id', chunk_size):
+        comments = dict(
+            Comment.objects.filter(post_id__in=ids).order_by()
+            .values('post_id').annotate(amount=Count('id'))
+            .values_list('post_id', 'amount')
+        )
+        posts = (
+            Post.objects.filter(id__in=ids).order_by('id')
+            .values_list('id', 'author__username', 'group__slug',
+                         'pub_date', 'like_count')
+        )
+        yield [(*post, comments.get(post[0], 0)) for post in posts]
+
+
+def cadence(posts, first_post, last_post):
+    """Средний интервал между постами в часах и постов в неделю"""
+    span = (last_post - first_post).total_seconds()
+    if posts < 2 or not span:
+        return None, None
+    return (round(span / (posts - 1) / HOUR, 2),
+            round(posts / span * WEEK, 2))
+
+
+def author_rows(queryset, chunk_size):
+    """Порции строк по авторам выбранных постов"""
+    for author_ids in chunked_keys(queryset, 'author_id', chunk_size):
+        posts = queryset.filter(author_id__in=author_ids)
+        comments = dict(
+            Comment.objects.filter(post__in=posts).order_by()
+            .values('post__author_id').annotate(amount=Count('id'))
+            .values_list('post__author_id', 'amount')
+        )
+        authors = (
+            posts.order_by('author_id').values('author_id')
+            .annotate(author=F('author__username'), posts=Count('id'),
+                      likes=Sum('like_count'), first_post=Min('pub_date'),
+                      last_post=Max('pub_date'))
+        )
+        yield [
+            (row['author'], row['posts'], row['likes'],
+             comments.get(row['author_id'], 0),
+             row['first_post'], row['last_post'],
+             *cadence(row['posts'], row['first_post'], row['last_post']))
+            for row in authors
+        ]
+
+
+REPORTS = {
+    'posts': (POST_COLUMNS, post_rows),
+    'authors': (AUTHOR_COLUMNS, author_rows),
+}
+
+
+def report_chunks(report, queryset=None, chunk_size=None):
+    """Колонки отчета и генератор его порций"""
+    columns, rows = REPORTS[report]
+    if queryset is None:
+        queryset = Post.objects.all()
+    return columns, rows(queryset, chunk_size or settings.ANALYTICS_CHUNK)
+
+
+class Echo:
+    """Псевдофайл для csv.writer: возвращает строку вместо записи"""
+
+    def write(self, value):
+        return value
+
+
+def stream_csv(report, queryset=None, chunk_size=None):
+    """Строки CSV по одной, чтобы отдавать их StreamingHttpResponse"""
+    columns, chunks = report_chunks(report, queryset, chunk_size)
+    writer = csv.writer(Echo())
+    yield writer.writerow([name for name, _ in columns])
+    for chunk in chunks:
+        for row in chunk:
+            yield writer.writerow(row)
+
+
+def write_parquet(report, target, queryset=None, chunk_size=None):
+    """Пишет отчет в Parquet, по группе строк на порцию"""
+    columns, chunks = report_chunks(report, queryset, chunk_size)
+    schema = pa.schema(columns)
+    amount = 0
+    with pq.ParquetWriter(target, schema) as writer:
+        for chunk in chunks:
+            # колонки строятся по схеме: пустая порция дает пустые
+            # массивы нужного типа, а не ноль колонок из zip(*chunk)
+            writer.write_table(pa.Table.from_arrays(
+                [pa.array([row[index] for row in chunk], type=field.type)
+                 for index, field in enumerate(schema)],
+                schema=schema,
+            ))
+            amount += len(chunk)
+    return amount
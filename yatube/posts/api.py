@@ -0,0 +1,215 @@
+from functools import wraps
+
+from django.conf import settings
+from django.core.exceptions import BadRequest
+from django.core.files.storage import default_storage
+from django.http import Http404, JsonResponse
+
+from core.routers import read_from_replica
+from .freshness import conditional_page
+from .like_buffer import pending_likes
+from .like_cache import liked_among
+from .models import Comment, Group, Post, TimelineEntry, User
+from .paginator import CursorPaginator
+from .views import (follow_state, group_state, index_state, post_state,
+                    profile_state)
+
+# поле ответа -> путь для values(); авторы и группы приходят
+# в той же строке через JOIN, моделей при этом не создается
+POST_FIELDS = {
+    'id': 'id',
+    'text': 'text',
+    'pub_date': 'pub_date',
+    'author': 'author__username',
+    'group': 'group__slug',
+    'image': 'image',
+    'like_count': 'like_count',
+    'is_liked': 'id',
+}
+TIMELINE_FIELDS = {
+    **{name: f'post__{path}' for name, path in POST_FIELDS.items()},
+    'id': 'post_id',
+    'pub_date': 'pub_date',
+    'is_liked': 'post_id',
+}
+COMMENT_FIELDS = {
+    'id': 'id',
+    'post': 'post_id',
+    'text': 'text',
+    'pub_date': 'pub_date',
+    'author': 'author__username',
+}
+JSON_PARAMS = {'ensure_ascii': False}
+
+
+def api_view(view):
+    """Отдает ошибки запроса и отсутствие объекта в JSON"""
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        try:
+            return view(request, *args, **kwargs)
+        except BadRequest as error:
+            return JsonResponse({'error': str(error)}, status=400,
+                                json_dumps_params=JSON_PARAMS)
+        except Http404:
+            return JsonResponse({'error': 'Не найдено'}, status=404,
+                                json_dumps_params=JSON_PARAMS)
+    return wrapper
+
+
+def api_login_required(view):
+    """Вместо перенаправления на вход отвечает 401"""
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if not request.user.is_authenticated:
+            return JsonResponse({'error': 'Нужна авторизация'}, status=401,
+                                json_dumps_params=JSON_PARAMS)
+        return view(request, *args, **kwargs)
+    return wrapper
+
+
+def requested_fields(request, fields):
+    """Поля из параметра fields=, без него — все поля ресурса"""
+    raw = request.GET.get('fields')
+    if not raw:
+        return list(fields)
+    names = list(dict.fromkeys(
+        name.strip() for name in raw.split(',') if name.strip()))
+    unknown = [name for name in names if name not in fields]
+    if unknown or not names:
+        raise BadRequest(
+            f'Неизвестные поля: {", ".join(unknown)}; '
+            f'доступны: {", ".join(fields)}')
+    return names
+
+
+def like_state(request, names, fields, rows):
+    """Нравлики пользователя среди постов rows и его еще не записанные клики.
+
+    Клики из журнала накладываются так же, как в лентах сайта: иначе
+    после нравлика API до сброса журнала показывал бы старое сердечко.
+    """
+    if ('is_liked' not in fields or not request.user.is_authenticated
+            or not {'is_liked', 'like_count'} & set(names)):
+        return set(), {}
+    post_ids = [row[fields['is_liked']] for row in rows]
+    liked = (liked_among(request.user.pk, post_ids)
+             if 'is_liked' in names else set())
+    return liked, pending_likes(request.user.pk, post_ids)
+
+
+def serialize(request, rows, names, fields):
+    """Словари для JSON прямо из строк values()"""
+    liked, pending = like_state(request, names, fields, rows)
+    items = []
+    for row in rows:
+        item = {}
+        post_pending = (pending.get(row[fields['is_liked']])
+                        if pending else None)
+        for name in names:
+            value = row[fields[name]]
+            if name == 'is_liked':
+                value = post_pending[0] if post_pending else value in liked
+            elif name == 'like_count' and post_pending:
+                value += post_pending[1]
+            elif name == 'image':
+                value = default_storage.url(value) if value else None
+            item[name] = value
+        items.append(item)
+    return items
+
+
+def select(queryset, names, fields, extra=()):
+    paths = dict.fromkeys([fields[name] for name in names] + list(extra))
+    return queryset.values(*paths)
+
+
+def page_response(request, queryset, fields, per_page,
+                  ordering=('-pub_date', '-id')):
+    """Страница ресурса по курсору с полями из fields="""
+    names = requested_fields(request, fields)
+    paginator = CursorPaginator(
+        select(queryset.order_by(*ordering), names, fields,
+               [field.lstrip('-') for field in ordering]),
+        per_page, ordering=ordering)
+    page = paginator.get_page(
+        request.GET.get(paginator.cursor_query_param))
+    return JsonResponse({
+        'results': serialize(request, page.object_list, names, fields),
+        'next': page.next_cursor,
+        'previous': page.previous_cursor,
+    }, json_dumps_params=JSON_PARAMS)
+
+
+def object_id(queryset, **lookup):
+    """id объекта без загрузки модели; 404, если его нет"""
+    found = queryset.filter(**lookup).values_list('id', flat=True).first()
+    if found is None:
+        raise Http404
+    return found
+
+
+@api_view
+@read_from_replica
+@conditional_page(index_state)
+def index(request):
+    """Лента всех постов"""
+    return page_response(request, Post.objects.all(), POST_FIELDS,
+                         settings.POSTS_ON_PAGE)
+
+
+@api_view
+@read_from_replica
+@conditional_page(group_state)
+def group_posts(request, slug):
+    """Лента постов группы"""
+    group_id = object_id(Group.objects, slug=slug)
+    return page_response(request, Post.objects.filter(group_id=group_id),
+                         POST_FIELDS, settings.POSTS_ON_PAGE)
+
+
+@api_view
+@read_from_replica
+@conditional_page(profile_state)
+def profile_posts(request, username):
+    """Лента постов автора"""
+    author_id = object_id(User.objects, username=username)
+    return page_response(request, Post.objects.filter(author_id=author_id),
+                         POST_FIELDS, settings.POSTS_ON_PAGE)
+
+
+@api_view
+@api_login_required
+@read_from_replica
+@conditional_page(follow_state)
+def follow_posts(request):
+    """Лента подписок пользователя"""
+    return page_response(
+        request, TimelineEntry.objects.filter(user=request.user),
+        TIMELINE_FIELDS, settings.POSTS_ON_PAGE,
+        ordering=('-pub_date', '-post_id'))
+
+
+@api_view
+@read_from_replica
+@conditional_page(post_state)
+def post_detail(request, post_id):
+    """Один пост"""
+    names = requested_fields(request, POST_FIELDS)
+    row = select(Post.objects.filter(id=post_id), names, POST_FIELDS,
+                 ['id']).first()
+    if row is None:
+        raise Http404
+    item, = serialize(request, [row], names, POST_FIELDS)
+    return JsonResponse(item, json_dumps_params=JSON_PARAMS)
+
+
+@api_view
+@read_from_replica
+@conditional_page(post_state)
+def post_comments(request, post_id):
+    """Комментарии поста от старых к новым"""
+    post_id = object_id(Post.objects, id=post_id)
+    return page_response(
+        request, Comment.objects.filter(post_id=post_id), COMMENT_FIELDS,
+        settings.COMMENTS_ON_PAGE, ordering=('pub_date', 'id'))
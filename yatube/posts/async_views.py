@@ -0,0 +1,105 @@
+"""Async-версии лент для ASGI: независимые запросы view идут одновременно."""
+import asyncio
+from functools import wraps
+
+from django.contrib.auth.views import redirect_to_login
+from django.shortcuts import get_object_or_404, render
+
+from core.asyncdb import db_call
+from core.routers import read_from_replica
+from .forms import CommentForm
+from .freshness import conditional_page
+from .models import Group, User
+from .stats import get_stats
+from .views import (apply_like_state, comments_page, feed_page, feed_posts,
+                    follow_page, follow_state, group_state, index_state,
+                    is_following, liked_post_ids, post_state, profile_state)
+
+
+def login_required(view):
+    """login_required для async-view: пользователь грузится в потоке"""
+    @wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        if not await db_call(lambda: request.user.is_authenticated):
+            return redirect_to_login(request.get_full_path())
+        return await view(request, *args, **kwargs)
+    return wrapper
+
+
+def render_page(request, template, context):
+    # шаблоны тоже ходят в базу: миниатюры, контекст-процессоры
+    return db_call(render, request, template, context)
+
+
+@read_from_replica
+@conditional_page(index_state)
+async def index(request):
+    """Отображает посты в хронологическом порядке"""
+    page_obj = await db_call(feed_page, request, feed_posts())
+    return await render_page(request, 'posts/index.html',
+                             {'page_obj': page_obj})
+
+
+@read_from_replica
+@conditional_page(group_state)
+async def group_posts(request, slug):
+    """Отображает все посты выбранной группы"""
+    group, page_obj = await asyncio.gather(
+        db_call(get_object_or_404, Group, slug=slug),
+        db_call(feed_page, request, feed_posts().filter(group__slug=slug)),
+    )
+    return await render_page(request, 'posts/group_list.html', {
+        'group': group,
+        'page_obj': page_obj,
+    })
+
+
+@read_from_replica
+@conditional_page(profile_state)
+async def profile(request, username):
+    """Отображает все посты пользователя"""
+    author, page_obj, following = await asyncio.gather(
+        db_call(get_object_or_404, User.objects.select_related('stats'),
+                username=username),
+        db_call(feed_page, request,
+                feed_posts().filter(author__username=username)),
+        db_call(is_following, request, username),
+    )
+    stats = await db_call(get_stats, author)
+    return await render_page(request, 'posts/profile.html', {
+        'page_obj': page_obj,
+        'author': author,
+        'post_amount': stats.posts_count,
+        'stats': stats,
+        'following': following,
+    })
+
+
+@read_from_replica
+@conditional_page(post_state)
+async def post_detail(request, post_id):
+    """Отображает полный текст поста и детали"""
+    post, comments, liked_ids = await asyncio.gather(
+        db_call(get_object_or_404,
+                feed_posts().select_related('author__stats'), id=post_id),
+        db_call(comments_page, request, post_id),
+        db_call(liked_post_ids, request, [post_id]),
+    )
+    apply_like_state(request, [post], liked_ids)
+    stats = await db_call(get_stats, post.author)
+    return await render_page(request, 'posts/post_detail.html', {
+        'post': post,
+        'post_amount': stats.posts_count,
+        'comments': comments,
+        'form': CommentForm(request.POST or None),
+    })
+
+
+@login_required
+@read_from_replica
+@conditional_page(follow_state)
+async def follow_index(request):
+    """Выводит посты авторов на которых подписан пользователь"""
+    page_obj = await db_call(follow_page, request)
+    return await render_page(request, 'posts/follow.html',
+                             {'page_obj': page_obj})
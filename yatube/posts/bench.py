@@ -0,0 +1,61 @@
+"""Замеры задержки и числа SQL-запросов страниц через тестовый клиент."""
+import statistics
+import time
+
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+PERCENTILES = {'p50': 49, 'p95': 94, 'p99': 98}
+
+
+def percentiles(samples):
+    """p50/p95/p99 в миллисекундах по замерам в секундах"""
+    if len(samples) == 1:
+        samples = samples * 2
+    cuts = statistics.quantiles(samples, n=100, method='inclusive')
+    return {name: round(cuts[index] * 1000, 3)
+            for name, index in PERCENTILES.items()}
+
+
+def measure(send, iterations, warmup=0, cold=False):
+    """Гоняет запрос send() и собирает задержки и число SQL-запросов"""
+    for _ in range(warmup):
+        send()
+    samples = []
+    queries = []
+    for _ in range(iterations):
+        if cold:
+            cache.clear()
+        with CaptureQueriesContext(connection) as captured:
+            start = time.perf_counter()
+            response = send()
+            samples.append(time.perf_counter() - start)
+        if response.status_code >= 400:
+            raise RuntimeError(
+                f'{response.request["PATH_INFO"]} ответил '
+                f'{response.status_code}')
+        queries.append(len(captured))
+    return {
+        **percentiles(samples),
+        'queries': max(queries),
+        'iterations': iterations,
+    }
+
+
+def compare(results, baseline, tolerance):
+    """Регрессии относительно эталона: медленнее на tolerance или больше SQL"""
+    regressions = []
+    for name, result in results.items():
+        reference = baseline.get(name)
+        if reference is None:
+            continue
+        if result['p95'] > reference['p95'] * (1 + tolerance):
+            regressions.append(
+                f'{name}: p95 {result["p95"]} мс против '
+                f'{reference["p95"]} мс в эталоне')
+        if result['queries'] > reference['queries']:
+            regressions.append(
+                f'{name}: {result["queries"]} SQL-запросов против '
+                f'{reference["queries"]} в эталоне')
+    return regressions
@@ -0,0 +1,135 @@
+import asyncio
+import datetime
+import hashlib
+import time
+from functools import wraps
+
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+from django.views.decorators.http import condition
+
+from core.asyncdb import db_call
+
+# маркеры живут, пока их не вытеснят; пропавший маркер
+# заводится заново текущим временем. Маркер all входит во все ленты:
+# его трогают массовые команды, которые пишут в обход сигналов
+MARKER_PREFIX = 'feed-changed'
+
+
+def marker(*parts):
+    return ':'.join((MARKER_PREFIX,) + tuple(str(part) for part in parts))
+
+
+def post_markers(author_id, group_id=None):
+    """Маркеры лент, в которых показывается пост"""
+    markers = [marker('index'), marker('profile', author_id)]
+    if group_id is not None:
+        markers.append(marker('group', group_id))
+    return markers
+
+
+def touch(*markers):
+    """Отмечает изменение лент после фиксации транзакции"""
+    transaction.on_commit(
+        lambda: cache.set_many(dict.fromkeys(markers, time.time()), None))
+
+
+def touch_all():
+    """Отмечает изменение всех лент сразу"""
+    touch(marker('all'))
+
+
+def changed_at(markers):
+    """Время последнего изменения среди маркеров"""
+    markers = [marker('all'), *markers]
+    values = cache.get_many(markers)
+    missing = {key: time.time() for key in markers if key not in values}
+    if missing:
+        cache.set_many(missing, None)
+        values.update(missing)
+    return max(values.values()) if values else None
+
+
+def make_etag(request, *parts):
+    """Слабый валидатор из состояния данных, зрителя и адреса страницы"""
+    viewer = request.user.pk if request.user.is_authenticated else None
+    raw = repr((viewer, request.get_full_path()) + parts)
+    return hashlib.md5(raw.encode()).hexdigest()
+
+
+def page_validators(state_func):
+    """Функции ETag и Last-Modified для condition() из state_func.
+
+    Состояние считается один раз на запрос. Last-Modified отдается
+    только анонимам: страница пользователя меняется еще и вместе с ним.
+    """
+    def state(request, **kwargs):
+        if not hasattr(request, '_page_state'):
+            request._page_state = state_func(request, **kwargs)
+        return request._page_state
+
+    def etag(request, *args, **kwargs):
+        page_state = state(request, **kwargs)
+        if page_state is None:
+            return None
+        return make_etag(request, *page_state)
+
+    def last_modified(request, *args, **kwargs):
+        page_state = state(request, **kwargs)
+        if page_state is None or request.user.is_authenticated:
+            return None
+        return datetime.datetime.fromtimestamp(
+            page_state[0], tz=datetime.timezone.utc)
+
+    return etag, last_modified
+
+
+def quoted_validators(request, etag_func, last_modified_func, **kwargs):
+    """ETag в кавычках и Last-Modified в секундах, как в condition()"""
+    res_etag = etag_func(request, **kwargs)
+    modified = last_modified_func(request, **kwargs)
+    return (quote_etag(res_etag) if res_etag is not None else None,
+            int(modified.timestamp()) if modified else None)
+
+
+def async_condition(view, etag_func, last_modified_func):
+    """condition() для async-view: в Django 4.0 он не ждет корутину"""
+    @wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        res_etag, res_last_modified = await db_call(
+            quoted_validators, request, etag_func, last_modified_func,
+            **kwargs)
+        response = get_conditional_response(
+            request, etag=res_etag, last_modified=res_last_modified)
+        if response is not None:
+            return response
+        response = await view(request, *args, **kwargs)
+        if request.method in ('GET', 'HEAD'):
+            if (res_last_modified
+                    and not response.has_header('Last-Modified')):
+                response.headers['Last-Modified'] = http_date(
+                    res_last_modified)
+            if res_etag:
+                response.headers.setdefault('ETag', res_etag)
+        return response
+    return wrapper
+
+
+def conditional_page(state_func):
+    """condition() для страницы, состояние которой дает state_func.
+
+    state_func(request, **kwargs) возвращает кортеж (время изменения,
+    части валидатора) или None, если страницы нет. Подходит и для
+    async-view.
+    """
+    etag, last_modified = page_validators(state_func)
+
+    def decorator(view):
+        if asyncio.iscoroutinefunction(view):
+            return async_condition(view, etag, last_modified)
+        return condition(
+            etag_func=etag, last_modified_func=last_modified)(view)
+
+    return decorator
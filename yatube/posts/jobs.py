@@ -0,0 +1,23 @@
+from jobs.registry import job
+
+from .like_buffer import flush_likes, has_events
+from .thumbnails import generate_thumbnails
+from .trending import rebuild_trending
+
+
+@job('posts.generate_thumbnails')
+def generate_thumbnails_job(post_id):
+    generate_thumbnails(post_id)
+
+
+@job('posts.rebuild_trending')
+def rebuild_trending_job():
+    rebuild_trending()
+
+
+@job('posts.flush_likes')
+def flush_likes_job():
+    # задача ставится каждые LIKE_BUFFER_FLUSH секунд, а клики бывают
+    # не всегда: пустой журнал не стоит блокировок и переименований
+    if has_events():
+        flush_likes()
@@ -0,0 +1,237 @@
+"""Отложенная запись нравликов через журнал на диске.
+
+При LIKE_BUFFER_PATH клик не пишет в базу: желаемое состояние
+дописывается строкой в журнал, а фоновая задача posts.flush_likes
+сворачивает события по (пользователь, пост) и применяет их пачками.
+Пока событие не записано, пользователь видит его через кэш.
+"""
+import fcntl
+import glob
+import os
+import time
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Exists, F, OuterRef
+from django.utils import timezone
+
+from .freshness import post_markers, touch
+from .like_cache import forget_liked_ids
+from .models import Like, Post
+from .trending import trend_change
+
+PENDING_PREFIX = 'like-pending'
+
+
+def buffer_enabled():
+    return bool(settings.LIKE_BUFFER_PATH)
+
+
+def pending_key(user_id, post_id):
+    return f'{PENDING_PREFIX}:{user_id}:{post_id}'
+
+
+def pending_likes(user_id, post_ids):
+    """Еще не записанные нравлики пользователя: {post_id: (liked, delta)}"""
+    if not buffer_enabled() or user_id is None or not post_ids:
+        return {}
+    keys = {pending_key(user_id, post_id): post_id for post_id in post_ids}
+    return {keys[key]: tuple(value)
+            for key, value in cache.get_many(keys).items()}
+
+
+def append_event(user_id, post_id, liked):
+    """Дописывает событие в журнал.
+
+    Запись идет под разделяемой блокировкой; если журнал успели
+    переименовать в пачку, файл открывается заново, чтобы событие
+    не попало в уже прочитанную пачку.
+    """
+    path = settings.LIKE_BUFFER_PATH
+    line = f'{user_id} {post_id} {int(liked)}\n'.encode()
+    while True:
+        fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_SH)
+            try:
+                current = os.stat(path).st_ino
+            except FileNotFoundError:
+                continue
+            if os.fstat(fd).st_ino != current:
+                continue
+            os.write(fd, line)
+            return
+        finally:
+            os.close(fd)
+
+
+def buffer_like(user, post, liked=None):
+    """set_like для буферного режима: только чтение базы и запись в журнал"""
+    key = pending_key(user.id, post.id)
+    like_count, stored = Post.objects.filter(id=post.id).annotate(
+        liked=Exists(Like.objects.filter(user_id=user.id,
+                                         post_id=OuterRef('id'))),
+    ).values_list('like_count', 'liked').get()
+    pending = cache.get(key)
+    current = pending[0] if pending else stored
+    if liked is None:
+        liked = not current
+    delta = int(liked) - int(stored)
+    if liked != current:
+        append_event(user.id, post.id, liked)
+        cache.set(key, (liked, delta), settings.LIKE_BUFFER_PENDING_TIMEOUT)
+        # иначе ETag ленты не изменится и браузер покажет старое сердечко
+        touch(*post_markers(post.author_id, post.group_id))
+    return liked, like_count + delta
+
+
+def read_events(path):
+    with open(path) as events:
+        for line in events:
+            parts = line.split()
+            if len(parts) == 3:
+                yield int(parts[0]), int(parts[1]), parts[2] == '1'
+
+
+def fold_events(events):
+    """Последнее состояние по каждой паре (пользователь, пост)"""
+    folded = {}
+    for user_id, post_id, liked in events:
+        folded[(user_id, post_id)] = liked
+    return folded
+
+
+def apply_batch(states):
+    """Применяет свернутые состояния одной транзакцией.
+
+    Счетчик поста меняется на число реально добавленных и удаленных
+    строк, одним UPDATE на пост. Пары удаленных постов и
+    пользователей пропускаются.
+    """
+    user_ids = {user_id for user_id, _ in states}
+    posts = {
+        row['id']: row for row in Post.objects.filter(
+            id__in={post_id for _, post_id in states}
+        ).values('id', 'author_id', 'group_id')
+    }
+    users = set(get_user_model().objects.filter(
+        id__in=user_ids).values_list('id', flat=True))
+    states = {pair: liked for pair, liked in states.items()
+              if pair[0] in users and pair[1] in posts}
+    existing = {
+        (user_id, post_id): created
+        for user_id, post_id, created in Like.objects.filter(
+            user_id__in=user_ids, post_id__in=posts,
+        ).values_list('user_id', 'post_id', 'created')
+    }
+    inserted = [pair for pair, liked in states.items()
+                if liked and pair not in existing]
+    deleted = defaultdict(list)
+    for (user_id, post_id), liked in states.items():
+        if not liked and (user_id, post_id) in existing:
+            deleted[post_id].append(user_id)
+
+    added = Counter(post_id for _, post_id in inserted)
+    Like.objects.bulk_create(
+        [Like(user_id=user_id, post_id=post_id)
+         for user_id, post_id in inserted], ignore_conflicts=True)
+    for post_id, post_users in deleted.items():
+        Like.objects.filter(post_id=post_id, user_id__in=post_users).delete()
+
+    changed_users = {user_id for user_id, _ in inserted}
+    changed_users.update(*deleted.values())
+    if changed_users:
+        transaction.on_commit(lambda: forget_liked_ids(*changed_users))
+
+    markers = set()
+    now = timezone.now()
+    for post_id in added.keys() | deleted.keys():
+        # вклад снятого нравлика считается на момент его постановки
+        removed = [existing[(user_id, post_id)]
+                   for user_id in deleted.get(post_id, ())]
+        Post.objects.filter(id=post_id).update(
+            like_count=F('like_count') + added[post_id] - len(removed),
+            trend_score=trend_change(
+                settings.TRENDING_LIKE_WEIGHT, added[post_id], removed),
+            version=F('version') + 1,
+            modified_at=now)
+        post = posts[post_id]
+        markers.update(post_markers(post['author_id'], post['group_id']))
+    if markers:
+        touch(*markers)
+    return len(inserted), sum(map(len, deleted.values()))
+
+
+def forget_pending(states):
+    """Убирает из кэша ожидание, если оно совпадает с записанным"""
+    keys = {pending_key(*pair): liked for pair, liked in states.items()}
+    stale = [key for key, value in cache.get_many(keys).items()
+             if value[0] == keys[key]]
+    cache.delete_many(stale)
+
+
+def apply_events(events):
+    """Сворачивает события и применяет их пачками по LIKE_BUFFER_BATCH"""
+    folded = list(fold_events(events).items())
+    stats = Counter(pairs=len(folded))
+    for start in range(0, len(folded), settings.LIKE_BUFFER_BATCH):
+        states = dict(folded[start:start + settings.LIKE_BUFFER_BATCH])
+        with transaction.atomic():
+            inserted, deleted = apply_batch(states)
+        forget_pending(states)
+        stats.update(inserted=inserted, deleted=deleted)
+    return stats
+
+
+def rotate(path):
+    """Переименовывает журнал в пачку, дождавшись текущих записей"""
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except FileNotFoundError:
+        return
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX)
+        os.rename(path, f'{path}.{time.time_ns()}.batch')
+    finally:
+        os.close(fd)
+
+
+def has_events():
+    """Есть ли что сбрасывать: непустой журнал или оставшиеся пачки"""
+    path = settings.LIKE_BUFFER_PATH
+    try:
+        if os.path.getsize(path):
+            return True
+    except FileNotFoundError:
+        pass
+    return bool(glob.glob(f'{glob.escape(path)}.*.batch'))
+
+
+def flush_likes():
+    """Применяет накопленные события; None, если уже идет другой сброс.
+
+    Пачки, оставшиеся после сбоя, применяются повторно: вставка и
+    удаление идемпотентны, поэтому счетчики от этого не сбиваются.
+    """
+    path = settings.LIKE_BUFFER_PATH
+    if not path:
+        return None
+    lock_fd = os.open(f'{path}.lock', os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        try:
+            fcntl.flock(lock_fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            return None
+        rotate(path)
+        stats = Counter()
+        for batch in sorted(glob.glob(f'{glob.escape(path)}.*.batch')):
+            events = list(read_events(batch))
+            stats.update(apply_events(events))
+            stats['events'] += len(events)
+            os.remove(batch)
+        return stats
+    finally:
+        os.close(lock_fd)
@@ -0,0 +1,74 @@
+"""Кэш нравликов пользователя: отсортированный массив id постов.
+
+Массив грузится одним запросом при первой странице и лежит в кэше
+по 4 байта на нравлик; отметки для страницы считаются бинарным
+поиском в памяти, без запроса к Like.
+"""
+from array import array
+from bisect import bisect_left
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .models import Like
+
+LIKED_PREFIX = 'liked-ids'
+TYPECODE = 'I'
+
+
+def liked_key(user_id):
+    return f'{LIKED_PREFIX}:{user_id}'
+
+
+def unpack(raw):
+    ids = array(TYPECODE)
+    ids.frombytes(raw)
+    return ids
+
+
+def contains(ids, post_id):
+    index = bisect_left(ids, post_id)
+    return index < len(ids) and ids[index] == post_id
+
+
+def load_liked_ids(user_id):
+    """Все id постов, которые нравятся пользователю, по возрастанию"""
+    raw = cache.get(liked_key(user_id))
+    if raw is not None:
+        return unpack(raw)
+    ids = array(TYPECODE, Like.objects.filter(user_id=user_id).order_by(
+        'post_id').values_list('post_id', flat=True))
+    cache.set(liked_key(user_id), ids.tobytes(), settings.LIKED_IDS_TIMEOUT)
+    return ids
+
+
+def liked_among(user_id, post_ids):
+    """Какие из post_ids нравятся пользователю"""
+    ids = load_liked_ids(user_id)
+    return {post_id for post_id in post_ids if contains(ids, post_id)}
+
+
+def update_liked_ids(user_id, post_id, liked):
+    """Вставляет или убирает один id, не перечитывая нравлики.
+
+    Одновременные клики одного пользователя могут потерять правку;
+    тогда сердечко покажет старое состояние, а следующий клик по
+    нему пришлет то же liked и исправит массив.
+    """
+    raw = cache.get(liked_key(user_id))
+    if raw is None:
+        return
+    ids = unpack(raw)
+    index = bisect_left(ids, post_id)
+    present = index < len(ids) and ids[index] == post_id
+    if liked == present:
+        return
+    if liked:
+        ids.insert(index, post_id)
+    else:
+        del ids[index]
+    cache.set(liked_key(user_id), ids.tobytes(), settings.LIKED_IDS_TIMEOUT)
+
+
+def forget_liked_ids(*user_ids):
+    cache.delete_many([liked_key(user_id) for user_id in user_ids])
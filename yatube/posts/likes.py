@@ -0,0 +1,90 @@
+from django.conf import settings
+from django.db import connections, router, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .freshness import post_markers, touch
+from .like_buffer import buffer_enabled, buffer_like
+from .like_cache import update_liked_ids
+from .models import Like, Post
+from .trending import trend_change
+
+
+def insert_like(using, user_id, post_id):
+    """INSERT … ON CONFLICT DO NOTHING; True, если строка добавлена"""
+    connection = connections[using]
+    quote = connection.ops.quote_name
+    meta = Like._meta
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'INSERT INTO {quote(meta.db_table)} '
+            f'({quote(meta.get_field("user").column)}, '
+            f'{quote(meta.get_field("post").column)}, '
+            f'{quote(meta.get_field("created").column)}) '
+            f'VALUES (%s, %s, %s) ON CONFLICT DO NOTHING',
+            [user_id, post_id,
+             connection.ops.adapt_datetimefield_value(timezone.now())],
+        )
+        return cursor.rowcount == 1
+
+
+def delete_like(using, user_id, post_id):
+    """DELETE нравлика; True, если строка была.
+
+    Мимо ORM, как и вставка: сигнал post_delete сбросил бы кэш
+    нравликов, который set_like правит на месте.
+    """
+    connection = connections[using]
+    quote = connection.ops.quote_name
+    meta = Like._meta
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'DELETE FROM {quote(meta.db_table)} '
+            f'WHERE {quote(meta.get_field("user").column)} = %s '
+            f'AND {quote(meta.get_field("post").column)} = %s',
+            [user_id, post_id],
+        )
+        return cursor.rowcount == 1
+
+
+def set_like(user, post, liked=None):
+    """Ставит (liked=True) или снимает нравлик, None — переключает.
+
+    Вставка пропускает конфликт с unique_like, а удаление сообщает,
+    была ли строка, поэтому одновременные клики не падают на
+    ограничении и не сбивают счетчик: он меняется только на реально
+    добавленную или удаленную строку. Возвращает (нравится ли пост
+    теперь, число нравликов). С LIKE_BUFFER_PATH клик только
+    попадает в журнал, см. like_buffer.
+    """
+    if buffer_enabled():
+        return buffer_like(user, post, liked)
+    using = router.db_for_write(Like)
+    with transaction.atomic(using=using):
+        if not liked:
+            # когда поставлен нравлик: отмена снимает его вклад в очки
+            created = Like.objects.using(using).filter(
+                user_id=user.id, post_id=post.id,
+            ).values_list('created', flat=True).first()
+            if liked is None:
+                liked = created is None
+        if liked:
+            delta = int(insert_like(using, user.id, post.id))
+            change = {'added': delta}
+        else:
+            delta = -int(delete_like(using, user.id, post.id))
+            # строка, появившаяся после чтения, поставлена только что
+            change = {'removed': [created or timezone.now()]}
+        posts = Post.objects.using(using).filter(id=post.id)
+        if delta:
+            posts.update(
+                like_count=F('like_count') + delta,
+                trend_score=trend_change(
+                    settings.TRENDING_LIKE_WEIGHT, **change),
+                version=F('version') + 1,
+                modified_at=timezone.now())
+            touch(*post_markers(post.author_id, post.group_id))
+        like_count = posts.values_list('like_count', flat=True).get()
+        transaction.on_commit(
+            lambda: update_liked_ids(user.id, post.id, liked), using=using)
+    return liked, like_count
@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from posts.freshness import touch_all
+from posts.models import Follow, TimelineEntry
+from posts.timeline import add_author_posts
+
+
+class Command(BaseCommand):
+    help = 'Заполняет ленты подписок по существующим подпискам и постам'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--clear',
+            action='store_true',
+            help='Удалить существующие записи лент перед заполнением',
+        )
+
+    def handle(self, *args, **options):
+        if options['clear']:
+            TimelineEntry.objects.all().delete()
+        follows = (
+            Follow.objects.filter(user__isnull=False, author__isnull=False)
+            .values_list('user_id', 'author_id')
+            .iterator()
+        )
+        amount = 0
+        for user_id, author_id in follows:
+            with transaction.atomic():
+                add_author_posts(user_id, author_id)
+            amount += 1
+        touch_all()
+        self.stdout.write(
+            self.style.SUCCESS(f'Обработано подписок: {amount}'))
@@ -0,0 +1,135 @@
+import json
+import os
+import random
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DatabaseError, connection
+from django.db.models import Count, F
+from django.test import override_settings
+
+from posts.bench import percentiles
+from posts.like_buffer import flush_likes
+from posts.likes import set_like
+from posts.models import Post, User
+
+
+class Command(BaseCommand):
+    help = ('Сравнивает запись нравликов сразу в базу и через журнал '
+            'при обычной и в разы большей конкурентности')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--clicks', type=int, default=2000,
+            help='Сколько кликов сделать в каждом прогоне')
+        parser.add_argument(
+            '--concurrency', type=int, default=8,
+            help='Сколько кликов идет одновременно в обычном режиме')
+        parser.add_argument(
+            '--factor', type=int, default=10,
+            help='Во сколько раз больше одновременных кликов при всплеске')
+        parser.add_argument(
+            '--hot-posts', type=int, default=5,
+            help='На сколько постов сыплются клики')
+        parser.add_argument('--output', help='Куда записать JSON с итогами')
+
+    def click(self, users, posts, amount, threads):
+        """Клики случайных пользователей по горячим постам в threads потоках"""
+        lock = threading.Lock()
+        left = [amount]
+        samples = []
+        errors = [0]
+
+        def worker():
+            try:
+                while True:
+                    with lock:
+                        if not left[0]:
+                            return
+                        left[0] -= 1
+                    user, post = random.choice(users), random.choice(posts)
+                    start = time.perf_counter()
+                    try:
+                        set_like(user, post)
+                    except DatabaseError:
+                        with lock:
+                            errors[0] += 1
+                        continue
+                    with lock:
+                        samples.append(time.perf_counter() - start)
+            finally:
+                connection.close()
+
+        with ThreadPoolExecutor(threads) as pool:
+            for future in [pool.submit(worker) for _ in range(threads)]:
+                future.result()
+        return samples, errors[0]
+
+    def report(self, mode, threads, samples, errors, duration, flush=0):
+        result = {
+            'threads': threads,
+            'clicks': len(samples),
+            'errors': errors,
+            'clicks_per_sec': round(len(samples) / duration, 1),
+            'flush_sec': round(flush, 3),
+            **(percentiles(samples) if samples else {}),
+        }
+        self.stdout.write(
+            f'{mode:<8} x{threads:<4} {result["clicks_per_sec"]:>9} клик/с  '
+            f'p95 {result.get("p95", "-"):>8} мс  ошибок {errors:>4}  '
+            f'сброс {result["flush_sec"]} с')
+        return result
+
+    def check_counts(self, posts):
+        """Счетчики горячих постов совпадают с таблицей Like"""
+        return not Post.objects.filter(
+            id__in=[post.id for post in posts],
+        ).annotate(actual=Count('post_like')).exclude(
+            like_count=F('actual')).exists()
+
+    def handle(self, *args, **options):
+        users = list(User.objects.only('id')[:1000])
+        posts = list(Post.objects.only('id', 'author_id', 'group_id')
+                     .order_by('id')[:options['hot_posts']])
+        if len(users) < 2 or not posts:
+            raise CommandError('База пуста, сначала запустите seed_bench')
+        amount = options['clicks']
+        base = options['concurrency']
+        results = {}
+
+        for threads in (base, base * options['factor']):
+            start = time.perf_counter()
+            samples, errors = self.click(users, posts, amount, threads)
+            results[f'direct_{threads}'] = self.report(
+                'direct', threads, samples, errors,
+                time.perf_counter() - start)
+
+        with tempfile.TemporaryDirectory() as spool, override_settings(
+                LIKE_BUFFER_PATH=os.path.join(spool, 'likes.log')):
+            for threads in (base, base * options['factor']):
+                start = time.perf_counter()
+                samples, errors = self.click(users, posts, amount, threads)
+                ingested = time.perf_counter()
+                flush_likes()
+                flushed = time.perf_counter()
+                results[f'buffered_{threads}'] = self.report(
+                    'buffered', threads, samples, errors,
+                    ingested - start, flushed - ingested)
+
+        burst = base * options['factor']
+        speedup = (results[f'buffered_{burst}']['clicks_per_sec']
+                   / max(results[f'direct_{burst}']['clicks_per_sec'], 0.1))
+        consistent = self.check_counts(posts)
+        self.stdout.write(self.style.SUCCESS(
+            f'При x{burst} журнал принимает клики в {speedup:.2f} раза '
+            f'быстрее; счетчики '
+            f'{"сходятся" if consistent else "НЕ сходятся"} с таблицей'))
+        if options['output']:
+            with open(options['output'], 'w') as output:
+                json.dump({**results, 'consistent': consistent, 'options': {
+                    key: options[key] for key in (
+                        'clicks', 'concurrency', 'factor', 'hot_posts')
+                }}, output, indent=2)
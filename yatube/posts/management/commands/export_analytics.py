@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand
+
+from posts.analytics import REPORTS, stream_csv, write_parquet
+
+
+class Command(BaseCommand):
+    help = ('Выгружает сводку по постам или авторам: нравлики, '
+            'комментарии и частоту публикаций')
+
+    def add_arguments(self, parser):
+        parser.add_argument('report', choices=sorted(REPORTS))
+        parser.add_argument(
+            'path', help='Файл отчета; .parquet пишется в Parquet')
+        parser.add_argument(
+            '--format', choices=('csv', 'parquet'),
+            help='Формат независимо от расширения файла')
+        parser.add_argument(
+            '--chunk-size', type=int,
+            help='Сколько постов или авторов читать за один запрос')
+
+    def handle(self, *args, **options):
+        path, report = options['path'], options['report']
+        output_format = options['format'] or (
+            'parquet' if path.endswith('.parquet') else 'csv')
+        if output_format == 'parquet':
+            amount = write_parquet(
+                report, path, chunk_size=options['chunk_size'])
+        else:
+            with open(path, 'w', encoding='utf-8', newline='') as output:
+                amount = -1  # без строки заголовка
+                for line in stream_csv(
+                        report, chunk_size=options['chunk_size']):
+                    output.write(line)
+                    amount += 1
+        self.stdout.write(self.style.SUCCESS(
+            f'{report}: {amount} строк записано в {path}'))
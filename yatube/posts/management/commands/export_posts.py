@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand
+
+from posts.transfer import (EXPORT_ORDER, dump_record, export_querysets,
+                            open_jsonl)
+
+
+class Command(BaseCommand):
+    help = ('Выгружает группы, посты, комментарии, нравлики и подписки '
+            'в JSONL, по строке на запись')
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Файл выгрузки, .gz сжимается')
+        parser.add_argument(
+            '--gzip', action='store_true', default=None,
+            help='Сжать gzip независимо от расширения')
+        parser.add_argument(
+            '--chunk-size', type=int, default=2000,
+            help='Сколько строк читать из базы за раз')
+
+    def handle(self, *args, **options):
+        querysets = export_querysets()
+        with open_jsonl(options['path'], 'w', options['gzip']) as output:
+            for model_name in EXPORT_ORDER:
+                amount = 0
+                rows = querysets[model_name].order_by('pk').iterator(
+                    chunk_size=options['chunk_size'])
+                for values in rows:
+                    output.write(dump_record(model_name, values) + '\n')
+                    amount += 1
+                self.stdout.write(f'{model_name}: {amount}')
+        self.stdout.write(self.style.SUCCESS(
+            f'Выгрузка записана в {options["path"]}'))
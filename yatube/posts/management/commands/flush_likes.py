@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from posts.like_buffer import flush_likes
+
+
+class Command(BaseCommand):
+    help = 'Записывает нравлики из журнала в базу, не дожидаясь задачи'
+
+    def handle(self, *args, **options):
+        stats = flush_likes()
+        if stats is None:
+            raise CommandError(
+                'Буфер выключен (LIKE_BUFFER_PATH) или уже сбрасывается')
+        self.stdout.write(self.style.SUCCESS(
+            f'Событий: {stats["events"]}, пар: {stats["pairs"]}, '
+            f'добавлено: {stats["inserted"]}, удалено: {stats["deleted"]}'))
@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+
+from posts.models import Post
+from posts.thumbnails import generate_thumbnails
+
+
+class Command(BaseCommand):
+    help = 'Нарезает миниатюры для постов с картинками'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--all',
+            action='store_true',
+            help='Перенарезать миниатюры и у постов, где они уже есть',
+        )
+
+    def handle(self, *args, **options):
+        posts = Post.objects.exclude(image='').exclude(image__isnull=True)
+        if not options['all']:
+            posts = posts.filter(thumbnails={})
+        amount = 0
+        for post_id in posts.values_list('id', flat=True).iterator():
+            generate_thumbnails(post_id)
+            amount += 1
+        self.stdout.write(
+            self.style.SUCCESS(f'Обработано постов: {amount}'))
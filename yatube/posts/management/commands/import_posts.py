@@ -0,0 +1,196 @@
+import json
+from collections import Counter
+from operator import attrgetter
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils.dateparse import parse_datetime
+
+from posts.freshness import touch_all
+from posts.like_cache import forget_liked_ids
+from posts.models import Comment, Follow, Group, Like, Post
+from posts.transfer import open_jsonl, preserve_dates
+
+User = get_user_model()
+
+# по этим полям узнаются уже загруженные посты и комментарии: id из
+# файла принадлежат другой базе, а повторная загрузка не должна дублировать
+POST_KEY = ('author_id', 'pub_date', 'text')
+COMMENT_KEY = ('post_id', 'author_id', 'pub_date', 'text')
+
+
+class Command(BaseCommand):
+    help = ('Загружает выгрузку export_posts пачками bulk_create, '
+            'каждая пачка в своей транзакции')
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Файл выгрузки, .gz распаковывается')
+        parser.add_argument(
+            '--gzip', action='store_true', default=None,
+            help='Читать как gzip независимо от расширения')
+        parser.add_argument(
+            '--batch-size', type=int, default=5000,
+            help='Сколько записей вставлять одной транзакцией')
+        parser.add_argument(
+            '--skip-rebuild', action='store_true',
+            help='Не пересчитывать нравлики, ленты и счетчики авторов')
+
+    def handle(self, *args, **options):
+        self.users = dict(User.objects.values_list('username', 'id'))
+        self.groups = dict(Group.objects.values_list('slug', 'id'))
+        # id поста в файле -> id в этой базе
+        self.posts = {}
+        self.unusable_password = make_password(None)
+        self.loaded = Counter()
+        self.skipped = Counter()
+        loaders = {
+            'group': self.load_groups,
+            'post': self.load_posts,
+            'comment': self.load_comments,
+            'like': self.load_likes,
+            'follow': self.load_follows,
+        }
+
+        batch, batch_model = [], None
+        with open_jsonl(options['path'], 'r', options['gzip']) as source, \
+                preserve_dates(Post, Comment):
+            for number, line in enumerate(source, 1):
+                if not line.strip():
+                    continue
+                record = json.loads(line)
+                model_name = record.pop('model', None)
+                if model_name not in loaders:
+                    raise CommandError(
+                        f'Строка {number}: неизвестный тип {model_name!r}')
+                if batch and (model_name != batch_model
+                              or len(batch) >= options['batch_size']):
+                    self.flush(loaders[batch_model], batch)
+                    batch = []
+                batch_model = model_name
+                batch.append(record)
+            if batch:
+                self.flush(loaders[batch_model], batch)
+
+        for model_name, amount in self.loaded.items():
+            skipped = self.skipped[model_name]
+            self.stdout.write(f'{model_name}: {amount}'
+                              + (f', пропущено {skipped}' if skipped else ''))
+        if not options['skip_rebuild']:
+            # bulk_create не шлет сигналы, производные данные пересобираем
+            call_command('rebuild_like_counts', stdout=self.stdout)
+            call_command('backfill_timelines', stdout=self.stdout)
+            call_command('reconcile_author_stats', stdout=self.stdout)
+        touch_all()
+        self.stdout.write(self.style.SUCCESS('Загрузка завершена'))
+
+    def flush(self, loader, records):
+        with transaction.atomic():
+            loader(records)
+
+    def resolve_users(self, names):
+        """Заводит недостающих пользователей без пароля"""
+        missing = {name for name in names if name not in self.users}
+        if not missing:
+            return
+        User.objects.bulk_create(
+            [User(username=name, password=self.unusable_password)
+             for name in missing],
+            ignore_conflicts=True)
+        self.users.update(User.objects.filter(
+            username__in=missing).values_list('username', 'id'))
+
+    def load_groups(self, records):
+        new = [Group(slug=record['slug'], title=record['title'],
+                     description=record['description'])
+               for record in records if record['slug'] not in self.groups]
+        Group.objects.bulk_create(new, ignore_conflicts=True)
+        self.groups.update(Group.objects.filter(
+            slug__in=[group.slug for group in new]
+        ).values_list('slug', 'id'))
+        self.loaded['group'] += len(new)
+        self.skipped['group'] += len(records) - len(new)
+
+    def load_posts(self, records):
+        self.resolve_users(record['author_name'] for record in records)
+        posts = []
+        for record in records:
+            pub_date = parse_datetime(record['pub_date'])
+            posts.append(Post(
+                author_id=self.users[record['author_name']],
+                group_id=self.groups.get(record['group_slug']),
+                text=record['text'],
+                image=record['image'] or None,
+                pub_date=pub_date,
+                modified_at=pub_date,
+            ))
+        key = attrgetter(*POST_KEY)
+        existing = self.existing_ids(Post, posts, POST_KEY)
+        created = Post.objects.bulk_create(
+            [post for post in posts if key(post) not in existing])
+        if created and created[0].pk is None:
+            raise CommandError('База не возвращает id из bulk_create')
+        for record, post in zip(records, posts):
+            self.posts[record['id']] = existing.get(key(post), post.pk)
+        self.loaded['post'] += len(created)
+        self.skipped['post'] += len(posts) - len(created)
+
+    def load_comments(self, records):
+        records = self.known_posts('comment', records)
+        self.resolve_users(record['author_name'] for record in records)
+        comments = []
+        for record in records:
+            pub_date = parse_datetime(record['pub_date'])
+            comments.append(Comment(
+                post_id=self.posts[record['post_id']],
+                author_id=self.users[record['author_name']],
+                text=record['text'],
+                pub_date=pub_date,
+                modified_at=pub_date,
+            ))
+        key = attrgetter(*COMMENT_KEY)
+        existing = self.existing_ids(Comment, comments, COMMENT_KEY)
+        created = Comment.objects.bulk_create(
+            [comment for comment in comments if key(comment) not in existing])
+        self.loaded['comment'] += len(created)
+        self.skipped['comment'] += len(comments) - len(created)
+
+    def load_likes(self, records):
+        records = self.known_posts('like', records)
+        self.resolve_users(record['user_name'] for record in records)
+        Like.objects.bulk_create(
+            [Like(user_id=self.users[record['user_name']],
+                  post_id=self.posts[record['post_id']])
+             for record in records],
+            ignore_conflicts=True)
+        # bulk_create не шлет post_save, кэш нравликов сбрасываем сами
+        user_ids = {self.users[record['user_name']] for record in records}
+        transaction.on_commit(lambda: forget_liked_ids(*user_ids))
+        self.loaded['like'] += len(records)
+
+    def load_follows(self, records):
+        self.resolve_users(
+            name for record in records
+            for name in (record['user_name'], record['author_name']))
+        Follow.objects.bulk_create(
+            [Follow(user_id=self.users[record['user_name']],
+                    author_id=self.users[record['author_name']])
+             for record in records],
+            ignore_conflicts=True)
+        self.loaded['follow'] += len(records)
+
+    def existing_ids(self, model, objs, fields):
+        """id уже лежащих в базе строк из objs: {значения fields: id}"""
+        lookups = {f'{field}__in': {getattr(obj, field) for obj in objs}
+                   for field in fields if field != 'text'}
+        rows = model.objects.filter(**lookups).values_list(*fields, 'id')
+        return {row[:-1]: row[-1] for row in rows}
+
+    def known_posts(self, model_name, records):
+        """Отбрасывает записи о постах, которых не было в загрузке"""
+        known = [record for record in records
+                 if record['post_id'] in self.posts]
+        self.skipped[model_name] += len(records) - len(known)
+        return known
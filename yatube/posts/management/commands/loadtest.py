@@ -0,0 +1,165 @@
+import asyncio
+import itertools
+import json
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.test import AsyncClient, Client, override_settings
+from django.urls import reverse
+
+from posts.bench import percentiles
+from posts.models import Follow, Post
+
+WSGI_URLS = 'yatube.urls'
+ASGI_URLS = 'yatube.urls_async'
+
+
+class SlowDatabase:
+    """Обертка execute, добавляющая к каждому запросу задержку сети"""
+
+    def __init__(self, latency):
+        self.latency = latency
+
+    def __call__(self, execute, sql, params, many, context):
+        time.sleep(self.latency)
+        return execute(sql, params, many, context)
+
+    def install(self, connection, **kwargs):
+        if self not in connection.execute_wrappers:
+            connection.execute_wrappers.append(self)
+
+
+class Command(BaseCommand):
+    help = ('Сравнивает пропускную способность лент под WSGI и ASGI '
+            'при медленной базе')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--requests', type=int, default=300,
+            help='Сколько запросов сделать в каждом режиме')
+        parser.add_argument(
+            '--concurrency', type=int, default=32,
+            help='Сколько запросов одновременно держат клиенты')
+        parser.add_argument(
+            '--wsgi-threads', type=int, default=4,
+            help='Потоков у WSGI-сервера, как --threads у gunicorn')
+        parser.add_argument(
+            '--db-latency', type=float, default=20,
+            help='Задержка каждого SQL-запроса в миллисекундах')
+        parser.add_argument('--output', help='Куда записать JSON с итогами')
+
+    def paths(self, urlconf):
+        """Адреса пяти лент по данным из seed_bench"""
+        follow = Follow.objects.select_related('user').first()
+        post = Post.objects.filter(group__isnull=False).select_related(
+            'author', 'group').first()
+        if follow is None or post is None:
+            raise CommandError('База пуста, сначала запустите seed_bench')
+        self.reader = follow.user
+        return [
+            reverse('posts:index', urlconf=urlconf),
+            reverse('posts:group_list', kwargs={'slug': post.group.slug},
+                    urlconf=urlconf),
+            reverse('posts:profile',
+                    kwargs={'username': post.author.username},
+                    urlconf=urlconf),
+            reverse('posts:post_detail', kwargs={'post_id': post.id},
+                    urlconf=urlconf),
+            reverse('posts:follow_index', urlconf=urlconf),
+        ]
+
+    def login(self, client):
+        client.force_login(self.reader)
+        return client
+
+    def run_wsgi(self, paths, amount, threads):
+        """Синхронные view в пуле потоков, как у многопоточного сервера"""
+        clients = queue.Queue()
+        for _ in range(threads):
+            clients.put(self.login(Client()))
+        local = threading.local()
+
+        def send(path):
+            if not hasattr(local, 'client'):
+                local.client = clients.get_nowait()
+            start = time.perf_counter()
+            response = local.client.get(path)
+            self.expect_ok(path, response)
+            return time.perf_counter() - start
+
+        with ThreadPoolExecutor(threads) as pool:
+            return list(pool.map(
+                send, itertools.islice(itertools.cycle(paths), amount)))
+
+    async def run_asgi(self, paths, amount, clients):
+        """Async-view: каждый клиент держит по запросу в цикле событий"""
+        pending = itertools.islice(itertools.cycle(paths), amount)
+        samples = []
+
+        async def worker(client):
+            for path in pending:
+                start = time.perf_counter()
+                response = await client.get(path)
+                self.expect_ok(path, response)
+                samples.append(time.perf_counter() - start)
+
+        await asyncio.gather(*(worker(client) for client in clients))
+        return samples
+
+    def expect_ok(self, path, response):
+        if response.status_code != 200:
+            raise CommandError(f'{path} ответил {response.status_code}')
+
+    def report(self, mode, samples, duration):
+        result = {
+            'requests': len(samples),
+            'rps': round(len(samples) / duration, 1),
+            **percentiles(samples),
+        }
+        self.stdout.write(
+            f'{mode:<5} {result["rps"]:>8} запр/с  '
+            f'p50 {result["p50"]:>8} мс  p95 {result["p95"]:>8} мс')
+        return result
+
+    def handle(self, *args, **options):
+        slow = SlowDatabase(options['db_latency'] / 1000)
+        connection_created.connect(slow.install)
+        for connection in connections.all():
+            slow.install(connection)
+        amount = options['requests']
+        results = {}
+
+        with override_settings(ROOT_URLCONF=WSGI_URLS):
+            paths = self.paths(WSGI_URLS)
+            self.run_wsgi(paths, len(paths), options['wsgi_threads'])
+            start = time.perf_counter()
+            samples = self.run_wsgi(paths, amount, options['wsgi_threads'])
+            results['wsgi'] = self.report(
+                'wsgi', samples, time.perf_counter() - start)
+
+        with override_settings(ROOT_URLCONF=ASGI_URLS):
+            paths = self.paths(ASGI_URLS)
+            # вход пишет сессию, поэтому клиенты готовятся до цикла событий
+            clients = [self.login(AsyncClient())
+                       for _ in range(options['concurrency'])]
+            asyncio.run(self.run_asgi(paths, len(paths), clients[:1]))
+            start = time.perf_counter()
+            samples = asyncio.run(self.run_asgi(paths, amount, clients))
+            results['asgi'] = self.report(
+                'asgi', samples, time.perf_counter() - start)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'ASGI быстрее WSGI в '
+            f'{results["asgi"]["rps"] / results["wsgi"]["rps"]:.2f} раза'))
+        if options['output']:
+            with open(options['output'], 'w') as output:
+                json.dump({**results, 'options': {
+                    key: options[key] for key in (
+                        'requests', 'concurrency', 'wsgi_threads',
+                        'db_latency')
+                }}, output, indent=2)
@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from posts.freshness import touch_all
+from posts.models import Like, Post
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает счетчики нравликов постов по таблице Like'
+
+    def handle(self, *args, **options):
+        like_amount = (
+            Like.objects.filter(post=OuterRef('pk'))
+            .order_by()
+            .values('post')
+            .annotate(amount=Count('id'))
+            .values('amount')
+        )
+        with transaction.atomic():
+            updated = Post.objects.update(
+                like_count=Coalesce(Subquery(like_amount), 0))
+        touch_all()
+        self.stdout.write(
+            self.style.SUCCESS(f'Пересчитано постов: {updated}'))
@@ -0,0 +1,51 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from posts.models import Post
+from posts.search import FTS_TABLE, fts_available
+
+
+class Command(BaseCommand):
+    help = 'Переиндексирует тексты постов в полнотекстовом индексе FTS5'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=5000,
+            help='Сколько постов индексировать в одной транзакции',
+        )
+
+    def handle(self, *args, **options):
+        if not fts_available():
+            raise CommandError('Полнотекстовый индекс есть только в SQLite')
+        post_table = connection.ops.quote_name(Post._meta.db_table)
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(
+                f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('delete-all')")
+        last_id = 0
+        indexed = 0
+        while True:
+            with transaction.atomic(), connection.cursor() as cursor:
+                cursor.execute(
+                    f'SELECT max(id), count(*) FROM (SELECT id FROM '
+                    f'{post_table} WHERE id > %s ORDER BY id LIMIT %s)',
+                    [last_id, options['batch_size']],
+                )
+                batch_last_id, amount = cursor.fetchone()
+                if not amount:
+                    break
+                cursor.execute(
+                    f'INSERT INTO {FTS_TABLE}(rowid, text) '
+                    f'SELECT id, text FROM {post_table} '
+                    f'WHERE id > %s AND id <= %s',
+                    [last_id, batch_last_id],
+                )
+            last_id = batch_last_id
+            indexed += amount
+            self.stdout.write(f'Проиндексировано постов: {indexed}')
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('optimize')")
+        self.stdout.write(self.style.SUCCESS(
+            f'Индекс перестроен, постов: {indexed}'))
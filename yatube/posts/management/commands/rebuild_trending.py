@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+
+from posts.trending import rebuild_trending
+
+
+class Command(BaseCommand):
+    help = 'Собирает топ популярных постов сейчас, не дожидаясь задачи'
+
+    def handle(self, *args, **options):
+        top = rebuild_trending()
+        self.stdout.write(
+            self.style.SUCCESS(f'Постов в топе: {len(top)}'))
@@ -0,0 +1,36 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import F
+
+from posts.freshness import touch_all
+from posts.models import AuthorStats
+from posts.stats import STATS_FIELDS, actual_counts
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = 'Сверяет счетчики авторов с таблицами и чинит расхождения'
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            missing = User.objects.filter(stats__isnull=True).values_list(
+                'id', flat=True)
+            created = AuthorStats.objects.bulk_create(
+                [AuthorStats(user_id=user_id) for user_id in missing],
+                ignore_conflicts=True)
+            actual = actual_counts()
+            drifted = (
+                AuthorStats.objects
+                .annotate(**{f'actual_{field}': actual[field]
+                             for field in STATS_FIELDS})
+                .exclude(**{field: F(f'actual_{field}')
+                            for field in STATS_FIELDS})
+                .count()
+            )
+            AuthorStats.objects.update(**actual)
+            touch_all()
+        self.stdout.write(self.style.SUCCESS(
+            f'Создано записей: {len(created)}, '
+            f'исправлено расхождений: {drifted}'))
@@ -0,0 +1,116 @@
+import json
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test import Client
+from django.urls import reverse
+
+from posts.bench import compare, measure
+from posts.models import Follow, Group, Post
+
+
+def rolled_back(send):
+    """Запрос-запись, изменения которого откатываются после замера"""
+    def send_and_roll_back():
+        with transaction.atomic():
+            response = send()
+            transaction.set_rollback(True)
+        return response
+    return send_and_roll_back
+
+
+class Command(BaseCommand):
+    help = ('Замеряет p50/p95/p99 и число SQL-запросов публичных страниц '
+            'и сравнивает их с эталоном')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=50)
+        parser.add_argument('--warmup', type=int, default=5)
+        parser.add_argument(
+            '--cold', action='store_true',
+            help='Очищать кэш перед каждым запросом')
+        parser.add_argument(
+            '--output', default='bench_results.json',
+            help='Куда записать результаты в JSON')
+        parser.add_argument(
+            '--baseline',
+            help='JSON с эталонными результатами для сравнения')
+        parser.add_argument(
+            '--save-baseline', action='store_true',
+            help='Записать результаты как новый эталон в --baseline')
+        parser.add_argument(
+            '--tolerance', type=float, default=0.2,
+            help='Допустимое замедление p95 относительно эталона')
+
+    def scenarios(self):
+        """Запросы бенчмарка по существующим в базе данным"""
+        follow = Follow.objects.select_related('user').first()
+        post = Post.objects.filter(group__isnull=False).first()
+        if follow is None or post is None:
+            raise CommandError('База пуста, сначала запустите seed_bench')
+        reader = follow.user
+        client = Client()
+        client.force_login(reader)
+        group = Group.objects.get(id=post.group_id)
+
+        index_url = reverse('posts:index')
+        like_url = reverse('posts:post_like', kwargs={'post_id': post.id})
+        return {
+            'index': lambda: client.get(index_url),
+            'popular': lambda: client.get(reverse('posts:popular')),
+            'group_posts': lambda: client.get(
+                reverse('posts:group_list', kwargs={'slug': group.slug})),
+            'profile': lambda: client.get(
+                reverse('posts:profile',
+                        kwargs={'username': post.author.username})),
+            'post_detail': lambda: client.get(
+                reverse('posts:post_detail', kwargs={'post_id': post.id})),
+            'follow_index': lambda: client.get(
+                reverse('posts:follow_index')),
+            # записи откатываются, чтобы замер не оставлял следов в базе
+            'post_like': rolled_back(lambda: client.get(
+                like_url, HTTP_REFERER=index_url)),
+            'add_comment': rolled_back(lambda: client.post(
+                reverse('posts:add_comment', kwargs={'post_id': post.id}),
+                {'text': 'Комментарий из бенчмарка'})),
+        }
+
+    def handle(self, *args, **options):
+        if options['save_baseline'] and not options['baseline']:
+            raise CommandError('Для --save-baseline нужен --baseline')
+        results = {}
+        for name, send in self.scenarios().items():
+            results[name] = measure(
+                send, options['iterations'], options['warmup'],
+                options['cold'])
+            self.stdout.write(
+                f'{name:<14} p50 {results[name]["p50"]:>8} мс  '
+                f'p95 {results[name]["p95"]:>8} мс  '
+                f'p99 {results[name]["p99"]:>8} мс  '
+                f'SQL {results[name]["queries"]}')
+
+        report = {
+            'database': connection.vendor,
+            'conn_max_age': connection.settings_dict['CONN_MAX_AGE'],
+            'posts_on_page': settings.POSTS_ON_PAGE,
+            'results': results,
+        }
+        with open(options['output'], 'w') as output:
+            json.dump(report, output, indent=2, ensure_ascii=False)
+        self.stdout.write(f'Результаты записаны в {options["output"]}')
+
+        if not options['baseline']:
+            return
+        if options['save_baseline']:
+            with open(options['baseline'], 'w') as output:
+                json.dump(report, output, indent=2, ensure_ascii=False)
+            self.stdout.write(f'Эталон записан в {options["baseline"]}')
+            return
+        with open(options['baseline']) as baseline_file:
+            baseline = json.load(baseline_file)['results']
+        regressions = compare(results, baseline, options['tolerance'])
+        if regressions:
+            raise CommandError(
+                'Регрессии производительности:\n' + '\n'.join(regressions))
+        self.stdout.write(self.style.SUCCESS('Регрессий нет'))
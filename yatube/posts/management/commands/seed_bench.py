@@ -0,0 +1,152 @@
+import random
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from faker import Faker
+from mixer.backend.django import mixer
+
+from posts.freshness import touch_all
+from posts.like_cache import forget_liked_ids
+from posts.models import Comment, Follow, Group, Like, Post
+
+User = get_user_model()
+
+BENCH_PASSWORD = 'bench-password'
+BENCH_PREFIX = 'bench'
+# по этим меткам генератор узнает свои строки; домен .invalid
+# зарезервирован, у настоящих пользователей такой почты не бывает
+BENCH_EMAIL_DOMAIN = '@bench.invalid'
+BENCH_GROUP_DESCRIPTION = 'Синтетическая группа seed_bench'
+
+
+class Command(BaseCommand):
+    help = 'Наполняет базу синтетическими данными для бенчмарков'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=200)
+        parser.add_argument('--groups', type=int, default=20)
+        parser.add_argument('--posts', type=int, default=10000)
+        parser.add_argument('--comments', type=int, default=20000)
+        parser.add_argument('--likes', type=int, default=50000)
+        parser.add_argument('--follows', type=int, default=2000)
+        parser.add_argument('--batch-size', type=int, default=2000)
+        parser.add_argument('--seed', type=int, default=42,
+                            help='Зерно генератора, чтобы данные повторялись')
+
+    def bulk(self, model, objs):
+        return model.objects.bulk_create(objs, batch_size=self.batch_size)
+
+    def unique_pairs(self, amount, left, right, exclude_same=False,
+                     existing=()):
+        """Случайные новые пары (left, right), не больше, чем их есть.
+
+        Пары из existing и, при exclude_same, пары из одного id не
+        выбираются; если свободных пар мало, выборка идет из их полного
+        списка, иначе подбором.
+        """
+        left_ids, right_ids = set(left), set(right)
+        existing = {
+            pair for pair in existing
+            if pair[0] in left_ids and pair[1] in right_ids
+            and not (exclude_same and pair[0] == pair[1])
+        }
+        same = len(left_ids & right_ids) if exclude_same else 0
+        available = len(left_ids) * len(right_ids) - same - len(existing)
+        amount = min(amount, available)
+        if amount * 2 > available:
+            candidates = [
+                (left_id, right_id)
+                for left_id in left_ids for right_id in right_ids
+                if not (exclude_same and left_id == right_id)
+                and (left_id, right_id) not in existing
+            ]
+            return set(self.random.sample(sorted(candidates), amount))
+        pairs = set()
+        while len(pairs) < amount:
+            pair = (self.random.choice(left), self.random.choice(right))
+            if exclude_same and pair[0] == pair[1] or pair in existing:
+                continue
+            pairs.add(pair)
+        return pairs
+
+    def handle(self, *args, **options):
+        self.random = random.Random(options['seed'])
+        self.batch_size = options['batch_size']
+        fake = Faker('ru_RU')
+        fake.seed_instance(options['seed'])
+        password = make_password(BENCH_PASSWORD)
+
+        with transaction.atomic():
+            with mixer.ctx(commit=False):
+                users = mixer.cycle(options['users']).blend(
+                    User, password=password, is_active=True,
+                    is_staff=False, is_superuser=False)
+                groups = mixer.cycle(options['groups']).blend(
+                    Group, description=BENCH_GROUP_DESCRIPTION)
+            for number, user in enumerate(users, User.objects.count()):
+                user.username = f'{BENCH_PREFIX}{number}'
+                user.email = f'{user.username}{BENCH_EMAIL_DOMAIN}'
+            for number, group in enumerate(groups, Group.objects.count()):
+                group.slug = f'{BENCH_PREFIX}-{number}'
+            self.bulk(User, users)
+            self.bulk(Group, groups)
+            user_ids = list(User.objects.filter(
+                email__endswith=BENCH_EMAIL_DOMAIN,
+            ).values_list('id', flat=True))
+            group_ids = list(Group.objects.filter(
+                description=BENCH_GROUP_DESCRIPTION,
+            ).values_list('id', flat=True))
+            self.stdout.write(f'Пользователей: {len(users)}, '
+                              f'групп: {len(groups)}')
+
+            group_choices = group_ids + [None]
+            for offset in range(0, options['posts'], self.batch_size):
+                amount = min(self.batch_size, options['posts'] - offset)
+                self.bulk(Post, [
+                    Post(author_id=self.random.choice(user_ids),
+                         group_id=self.random.choice(group_choices),
+                         text=fake.paragraph(nb_sentences=5))
+                    for _ in range(amount)
+                ])
+            post_ids = list(Post.objects.filter(
+                author__email__endswith=BENCH_EMAIL_DOMAIN,
+            ).values_list('id', flat=True))
+            self.stdout.write(f'Постов: {options["posts"]}')
+
+            for offset in range(0, options['comments'], self.batch_size):
+                amount = min(self.batch_size, options['comments'] - offset)
+                self.bulk(Comment, [
+                    Comment(author_id=self.random.choice(user_ids),
+                            post_id=self.random.choice(post_ids),
+                            text=fake.sentence())
+                    for _ in range(amount)
+                ])
+            self.stdout.write(f'Комментариев: {options["comments"]}')
+
+            likes = self.unique_pairs(
+                options['likes'], user_ids, post_ids,
+                existing=Like.objects.values_list('user_id', 'post_id'))
+            self.bulk(Like, [Like(user_id=user_id, post_id=post_id)
+                             for user_id, post_id in likes])
+            liked_users = {user_id for user_id, _ in likes}
+            transaction.on_commit(lambda: forget_liked_ids(*liked_users))
+            self.stdout.write(f'Нравликов: {len(likes)}')
+
+            follows = self.unique_pairs(
+                options['follows'], user_ids, user_ids, exclude_same=True,
+                existing=Follow.objects.values_list('user_id', 'author_id'))
+            self.bulk(Follow, [Follow(user_id=user_id, author_id=author_id)
+                               for user_id, author_id in follows])
+            self.stdout.write(f'Подписок: {len(follows)}')
+
+        # bulk_create не шлет сигналы, поэтому производные данные
+        # пересобираем теми же командами, что чинят их в эксплуатации
+        call_command('rebuild_like_counts', stdout=self.stdout)
+        call_command('backfill_timelines', stdout=self.stdout)
+        call_command('reconcile_author_stats', stdout=self.stdout)
+        touch_all()
+        self.stdout.write(self.style.SUCCESS(
+            f'Готово, пароль пользователей: {BENCH_PASSWORD}'))
@@ -0,0 +1,34 @@
+# Generated by Django 4.0 on 2026-10-18 17:12
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def fill_like_count(apps, schema_editor):
+    Post = apps.get_model('posts', 'Post')
+    Like = apps.get_model('posts', 'Like')
+    like_amount = (
+        Like.objects.filter(post=OuterRef('pk'))
+        .order_by()
+        .values('post')
+        .annotate(amount=Count('id'))
+        .values('amount')
+    )
+    Post.objects.update(like_count=Coalesce(Subquery(like_amount), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0002_group_alter_post_options_post_image_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='like_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Число нравликов'),
+        ),
+        migrations.RunPython(fill_like_count, migrations.RunPython.noop),
+    ]
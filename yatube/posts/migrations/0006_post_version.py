@@ -0,0 +1,18 @@
+# Generated by Django 4.0 on 2026-10-18 17:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0005_feed_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='version',
+            field=models.PositiveIntegerField(default=0, editable=False, help_text='Растет при любом изменении поста, входит в ключ кэша', verbose_name='Версия карточки'),
+        ),
+    ]
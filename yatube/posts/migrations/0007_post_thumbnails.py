@@ -0,0 +1,18 @@
+# Generated by Django 4.0 on 2026-10-18 17:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0006_post_version'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='thumbnails',
+            field=models.JSONField(blank=True, default=dict, editable=False, help_text='Адреса заранее нарезанных миниатюр по названиям', verbose_name='Миниатюры'),
+        ),
+    ]
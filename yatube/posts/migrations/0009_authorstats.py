@@ -0,0 +1,56 @@
+# Generated by Django 4.0 on 2026-10-18 17:24
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+import django.db.models.deletion
+
+
+def fill_author_stats(apps, schema_editor):
+    User = apps.get_model('auth', 'User')
+    Post = apps.get_model('posts', 'Post')
+    Follow = apps.get_model('posts', 'Follow')
+    AuthorStats = apps.get_model('posts', 'AuthorStats')
+
+    def amount(queryset, field):
+        return Coalesce(Subquery(
+            queryset.filter(**{field: OuterRef('user_id')})
+            .order_by()
+            .values(field)
+            .annotate(amount=Count('id'))
+            .values('amount')
+        ), 0)
+
+    AuthorStats.objects.bulk_create(
+        AuthorStats(user_id=user_id)
+        for user_id in User.objects.values_list('id', flat=True))
+    AuthorStats.objects.update(
+        posts_count=amount(Post.objects.all(), 'author'),
+        followers_count=amount(Follow.objects.all(), 'author'),
+        following_count=amount(Follow.objects.all(), 'user'),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('posts', '0008_post_search_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AuthorStats',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to='auth.user', verbose_name='Автор')),
+                ('posts_count', models.IntegerField(default=0, verbose_name='Число постов')),
+                ('followers_count', models.IntegerField(default=0, verbose_name='Число подписчиков')),
+                ('following_count', models.IntegerField(default=0, verbose_name='Число подписок')),
+            ],
+            options={
+                'verbose_name': 'Статистика автора',
+                'verbose_name_plural': 'Статистика авторов',
+            },
+        ),
+        migrations.RunPython(fill_author_stats, migrations.RunPython.noop),
+    ]
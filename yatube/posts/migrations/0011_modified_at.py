@@ -0,0 +1,46 @@
+# Generated by Django 4.0 on 2026-10-18 17:31
+
+from importlib import import_module
+
+from django.db import migrations, models
+from django.db.models import F
+import django.utils.timezone
+
+search_index = import_module('posts.migrations.0008_post_search_index')
+# SQLite пересоздает posts_post при добавлении колонки,
+# и триггеры полнотекстового индекса пропадают вместе со старой таблицей
+TRIGGERS_SQL = search_index.DROP_SQL[:3] + search_index.CREATE_SQL[1:4]
+restore_search_triggers = search_index.run_on_sqlite(TRIGGERS_SQL)
+
+
+def fill_modified_at(apps, schema_editor):
+    for model_name in ('Post', 'Comment'):
+        model = apps.get_model('posts', model_name)
+        model.objects.update(modified_at=F('pub_date'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0010_comment_keyset_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(migrations.RunPython.noop,
+                             restore_search_triggers),
+        migrations.AddField(
+            model_name='comment',
+            name='modified_at',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now, verbose_name='Дата изменения'),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='modified_at',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now, verbose_name='Дата изменения'),
+            preserve_default=False,
+        ),
+        migrations.RunPython(fill_modified_at, migrations.RunPython.noop),
+        migrations.RunPython(restore_search_triggers,
+                             migrations.RunPython.noop),
+    ]
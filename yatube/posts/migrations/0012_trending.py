@@ -0,0 +1,49 @@
+# Generated by Django 4.0 on 2026-10-18 17:33
+
+from importlib import import_module
+
+from django.db import migrations, models
+import django.utils.timezone
+
+# SQLite пересоздает posts_post и теряет триггеры поиска, см. 0011
+restore_search_triggers = import_module(
+    'posts.migrations.0011_modified_at').restore_search_triggers
+
+
+def create_trending_state(apps, schema_editor):
+    TrendingState = apps.get_model('posts', 'TrendingState')
+    TrendingState.objects.get_or_create(pk=1)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0011_modified_at'),
+    ]
+
+    operations = [
+        migrations.RunPython(migrations.RunPython.noop,
+                             restore_search_triggers),
+        migrations.CreateModel(
+            name='TrendingState',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('epoch', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Эпоха')),
+                ('top', models.JSONField(default=list, help_text='Пары [id поста, популярность] по убыванию', verbose_name='Топ постов')),
+                ('built_at', models.DateTimeField(blank=True, null=True, verbose_name='Собран')),
+            ],
+            options={
+                'verbose_name': 'Состояние популярного',
+                'verbose_name_plural': 'Состояние популярного',
+            },
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='trend_score',
+            field=models.FloatField(default=0, editable=False, help_text='Веса нравликов и комментариев, умноженные на рост от эпохи TrendingState (forward decay)', verbose_name='Популярность'),
+        ),
+        migrations.RunPython(create_trending_state,
+                             migrations.RunPython.noop),
+        migrations.RunPython(restore_search_triggers,
+                             migrations.RunPython.noop),
+    ]
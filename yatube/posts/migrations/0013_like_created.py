@@ -0,0 +1,19 @@
+# Generated by Django 4.0 on 2026-10-18 18:50
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0012_trending'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='like',
+            name='created',
+            field=models.DateTimeField(default=django.utils.timezone.now, verbose_name='Дата нравлика'),
+        ),
+    ]
@@ -1,6 +1,7 @@
 from django.db import models
 from django.contrib.auth import get_user_model
 from django.conf import settings
+from django.utils import timezone
 
 User = get_user_model()
 
@@ -17,6 +18,7 @@ class Group(models.Model):
 class Post(models.Model):
     text = models.TextField('Текст поста', help_text='Введите текст поста')
     pub_date = models.DateTimeField('Дата публикации', auto_now_add=True)
+    modified_at = models.DateTimeField('Дата изменения', auto_now=True)
     author = models.ForeignKey(
         User,
         on_delete=models.CASCADE,
@@ -38,9 +40,33 @@ class Post(models.Model):
         blank=True,
         null=True
     )
+    like_count = models.PositiveIntegerField(
+        'Число нравликов',
+        default=0,
+        editable=False
+    )
+    thumbnails = models.JSONField(
+        'Миниатюры',
+        default=dict,
+        blank=True,
+        editable=False,
+        help_text='Адреса заранее нарезанных миниатюр по названиям'
+    )
+    trend_score = models.FloatField(
+        'Популярность',
+        default=0,
+        editable=False,
+        help_text='Веса нравликов и комментариев, умноженные на рост '
+                  'от эпохи TrendingState (forward decay)'
+    )
+    version = models.PositiveIntegerField(
+        'Версия карточки',
+        default=0,
+        editable=False,
+        help_text='Растет при любом изменении поста, входит в ключ кэша'
+    )
 
     is_liked = False
-    like_amount = None
 
     def __str__(self) -> str:
         return self.text[:settings.SHORT_POST_LENGTH]
@@ -50,6 +76,14 @@ class Post(models.Model):
         default_related_name = 'posts'
         verbose_name = 'Пост'
         verbose_name_plural = 'Посты'
+        indexes = [
+            models.Index(fields=['-pub_date', '-id'],
+                         name='post_pub_date_idx'),
+            models.Index(fields=['author', '-pub_date', '-id'],
+                         name='post_author_pub_date_idx'),
+            models.Index(fields=['group', '-pub_date', '-id'],
+                         name='post_group_pub_date_idx'),
+        ]
 
 
 class Comment(models.Model):
@@ -68,6 +102,13 @@ class Comment(models.Model):
     text = models.TextField('Текст комментария',
                             help_text='Введите текст комментария')
     pub_date = models.DateTimeField('Дата комментария', auto_now_add=True)
+    modified_at = models.DateTimeField('Дата изменения', auto_now=True)
+
+    class Meta:
+        indexes = [models.Index(
+            fields=['post', 'pub_date', 'id'],
+            name='comment_post_pub_date_id_idx'
+        )]
 
 
 class Follow(models.Model):
@@ -107,9 +148,78 @@ class Like(models.Model):
         blank=True,
         null=True,
     )
+    # по нему отмена снимает с trend_score ровно прибавленный вклад
+    created = models.DateTimeField('Дата нравлика', default=timezone.now)
 
     class Meta:
         constraints = [models.UniqueConstraint(
             fields=['user', 'post'],
             name='unique_like'
-        )]
\ No newline at end of file
+        )]
+
+
+class AuthorStats(models.Model):
+    """Счетчики автора, обновляются сигналами вместе с записью"""
+    user = models.OneToOneField(
+        User,
+        primary_key=True,
+        related_name='stats',
+        on_delete=models.CASCADE,
+        verbose_name='Автор',
+    )
+    posts_count = models.IntegerField('Число постов', default=0)
+    followers_count = models.IntegerField('Число подписчиков', default=0)
+    following_count = models.IntegerField('Число подписок', default=0)
+
+    class Meta:
+        verbose_name = 'Статистика автора'
+        verbose_name_plural = 'Статистика авторов'
+
+    def __str__(self):
+        return f'Статистика {self.user_id}'
+
+
+class TrendingState(models.Model):
+    """Эпоха отсчета популярности и последний собранный топ постов"""
+    epoch = models.DateTimeField('Эпоха', default=timezone.now)
+    top = models.JSONField(
+        'Топ постов',
+        default=list,
+        help_text='Пары [id поста, популярность] по убыванию'
+    )
+    built_at = models.DateTimeField('Собран', null=True, blank=True)
+
+    class Meta:
+        verbose_name = 'Состояние популярного'
+        verbose_name_plural = 'Состояние популярного'
+
+    @classmethod
+    def load(cls):
+        state, _ = cls.objects.get_or_create(pk=1)
+        return state
+
+
+class TimelineEntry(models.Model):
+    """Пост в ленте подписок пользователя, раскладывается при записи"""
+    user = models.ForeignKey(
+        User,
+        related_name='timeline',
+        on_delete=models.CASCADE,
+    )
+    post = models.ForeignKey(
+        Post,
+        related_name='timeline_entries',
+        on_delete=models.CASCADE,
+    )
+    pub_date = models.DateTimeField('Дата публикации')
+
+    class Meta:
+        ordering = ('-pub_date',)
+        constraints = [models.UniqueConstraint(
+            fields=['user', 'post'],
+            name='unique_timeline_entry'
+        )]
+        indexes = [models.Index(
+            fields=['user', '-pub_date', '-post'],
+            name='timeline_user_pub_date_idx'
+        )]
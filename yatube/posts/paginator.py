@@ -0,0 +1,234 @@
+import base64
+import datetime
+import hashlib
+import json
+import math
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.core.paginator import Page, Paginator
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.functional import cached_property
+
+NEXT = 'n'
+PREVIOUS = 'p'
+# ключи курсора сравниваются с колонками BIGINT
+MAX_CURSOR_INT = 2 ** 63 - 1
+
+
+class CursorJSONEncoder(DjangoJSONEncoder):
+    """Сохраняет микросекунды, которые DjangoJSONEncoder отбрасывает"""
+
+    def default(self, o):
+        if isinstance(o, datetime.datetime):
+            return o.isoformat()
+        return super().default(o)
+
+
+def encode_cursor(direction, values):
+    """Упаковывает направление и значения ключа в непрозрачный токен"""
+    raw = json.dumps([direction, values], cls=CursorJSONEncoder)
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    """Распаковывает токен, для испорченного токена возвращает None"""
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        direction, values = json.loads(base64.urlsafe_b64decode(padded))
+    except (ValueError, TypeError):
+        return None
+    if direction not in (NEXT, PREVIOUS) or not isinstance(values, list):
+        return None
+    return direction, values
+
+
+def valid_cursor_value(value):
+    """Значение ключа из курсора, которое база сможет сравнить"""
+    if isinstance(value, bool):
+        return False
+    if isinstance(value, int):
+        return -MAX_CURSOR_INT <= value <= MAX_CURSOR_INT
+    if isinstance(value, float):
+        return math.isfinite(value)
+    if isinstance(value, datetime.datetime):
+        return timezone.is_aware(value)
+    return isinstance(value, str)
+
+
+class CursorPage(Page):
+    """Страница, которая знает только соседние курсоры, а не свой номер"""
+
+    def __init__(self, object_list, paginator,
+                 next_cursor=None, previous_cursor=None):
+        super().__init__(object_list, None, paginator)
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+        self.params = {}
+
+    def __repr__(self):
+        return f'<CursorPage of {len(self.object_list)} objects>'
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def _querystring(self, cursor):
+        params = self.params.copy() if self.params else {}
+        params.pop(self.paginator.page_query_param, None)
+        params.pop(self.paginator.cursor_query_param, None)
+        if cursor is not None:
+            params[self.paginator.cursor_query_param] = cursor
+        if hasattr(params, 'urlencode'):
+            return params.urlencode()
+        return '&'.join(f'{key}={value}' for key, value in params.items())
+
+    def first_querystring(self):
+        return self._querystring(None)
+
+    def next_querystring(self):
+        return self._querystring(self.next_cursor)
+
+    def previous_querystring(self):
+        return self._querystring(self.previous_cursor)
+
+
+class CursorPaginator(Paginator):
+    """Keyset-пагинация по (pub_date, id) без COUNT(*) и OFFSET.
+
+    Страница выбирается условием на значения ключа последней
+    показанной записи, поэтому стоимость запроса не зависит от того,
+    насколько далеко пользователь пролистал ленту.
+    """
+    cursor_query_param = 'cursor'
+    page_query_param = 'page'
+
+    def __init__(self, object_list, per_page,
+                 ordering=('-pub_date', '-id'), **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        self.ordering = tuple(ordering)
+
+    @cached_property
+    def keys(self):
+        return tuple(field.lstrip('-') for field in self.ordering)
+
+    @cached_property
+    def approximate_count(self):
+        """Общее число записей, закэшированное на PAGINATOR_COUNT_TIMEOUT"""
+        query_hash = hashlib.md5(
+            str(self.object_list.query).encode()).hexdigest()
+        return cache.get_or_set(
+            f'paginator-count:{query_hash}',
+            self.object_list.count,
+            settings.PAGINATOR_COUNT_TIMEOUT,
+        )
+
+    @cached_property
+    def count(self):
+        return self.approximate_count
+
+    def _key_values(self, obj):
+        if isinstance(obj, dict):
+            return [obj[key] for key in self.keys]
+        return [getattr(obj, key) for key in self.keys]
+
+    def _to_python(self, key, value):
+        try:
+            field = self.object_list.model._meta.get_field(key)
+        except FieldDoesNotExist:
+            return value
+        return field.to_python(value)
+
+    def cursor_values(self, cursor):
+        """Направление и значения ключа из токена.
+
+        None, если токена нет или его значения не подходят полям
+        ключа: тогда показывается первая страница.
+        """
+        decoded = decode_cursor(cursor) if cursor else None
+        if decoded is None or len(decoded[1]) != len(self.keys):
+            return None
+        direction, values = decoded
+        if any(isinstance(value, bool) for value in values):
+            return None
+        try:
+            values = [self._to_python(key, value)
+                      for key, value in zip(self.keys, values)]
+        except (ValidationError, ValueError, TypeError):
+            return None
+        if not all(map(valid_cursor_value, values)):
+            return None
+        return direction, values
+
+    def _keyset_filter(self, values, forward):
+        """Условие «строго после значений ключа» в порядке сортировки"""
+        condition = Q()
+        equal = {}
+        for field, value in zip(self.ordering, values):
+            key = field.lstrip('-')
+            descending = field.startswith('-')
+            lookup = 'lt' if descending == forward else 'gt'
+            condition |= Q(**equal, **{f'{key}__{lookup}': value})
+            equal[key] = value
+        return condition
+
+    def _reversed_ordering(self):
+        return tuple(
+            field[1:] if field.startswith('-') else f'-{field}'
+            for field in self.ordering
+        )
+
+    def _page(self, rows, has_more, direction, had_cursor):
+        if direction == PREVIOUS:
+            rows = rows[::-1]
+        next_cursor = previous_cursor = None
+        has_next = has_more if direction == NEXT else had_cursor
+        has_previous = had_cursor if direction == NEXT else has_more
+        if rows and has_next:
+            next_cursor = encode_cursor(NEXT, self._key_values(rows[-1]))
+        if rows and has_previous:
+            previous_cursor = encode_cursor(
+                PREVIOUS, self._key_values(rows[0]))
+        return CursorPage(rows, self, next_cursor, previous_cursor)
+
+    def get_page(self, cursor=None):
+        """Возвращает страницу по токену, без токена — первую"""
+        decoded = self.cursor_values(cursor)
+        if decoded is None:
+            rows = list(
+                self.object_list.order_by(*self.ordering)[:self.per_page + 1])
+            return self._page(
+                rows[:self.per_page], len(rows) > self.per_page, NEXT, False)
+        direction, values = decoded
+        forward = direction == NEXT
+        ordering = self.ordering if forward else self._reversed_ordering()
+        rows = list(
+            self.object_list.filter(self._keyset_filter(values, forward))
+            .order_by(*ordering)[:self.per_page + 1]
+        )
+        return self._page(
+            rows[:self.per_page], len(rows) > self.per_page, direction, True)
+
+    def page_by_number(self, number):
+        """Страница по номеру для старых ссылок вида ?page=N.
+
+        Использует OFFSET, но без COUNT(*); дальше пользователь
+        листает уже по курсорам.
+        """
+        try:
+            number = max(int(number), 1)
+        except (TypeError, ValueError):
+            number = 1
+        offset = (number - 1) * self.per_page
+        rows = list(
+            self.object_list.order_by(*self.ordering)
+            [offset:offset + self.per_page + 1]
+        )
+        return self._page(
+            rows[:self.per_page], len(rows) > self.per_page, NEXT,
+            number > 1)
@@ -0,0 +1,137 @@
+import re
+
+from django.db import connection
+from django.db.models.expressions import RawSQL
+from django.utils.functional import cached_property
+from django.utils.html import escape
+
+from .models import Post
+from .paginator import NEXT, CursorPaginator
+
+FTS_TABLE = 'posts_post_fts'
+# маркеры совпадений в сниппете до экранирования HTML
+MATCH_START = '\x02'
+MATCH_END = '\x03'
+SNIPPET_TOKENS = 24
+
+
+def fts_available():
+    return connection.vendor == 'sqlite'
+
+
+def build_match_query(query):
+    """Превращает ввод пользователя в безопасный запрос FTS5.
+
+    Каждое слово берется в кавычки, чтобы операторы FTS5 из ввода
+    не исполнялись; последнее слово ищется по префиксу.
+    """
+    words = re.findall(r'\w+', query.lower())
+    if not words:
+        return ''
+    terms = [f'"{word}"' for word in words]
+    terms[-1] += '*'
+    return ' '.join(terms)
+
+
+def highlight(snippet):
+    """Экранирует сниппет и подсвечивает совпадения тегом <mark>"""
+    return (
+        escape(snippet)
+        .replace(MATCH_START, '<mark>')
+        .replace(MATCH_END, '</mark>')
+    )
+
+
+def matching_post_ids(match_query):
+    """Подзапрос id постов, подходящих под запрос FTS5"""
+    return RawSQL(
+        f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s',
+        [match_query],
+    )
+
+
+class SearchPaginator(CursorPaginator):
+    """Keyset-пагинация результатов поиска по (релевантность, id).
+
+    Релевантность — bm25 из FTS5: чем меньше, тем выше пост
+    в выдаче.
+    """
+
+    def __init__(self, query, per_page):
+        super().__init__(Post.objects.none(), per_page,
+                         ordering=('rank', 'id'))
+        self.match_query = build_match_query(query)
+
+    @cached_property
+    def approximate_count(self):
+        if not self.match_query:
+            return 0
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT count(*) FROM {FTS_TABLE} '
+                f'WHERE {FTS_TABLE} MATCH %s',
+                [self.match_query],
+            )
+            return cursor.fetchone()[0]
+
+    def cursor_values(self, cursor):
+        """Как у CursorPaginator, но релевантность должна быть числом"""
+        decoded = super().cursor_values(cursor)
+        if decoded is None:
+            return None
+        rank, _ = decoded[1]
+        if not isinstance(rank, (int, float)):
+            return None
+        return decoded
+
+    def _search(self, values, forward):
+        where = f'{FTS_TABLE} MATCH %s'
+        params = [self.match_query]
+        if values is not None:
+            rank, post_id = values
+            sign = '>' if forward else '<'
+            where += (f' AND (rank {sign} %s '
+                      f'OR (rank = %s AND rowid {sign} %s))')
+            params += [rank, rank, post_id]
+        order = 'ASC' if forward else 'DESC'
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT rowid, rank, snippet({FTS_TABLE}, 0, %s, %s, '
+                f'%s, {SNIPPET_TOKENS}) '
+                f'FROM {FTS_TABLE} WHERE {where} '
+                f'ORDER BY rank {order}, rowid {order} LIMIT %s',
+                [MATCH_START, MATCH_END, '…'] + params
+                + [self.per_page + 1],
+            )
+            return cursor.fetchall()
+
+    def _posts(self, rows):
+        """Посты в порядке выдачи с релевантностью и сниппетом"""
+        post_ids = [post_id for post_id, _, _ in rows]
+        posts = (
+            Post.objects.select_related('author', 'group')
+            .defer('group__description')
+            .in_bulk(post_ids)
+        )
+        result = []
+        for post_id, rank, snippet in rows:
+            post = posts.get(post_id)
+            if post is None:
+                continue
+            post.rank = rank
+            post.snippet = highlight(snippet)
+            result.append(post)
+        return result
+
+    def get_page(self, cursor=None):
+        if not self.match_query:
+            return self._page([], False, NEXT, False)
+        decoded = self.cursor_values(cursor)
+        if decoded is None:
+            direction, values, had_cursor = NEXT, None, False
+        else:
+            (direction, values), had_cursor = decoded, True
+        rows = self._search(values, direction == NEXT)
+        posts = self._posts(rows[:self.per_page])
+        return self._page(
+            posts, len(rows) > self.per_page, direction, had_cursor)
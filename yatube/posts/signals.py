@@ -0,0 +1,95 @@
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .freshness import marker, post_markers, touch
+from .like_cache import forget_liked_ids
+from .models import AuthorStats, Comment, Follow, Like, Post, User
+from .stats import change_stats
+from .trending import trend_update
+from .timeline import add_author_posts, fan_out_post, remove_author_posts
+
+
+def bump_post_version(post_id, **changes):
+    """Сбрасывает закэшированную карточку и валидаторы поста"""
+    Post.objects.filter(id=post_id).update(
+        version=F('version') + 1, modified_at=timezone.now(), **changes)
+
+
+@receiver(pre_save, sender=Post)
+def post_saving(sender, instance, raw=False, **kwargs):
+    if instance._state.adding or raw:
+        return
+    # пост мог уйти из группы, ее ленту тоже надо отметить
+    instance._previous_group_id = Post.objects.filter(
+        id=instance.id).values_list('group_id', flat=True).first()
+
+
+@receiver(post_save, sender=Post)
+def post_saved(sender, instance, created, **kwargs):
+    markers = post_markers(instance.author_id, instance.group_id)
+    if created:
+        fan_out_post(instance)
+        change_stats(instance.author_id, create=True, posts_count=1)
+    else:
+        bump_post_version(instance.id)
+        previous_group_id = getattr(instance, '_previous_group_id', None)
+        if previous_group_id not in (None, instance.group_id):
+            markers.append(marker('group', previous_group_id))
+    touch(*markers)
+
+
+@receiver(post_delete, sender=Post)
+def post_deleted(sender, instance, **kwargs):
+    change_stats(instance.author_id, posts_count=-1)
+    touch(*post_markers(instance.author_id, instance.group_id))
+
+
+@receiver(post_save, sender=User)
+def user_created(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        AuthorStats.objects.get_or_create(user=instance)
+
+
+@receiver(post_save, sender=Comment)
+def comment_saved(sender, instance, created, **kwargs):
+    if created:
+        bump_post_version(instance.post_id, trend_score=trend_update(
+            settings.TRENDING_COMMENT_WEIGHT))
+    else:
+        bump_post_version(instance.post_id)
+
+
+@receiver(post_save, sender=Like)
+def like_saved(sender, instance, created, **kwargs):
+    # set_like правит кэш сам, сюда попадают нравлики из ORM
+    transaction.on_commit(lambda: forget_liked_ids(instance.user_id))
+
+
+@receiver(post_delete, sender=Like)
+def like_deleted(sender, instance, **kwargs):
+    # в том числе каскадом при удалении поста или пользователя
+    transaction.on_commit(lambda: forget_liked_ids(instance.user_id))
+
+
+@receiver(post_save, sender=Follow)
+def follow_created(sender, instance, created, **kwargs):
+    if created and instance.user_id and instance.author_id:
+        add_author_posts(instance.user_id, instance.author_id)
+        change_stats(instance.author_id, create=True, followers_count=1)
+        change_stats(instance.user_id, create=True, following_count=1)
+        touch(marker('profile', instance.author_id),
+              marker('follow', instance.user_id))
+
+
+@receiver(post_delete, sender=Follow)
+def follow_deleted(sender, instance, **kwargs):
+    if instance.user_id and instance.author_id:
+        remove_author_posts(instance.user_id, instance.author_id)
+        change_stats(instance.author_id, followers_count=-1)
+        change_stats(instance.user_id, following_count=-1)
+        touch(marker('profile', instance.author_id),
+              marker('follow', instance.user_id))
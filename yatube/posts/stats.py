@@ -0,0 +1,66 @@
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from .models import AuthorStats, Follow, Post
+
+STATS_FIELDS = ('posts_count', 'followers_count', 'following_count')
+
+
+def _amount(queryset, field):
+    return Coalesce(Subquery(
+        queryset.filter(**{field: OuterRef('user_id')})
+        .order_by()
+        .values(field)
+        .annotate(amount=Count('id'))
+        .values('amount')
+    ), 0)
+
+
+def actual_counts():
+    """Выражения с настоящими значениями счетчиков для AuthorStats"""
+    return {
+        'posts_count': _amount(Post.objects.all(), 'author'),
+        'followers_count': _amount(Follow.objects.all(), 'author'),
+        'following_count': _amount(Follow.objects.all(), 'user'),
+    }
+
+
+def count_stats(user_id):
+    return {
+        'posts_count': Post.objects.filter(author_id=user_id).count(),
+        'followers_count': Follow.objects.filter(author_id=user_id).count(),
+        'following_count': Follow.objects.filter(user_id=user_id).count(),
+    }
+
+
+def get_stats(user):
+    """Счетчики автора; без записи AuthorStats считаются по таблицам.
+
+    Чтение ничего не пишет: иначе GET профиля ходил бы в основную
+    базу и ставил куку липкости. Запись создается при регистрации
+    и в change_stats на путях записи.
+    """
+    try:
+        return user.stats
+    except AuthorStats.DoesNotExist:
+        stats = AuthorStats(user_id=user.id, **count_stats(user.id))
+        user.stats = stats
+        return stats
+
+
+def change_stats(user_id, create=False, **deltas):
+    """Сдвигает счетчики через F(), не теряя параллельные записи.
+
+    Если записи еще нет и create=True, она создается пересчетом,
+    который уже учитывает текущее изменение. Удаления запись
+    не создают: при каскадном удалении пользователя ее уже нет.
+    """
+    changes = {field: F(field) + delta for field, delta in deltas.items()}
+    if AuthorStats.objects.filter(user_id=user_id).update(**changes):
+        return
+    if not create:
+        return
+    _, created = AuthorStats.objects.get_or_create(
+        user_id=user_id, defaults=count_stats(user_id))
+    if not created:
+        AuthorStats.objects.filter(user_id=user_id).update(**changes)
@@ -0,0 +1 @@
+from core.testing import query_ceiling  # noqa: F401
@@ -0,0 +1,130 @@
+import os
+import shutil
+import tempfile
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from ..models import Comment, Follow, Group, Like, Post
+from .test_views import MALFORMED_CURSORS, raw_cursor
+
+User = get_user_model()
+
+PER_PAGE = 10
+TEMP_SPOOL = tempfile.mkdtemp()
+
+
+class ApiTest(TestCase):
+    """Тестирование JSON API лент"""
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(title='Группа', slug='group')
+        cls.posts = [
+            Post.objects.create(author=cls.author, group=cls.group,
+                                text=f'Пост {i}')
+            for i in range(PER_PAGE + 2)
+        ]
+        cls.latest = cls.posts[-1]
+        Like.objects.create(user=cls.reader, post=cls.latest)
+        Follow.objects.create(user=cls.reader, author=cls.author)
+        for i in range(3):
+            Comment.objects.create(author=cls.reader, post=cls.latest,
+                                   text=f'Комментарий {i}')
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.reader)
+
+    def test_feed_pages_by_cursor(self):
+        """Лента листается курсором без пропусков и повторов"""
+        url = reverse('posts:api_index')
+        first = self.client.get(url).json()
+        second = self.client.get(url, {'cursor': first['next']}).json()
+        self.assertIsNone(first['previous'])
+        self.assertIsNone(second['next'])
+        ids = [post['id'] for post in first['results'] + second['results']]
+        self.assertEqual(ids, [post.id for post in reversed(self.posts)])
+
+    def test_malformed_cursor_shows_first_page(self):
+        """Курсор с чужими типами значений дает первую страницу, а не 500"""
+        url = reverse('posts:api_index')
+        first = self.client.get(url).json()
+        for shape in MALFORMED_CURSORS:
+            with self.subTest(shape=shape):
+                response = self.client.get(url, {'cursor': raw_cursor(shape)})
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(response.json(), first)
+
+    @override_settings(
+        LIKE_BUFFER_PATH=os.path.join(TEMP_SPOOL, 'likes.log'))
+    def test_pending_like_is_shown(self):
+        """Еще не записанный нравлик виден в API, как и в лентах"""
+        post = self.posts[0]
+        self.client.post(
+            reverse('posts:post_like_toggle', kwargs={'post_id': post.id}),
+            HTTP_ACCEPT='application/json')
+        shutil.rmtree(TEMP_SPOOL, ignore_errors=True)
+        self.assertFalse(Like.objects.filter(post=post).exists())
+        item = self.client.get(
+            reverse('posts:api_post_detail', kwargs={'post_id': post.id}),
+            {'fields': 'is_liked,like_count'}).json()
+        self.assertEqual(item, {'is_liked': True, 'like_count': 1})
+
+    def test_fields_select_columns(self):
+        """fields= оставляет в ответе только запрошенные поля"""
+        response = self.client.get(reverse('posts:api_group_posts',
+                                           kwargs={'slug': 'group'}),
+                                   {'fields': 'author,is_liked'})
+        latest, *rest = response.json()['results']
+        self.assertEqual(latest, {'author': 'author', 'is_liked': True})
+        self.assertFalse(rest[0]['is_liked'])
+
+    def test_unknown_field_is_rejected(self):
+        response = self.client.get(reverse('posts:api_index'),
+                                   {'fields': 'id,password'})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('password', response.json()['error'])
+
+    def test_post_detail_and_comments(self):
+        """Пост и его комментарии от старых к новым"""
+        post = self.client.get(reverse(
+            'posts:api_post_detail', kwargs={'post_id': self.latest.id}))
+        self.assertEqual(post.json()['text'], self.latest.text)
+        self.assertTrue(post.json()['is_liked'])
+        comments = self.client.get(reverse(
+            'posts:api_post_comments', kwargs={'post_id': self.latest.id}))
+        self.assertEqual(
+            [comment['text'] for comment in comments.json()['results']],
+            [f'Комментарий {i}' for i in range(3)])
+
+    def test_missing_objects_return_404(self):
+        urls = (
+            reverse('posts:api_post_detail', kwargs={'post_id': 0}),
+            reverse('posts:api_post_comments', kwargs={'post_id': 0}),
+            reverse('posts:api_group_posts', kwargs={'slug': 'none'}),
+            reverse('posts:api_profile_posts', kwargs={'username': 'none'}),
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                self.assertEqual(self.client.get(url).status_code, 404)
+
+    def test_follow_feed(self):
+        """Лента подписок только для вошедших"""
+        url = reverse('posts:api_follow_posts')
+        response = self.client.get(url, {'fields': 'id,author'})
+        self.assertEqual(response.json()['results'][0],
+                         {'id': self.latest.id, 'author': 'author'})
+        self.assertEqual(Client().get(url).status_code, 401)
+
+    def test_unchanged_feed_returns_304(self):
+        url = reverse('posts:api_profile_posts',
+                      kwargs={'username': 'author'})
+        etag = self.client.get(url)['ETag']
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
@@ -0,0 +1,119 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import (AsyncClient, Client, TestCase, TransactionTestCase,
+                         override_settings)
+from django.urls import reverse
+
+from ..models import Comment, Follow, Group, Like, Post
+
+User = get_user_model()
+
+ASYNC_URLS = 'yatube.urls_async'
+
+
+def page_ids(response):
+    return [post.id for post in response.context['page_obj']]
+
+
+@override_settings(ROOT_URLCONF=ASYNC_URLS, ASYNC_PARALLEL_QUERIES=False)
+class AsyncViewsTest(TestCase):
+    """Async-ленты отдают то же, что и синхронные"""
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.reader = User.objects.create_user(username='reader')
+        cls.author = User.objects.create_user(username='author')
+        cls.group = Group.objects.create(title='Группа', slug='group')
+        cls.posts = [
+            Post.objects.create(author=cls.author, group=cls.group,
+                                text=f'Пост {i}')
+            for i in range(3)
+        ]
+        cls.post = cls.posts[-1]
+        Follow.objects.create(user=cls.reader, author=cls.author)
+        Like.objects.create(user=cls.reader, post=cls.post)
+        Comment.objects.create(author=cls.reader, post=cls.post,
+                               text='Комментарий')
+        cls.urls = {
+            'posts:index': reverse('posts:index', urlconf=ASYNC_URLS),
+            'posts:group_list': reverse(
+                'posts:group_list', kwargs={'slug': 'group'},
+                urlconf=ASYNC_URLS),
+            'posts:profile': reverse(
+                'posts:profile', kwargs={'username': 'author'},
+                urlconf=ASYNC_URLS),
+            'posts:follow_index': reverse(
+                'posts:follow_index', urlconf=ASYNC_URLS),
+        }
+
+    def setUp(self):
+        cache.clear()
+        self.async_client = AsyncClient()
+        self.async_client.force_login(self.reader)
+        self.client = Client()
+        self.client.force_login(self.reader)
+
+    async def test_feeds_match_sync_views(self):
+        """Ленты показывают те же посты, что и синхронные view"""
+        expected = [post.id for post in reversed(self.posts)]
+        for name, url in self.urls.items():
+            with self.subTest(name=name):
+                response = await self.async_client.get(url)
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(page_ids(response), expected)
+
+    async def test_profile_context(self):
+        response = await self.async_client.get(self.urls['posts:profile'])
+        self.assertTrue(response.context['following'])
+        self.assertEqual(response.context['post_amount'], len(self.posts))
+
+    async def test_post_detail(self):
+        """Пост, комментарии и нравлик загружаются одновременно"""
+        response = await self.async_client.get(reverse(
+            'posts:post_detail', kwargs={'post_id': self.post.id}))
+        self.assertEqual(response.context['post'], self.post)
+        self.assertTrue(response.context['post'].is_liked)
+        self.assertEqual(len(response.context['comments'].object_list), 1)
+
+    async def test_missing_objects_return_404(self):
+        urls = (
+            reverse('posts:post_detail', kwargs={'post_id': 0}),
+            reverse('posts:group_list', kwargs={'slug': 'none'}),
+            reverse('posts:profile', kwargs={'username': 'none'}),
+        )
+        # страницу 404 Django 4.0 строит в отдельном потоке, а сессию
+        # вошедшего пользователя там не видно из-за транзакции теста
+        for url in urls:
+            with self.subTest(url=url):
+                response = await AsyncClient().get(url)
+                self.assertEqual(response.status_code, 404)
+
+    async def test_follow_index_requires_login(self):
+        response = await AsyncClient().get(self.urls['posts:follow_index'])
+        self.assertEqual(response.status_code, 302)
+        self.assertIn(reverse('login'), response.url)
+
+    async def test_unchanged_page_returns_304(self):
+        url = self.urls['posts:index']
+        etag = (await self.async_client.get(url))['ETag']
+        # AsyncClient в Django 4.0 берет имена заголовков как есть
+        response = await self.async_client.get(
+            url, **{'if-none-match': etag})
+        self.assertEqual(response.status_code, 304)
+
+
+@override_settings(ROOT_URLCONF=ASYNC_URLS, ASYNC_PARALLEL_QUERIES=True)
+class ParallelQueriesTest(TransactionTestCase):
+    """Запросы view в пуле потоков видят зафиксированные данные"""
+
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user(username='author')
+        self.post = Post.objects.create(author=self.author, text='Пост')
+
+    async def test_profile_with_parallel_queries(self):
+        response = await AsyncClient().get(
+            reverse('posts:profile', kwargs={'username': 'author'}))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(page_ids(response), [self.post.id])
+        self.assertFalse(response.context['following'])
@@ -0,0 +1,357 @@
+import csv
+import gzip
+import json
+import os
+import shutil
+import tempfile
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+import pyarrow.parquet as pq
+
+from ..analytics import POST_COLUMNS, REPORTS, write_parquet
+from ..models import Comment, Follow, Group, Like, Post, TimelineEntry
+
+User = get_user_model()
+
+
+class RebuildLikeCountsTest(TestCase):
+    """Тестирование пересчета счетчиков нравликов"""
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.readers = [User.objects.create_user(username=f'reader{i}')
+                       for i in range(3)]
+        cls.post = Post.objects.create(author=cls.author, text='Пост')
+        cls.quiet_post = Post.objects.create(author=cls.author, text='Тишина')
+
+    def test_rebuild_like_counts(self):
+        """Команда восстанавливает счетчики по таблице Like"""
+        Like.objects.bulk_create(
+            Like(user=reader, post=self.post) for reader in self.readers)
+        Post.objects.filter(id=self.quiet_post.id).update(like_count=7)
+        call_command('rebuild_like_counts', stdout=StringIO())
+        self.post.refresh_from_db()
+        self.quiet_post.refresh_from_db()
+        self.assertEqual(self.post.like_count, len(self.readers))
+        self.assertEqual(self.quiet_post.like_count, 0)
+
+
+class BackfillTimelinesTest(TestCase):
+    """Тестирование заполнения лент подписок"""
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.posts = Post.objects.bulk_create(
+            Post(author=cls.author, text=f'Пост {i}') for i in range(3))
+        Follow.objects.bulk_create(
+            [Follow(user=cls.reader, author=cls.author)])
+
+    def test_backfill_timelines(self):
+        """Команда раскладывает старые посты по лентам подписчиков"""
+        self.assertFalse(TimelineEntry.objects.exists())
+        call_command('backfill_timelines', stdout=StringIO())
+        self.assertEqual(
+            set(TimelineEntry.objects.filter(user=self.reader)
+                .values_list('post_id', flat=True)),
+            {post.id for post in self.posts})
+        call_command('backfill_timelines', stdout=StringIO())
+        self.assertEqual(TimelineEntry.objects.count(), len(self.posts))
+
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class GenerateThumbnailsTest(TestCase):
+    """Тестирование нарезки миниатюр для старых постов"""
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        small_gif = (
+            b'\x47\x49\x46\x38\x39\x61\x02\x00'
+            b'\x01\x00\x80\x00\x00\x00\x00\x00'
+            b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+            b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+            b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+            b'\x0A\x00\x3B'
+        )
+        cls.post = Post.objects.create(
+            author=cls.author,
+            text='С картинкой',
+            image=SimpleUploadedFile(name='small.gif', content=small_gif,
+                                     content_type='image/gif'))
+        cls.text_post = Post.objects.create(author=cls.author, text='Текст')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def test_generate_thumbnails(self):
+        """Команда нарезает миниатюры только постам с картинками"""
+        call_command('generate_thumbnails', stdout=StringIO())
+        self.post.refresh_from_db()
+        self.text_post.refresh_from_db()
+        self.assertEqual(set(self.post.thumbnails),
+                         set(settings.POST_THUMBNAILS))
+        self.assertEqual(self.text_post.thumbnails, {})
+
+
+class BenchCommandsTest(TestCase):
+    """Тестирование генератора данных и прогона бенчмарка"""
+    def test_seed_bench_caps_pairs(self):
+        """Пар просят больше, чем их есть: генератор берет все и не виснет"""
+        call_command('seed_bench', users=3, groups=1, posts=2, comments=0,
+                     likes=50, follows=50, stdout=StringIO())
+        self.assertEqual(Follow.objects.count(), 3 * 2)
+        self.assertEqual(Like.objects.count(), 3 * 2)
+        call_command('seed_bench', users=1, groups=1, posts=0, comments=0,
+                     likes=50, follows=50, seed=7, stdout=StringIO())
+        self.assertEqual(Follow.objects.count(), 4 * 3)
+        self.assertEqual(Like.objects.count(), 4 * 2)
+
+    def test_seed_bench_leaves_real_rows_alone(self):
+        """Генератор пишет только от своих пользователей и в свои группы"""
+        user = User.objects.create_user(username='benchmark_fan')
+        group = Group.objects.create(title='Группа', slug='bench-real')
+        post = Post.objects.create(author=user, group=group, text='Пост')
+        call_command('seed_bench', users=3, groups=1, posts=5, comments=5,
+                     likes=50, follows=50, stdout=StringIO())
+        self.assertEqual(list(Post.objects.filter(author=user)), [post])
+        self.assertEqual(list(group.posts.all()), [post])
+        self.assertFalse(Comment.objects.filter(post=post).exists())
+        self.assertFalse(Like.objects.filter(post=post).exists())
+        self.assertFalse(Like.objects.filter(user=user).exists())
+        self.assertFalse(Follow.objects.filter(user=user).exists())
+        self.assertFalse(Follow.objects.filter(author=user).exists())
+
+    def test_seed_and_run_bench(self):
+        """seed_bench наполняет базу, run_bench пишет отчет и ищет регрессии"""
+        call_command('seed_bench', users=5, groups=2, posts=30, comments=10,
+                     likes=20, follows=8, stdout=StringIO())
+        self.assertEqual(Post.objects.count(), 30)
+        self.assertEqual(Follow.objects.count(), 8)
+        self.assertTrue(TimelineEntry.objects.exists())
+
+        bench_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, bench_dir, ignore_errors=True)
+        output = os.path.join(bench_dir, 'results.json')
+        baseline = os.path.join(bench_dir, 'baseline.json')
+        likes, comments = Like.objects.count(), Comment.objects.count()
+        call_command('run_bench', iterations=2, warmup=0,
+                     output=output, baseline=baseline,
+                     save_baseline=True, stdout=StringIO())
+        self.assertEqual(Like.objects.count(), likes)
+        self.assertEqual(Comment.objects.count(), comments)
+        with open(output) as report_file:
+            report = json.load(report_file)
+        self.assertIn('index', report['results'])
+        self.assertIn('p95', report['results']['index'])
+
+        report['results']['index']['queries'] = 0
+        with open(baseline, 'w') as baseline_file:
+            json.dump(report, baseline_file)
+        with self.assertRaisesMessage(CommandError, 'index'):
+            call_command('run_bench', iterations=2, warmup=0,
+                         output=output, baseline=baseline,
+                         tolerance=100, stdout=StringIO())
+
+
+class LoadTestCommandTest(TransactionTestCase):
+    """Тестирование сравнения WSGI и ASGI"""
+
+    def test_loadtest_reports_both_modes(self):
+        call_command('seed_bench', users=5, groups=2, posts=20, comments=5,
+                     likes=10, follows=5, stdout=StringIO())
+        output_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, output_dir, ignore_errors=True)
+        output = os.path.join(output_dir, 'loadtest.json')
+        call_command('loadtest', requests=10, concurrency=2, wsgi_threads=2,
+                     db_latency=0, output=output, stdout=StringIO())
+        with open(output) as report:
+            results = json.load(report)
+        for mode in ('wsgi', 'asgi'):
+            self.assertEqual(results[mode]['requests'], 10)
+
+
+class BenchLikesCommandTest(TransactionTestCase):
+    """Тестирование замера записи нравликов"""
+
+    def test_bench_likes_keeps_counts(self):
+        call_command('seed_bench', users=5, groups=2, posts=5, comments=0,
+                     likes=0, follows=0, stdout=StringIO())
+        output_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, output_dir, ignore_errors=True)
+        output = os.path.join(output_dir, 'likes.json')
+        call_command('bench_likes', clicks=20, concurrency=1, factor=2,
+                     hot_posts=2, output=output, stdout=StringIO())
+        with open(output) as report:
+            results = json.load(report)
+        self.assertTrue(results['consistent'])
+        for threads in (1, 2):
+            self.assertEqual(results[f'buffered_{threads}']['clicks'], 20)
+
+
+class ExportImportTest(TestCase):
+    """Тестирование выгрузки и загрузки JSONL"""
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание')
+        cls.post = Post.objects.create(
+            author=cls.author, group=cls.group, text='Пост')
+        Post.objects.create(author=cls.reader, text='Пост без группы')
+        Comment.objects.create(
+            author=cls.reader, post=cls.post, text='Комментарий')
+        Like.objects.create(user=cls.reader, post=cls.post)
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def setUp(self):
+        export_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, export_dir, ignore_errors=True)
+        self.path = os.path.join(export_dir, 'posts.jsonl.gz')
+
+    def test_export_then_import_restores_data(self):
+        """Выгрузка в gzip и загрузка в пустую базу сохраняют данные"""
+        pub_date = Post.objects.get(id=self.post.id).pub_date
+        call_command('export_posts', self.path, chunk_size=1,
+                     stdout=StringIO())
+        with gzip.open(self.path, 'rt', encoding='utf-8') as export:
+            models = [json.loads(line)['model'] for line in export]
+        self.assertEqual(
+            models, ['group', 'post', 'post', 'comment', 'like', 'follow'])
+
+        Post.objects.all().delete()
+        Follow.objects.all().delete()
+        Group.objects.all().delete()
+        User.objects.filter(username='reader').delete()
+        call_command('import_posts', self.path, batch_size=1,
+                     stdout=StringIO())
+
+        post = Post.objects.get(text='Пост')
+        self.assertEqual(post.pub_date, pub_date)
+        self.assertEqual(post.group.slug, 'group')
+        self.assertEqual(post.like_count, 1)
+        self.assertEqual(post.comments.get().author.username, 'reader')
+        reader = User.objects.get(username='reader')
+        self.assertFalse(reader.has_usable_password())
+        self.assertTrue(
+            Follow.objects.filter(user=reader, author=self.author).exists())
+        self.assertTrue(
+            TimelineEntry.objects.filter(user=reader, post=post).exists())
+        self.assertEqual(reader.stats.posts_count, 1)
+
+    def test_import_skips_existing_rows(self):
+        """Повторная загрузка того же файла ничего не дублирует"""
+        call_command('export_posts', self.path, stdout=StringIO())
+        for _ in range(2):
+            out = StringIO()
+            call_command('import_posts', self.path, stdout=out)
+            self.assertIn('post: 0, пропущено 2', out.getvalue())
+            self.assertEqual(Group.objects.count(), 1)
+            self.assertEqual(Follow.objects.count(), 1)
+            self.assertEqual(Like.objects.count(), 1)
+            self.assertEqual(Post.objects.count(), 2)
+            self.assertEqual(Comment.objects.count(), 1)
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.like_count, 1)
+
+
+class AnalyticsExportTest(TestCase):
+    """Тестирование выгрузки аналитики по постам и авторам"""
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.quiet = User.objects.create_user(username='quiet')
+        start = timezone.now() - timedelta(days=3)
+        cls.posts = Post.objects.bulk_create(
+            Post(author=cls.author, text=f'Пост {day}', like_count=day)
+            for day in range(3))
+        for day, post in enumerate(cls.posts):
+            Post.objects.filter(id=post.id).update(
+                pub_date=start + timedelta(days=day))
+        Post.objects.create(author=cls.quiet, text='Единственный')
+        Comment.objects.bulk_create(
+            Comment(author=cls.quiet, post=cls.posts[0], text='Привет')
+            for _ in range(2))
+
+    def setUp(self):
+        export_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, export_dir, ignore_errors=True)
+        self.dir = export_dir
+
+    def test_export_authors_csv_in_chunks(self):
+        """Сводка по авторам одинакова при любом размере порции"""
+        path = os.path.join(self.dir, 'authors.csv')
+        call_command('export_analytics', 'authors', path, chunk_size=1,
+                     stdout=StringIO())
+        with open(path, encoding='utf-8') as report:
+            rows = {row['author']: row for row in csv.DictReader(report)}
+        self.assertEqual(rows['author']['posts'], '3')
+        self.assertEqual(rows['author']['likes'], '3')
+        self.assertEqual(rows['author']['comments'], '2')
+        self.assertEqual(rows['author']['hours_between_posts'], '24.0')
+        self.assertEqual(rows['author']['posts_per_week'], '10.5')
+        self.assertEqual(rows['quiet']['hours_between_posts'], '')
+
+    def test_export_posts_parquet(self):
+        """Сводка по постам пишется в Parquet по группам строк"""
+        path = os.path.join(self.dir, 'posts.parquet')
+        call_command('export_analytics', 'posts', path, chunk_size=2,
+                     stdout=StringIO())
+        report = pq.ParquetFile(path)
+        self.assertEqual(report.metadata.num_rows, 4)
+        self.assertEqual(report.metadata.num_row_groups, 2)
+        rows = report.read().to_pylist()
+        self.assertEqual(rows[0]['post_id'], self.posts[0].id)
+        self.assertEqual(rows[0]['comment_count'], 2)
+        self.assertEqual(rows[2]['like_count'], 2)
+
+    def test_export_empty_parquet(self):
+        """Пустая выгрузка и пустая порция дают файл со схемой отчета"""
+        path = os.path.join(self.dir, 'empty.parquet')
+        self.assertEqual(
+            write_parquet('posts', path, queryset=Post.objects.none()), 0)
+        self.assertEqual(pq.read_schema(path).names,
+                         [name for name, _ in POST_COLUMNS])
+        empty_chunks = (POST_COLUMNS, lambda queryset, chunk_size: [[]])
+        with mock.patch.dict(REPORTS, posts=empty_chunks):
+            self.assertEqual(write_parquet('posts', path), 0)
+        report = pq.ParquetFile(path)
+        self.assertEqual(report.metadata.num_rows, 0)
+        self.assertEqual(report.schema_arrow.names,
+                         [name for name, _ in POST_COLUMNS])
+
+    def test_admin_action_streams_csv(self):
+        """Действие админки отдает CSV потоком по выбранным постам"""
+        admin = User.objects.create_superuser(
+            username='admin', password='password')
+        self.client.force_login(admin)
+        response = self.client.post(
+            reverse('admin:posts_post_changelist'),
+            {'action': 'export_posts_csv',
+             '_selected_action': [post.id for post in self.posts]})
+        self.assertTrue(response.streaming)
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(lines[0], 'post_id,author,group,pub_date,'
+                                   'like_count,comment_count')
+        self.assertEqual(len(lines), len(self.posts) + 1)
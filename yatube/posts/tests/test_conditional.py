@@ -0,0 +1,133 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from ..models import Comment, Group, Post
+
+User = get_user_model()
+
+
+class ConditionalGetTest(TestCase):
+    """Тестирование ответов 304 по ETag и Last-Modified"""
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(title='Группа', slug='group')
+        cls.other_group = Group.objects.create(title='Другая', slug='other')
+        cls.post = Post.objects.create(
+            author=cls.author, group=cls.group, text='Пост')
+        cls.INDEX_URL = reverse('posts:index')
+        cls.GROUP_URL = reverse('posts:group_list',
+                                kwargs={'slug': cls.group.slug})
+        cls.PROFILE_URL = reverse('posts:profile',
+                                  kwargs={'username': cls.author.username})
+        cls.POST_DETAIL_URL = reverse('posts:post_detail',
+                                      kwargs={'post_id': cls.post.id})
+        cls.FOLLOW_INDEX_URL = reverse('posts:follow_index')
+
+    def setUp(self):
+        cache.clear()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.reader)
+
+    def etag(self, url, client=None):
+        return (client or self.authorized_client).get(url)['ETag']
+
+    def test_matching_etag_gives_not_modified(self):
+        """Повторный запрос с тем же ETag получает 304 без тела"""
+        urls = (self.INDEX_URL, self.GROUP_URL, self.PROFILE_URL,
+                self.POST_DETAIL_URL, self.FOLLOW_INDEX_URL)
+        for url in urls:
+            with self.subTest(url=url):
+                etag = self.etag(url)
+                response = self.authorized_client.get(
+                    url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 304)
+                self.assertEqual(response.content, b'')
+
+    def test_last_modified_only_for_anonymous(self):
+        """Last-Modified отдается только анонимам"""
+        response = self.client.get(self.INDEX_URL)
+        response = self.client.get(
+            self.INDEX_URL,
+            HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+        self.assertEqual(response.status_code, 304)
+        response = self.authorized_client.get(self.INDEX_URL)
+        self.assertFalse(response.has_header('Last-Modified'))
+
+    def test_viewer_changes_etag(self):
+        """Аноним и пользователь получают разные ETag"""
+        self.assertNotEqual(self.etag(self.POST_DETAIL_URL, self.client),
+                            self.etag(self.POST_DETAIL_URL))
+
+    def test_new_post_changes_feeds(self):
+        """Новый пост меняет ETag главной, группы, профиля и подписок"""
+        urls = (self.INDEX_URL, self.GROUP_URL, self.PROFILE_URL,
+                self.FOLLOW_INDEX_URL)
+        etags = {url: self.etag(url) for url in urls}
+        with self.captureOnCommitCallbacks(execute=True):
+            Post.objects.create(
+                author=self.author, group=self.group, text='Новый пост')
+        for url in urls:
+            with self.subTest(url=url):
+                self.assertNotEqual(self.etag(url), etags[url])
+
+    def test_bulk_command_changes_feeds(self):
+        """Массовая команда меняет ETag всех лент, даже без сигналов"""
+        urls = (self.INDEX_URL, self.GROUP_URL, self.PROFILE_URL,
+                self.POST_DETAIL_URL, self.FOLLOW_INDEX_URL)
+        etags = {url: self.etag(url) for url in urls}
+        Post.objects.bulk_create([
+            Post(author=self.author, group=self.group, text='Импорт')])
+        self.assertEqual(self.etag(self.INDEX_URL), etags[self.INDEX_URL])
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command('rebuild_like_counts', stdout=StringIO())
+        for url in urls:
+            with self.subTest(url=url):
+                self.assertNotEqual(self.etag(url), etags[url])
+
+    def test_moved_post_changes_previous_group(self):
+        """Перенос поста в другую группу меняет и старую ленту группы"""
+        etag = self.etag(self.GROUP_URL)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.post.group = self.other_group
+            self.post.save()
+        self.assertNotEqual(self.etag(self.GROUP_URL), etag)
+
+    def test_like_and_comment_change_post_detail(self):
+        """Нравлик и комментарий меняют ETag страницы поста"""
+        etag = self.etag(self.POST_DETAIL_URL)
+        self.authorized_client.get(
+            reverse('posts:post_like', kwargs={'post_id': self.post.id}),
+            HTTP_REFERER=self.INDEX_URL)
+        liked_etag = self.etag(self.POST_DETAIL_URL)
+        self.assertNotEqual(liked_etag, etag)
+        Comment.objects.create(
+            author=self.reader, post=self.post, text='Комментарий')
+        self.assertNotEqual(self.etag(self.POST_DETAIL_URL), liked_etag)
+
+    def test_follow_changes_profile(self):
+        """Подписка меняет ETag профиля автора"""
+        etag = self.etag(self.PROFILE_URL)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.authorized_client.get(reverse(
+                'posts:profile_follow',
+                kwargs={'username': self.author.username}))
+        self.assertNotEqual(self.etag(self.PROFILE_URL), etag)
+
+    def test_missing_pages_still_404(self):
+        """Валидаторы не мешают отдавать 404"""
+        urls = (
+            reverse('posts:post_detail', kwargs={'post_id': 0}),
+            reverse('posts:group_list', kwargs={'slug': 'missing'}),
+            reverse('posts:profile', kwargs={'username': 'missing'}),
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                self.assertEqual(self.client.get(url).status_code, 404)
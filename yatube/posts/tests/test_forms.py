@@ -7,6 +7,7 @@ from django.urls import reverse
 from django.core.files.uploadedfile import SimpleUploadedFile
 from django.core.cache import cache
 
+from jobs.worker import run_pending
 from posts.models import Group, Post, Comment
 from django.conf import settings
 
@@ -79,6 +80,33 @@ class PostCreateFormTests(TestCase):
         self.assertEqual(post.author.id, self.author.id)
         self.assertEqual(post.image, 'posts/small.gif')
 
+    def test_create_post_generates_thumbnails(self):
+        """Миниатюры нарезаются фоновой задачей после сохранения поста"""
+        small_gif = (
+            b'\x47\x49\x46\x38\x39\x61\x02\x00'
+            b'\x01\x00\x80\x00\x00\x00\x00\x00'
+            b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+            b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+            b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+            b'\x0A\x00\x3B'
+        )
+        uploaded = SimpleUploadedFile(
+            name='thumb.gif',
+            content=small_gif,
+            content_type='image/gif'
+        )
+        self.authorized_client.post(
+            reverse('posts:post_create'),
+            data={'text': 'С картинкой', 'image': uploaded})
+        post = Post.objects.get(text='С картинкой')
+        self.assertEqual(post.thumbnails, {})
+        self.assertEqual(run_pending(), 1)
+        post.refresh_from_db()
+        self.assertEqual(set(post.thumbnails), set(settings.POST_THUMBNAILS))
+        response = self.authorized_client.get(
+            reverse('posts:post_detail', kwargs={'post_id': post.id}))
+        self.assertContains(response, post.thumbnails['detail'])
+
     def test_edit_post(self):
         """Редактирование поста авторизованным автором"""
         post_count = Post.objects.count()
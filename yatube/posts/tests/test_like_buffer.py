@@ -0,0 +1,156 @@
+import datetime
+import os
+import shutil
+import tempfile
+import threading
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from ..like_buffer import (append_event, flush_likes, has_events,
+                           read_events)
+from ..models import Like, Post
+
+User = get_user_model()
+
+TEMP_SPOOL = tempfile.mkdtemp()
+SPOOL_PATH = os.path.join(TEMP_SPOOL, 'likes.log')
+
+
+@override_settings(LIKE_BUFFER_PATH=SPOOL_PATH)
+class LikeBufferTest(TestCase):
+    """Тестирование отложенной записи нравликов"""
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.post = Post.objects.create(author=cls.author, text='Пост')
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(TEMP_SPOOL, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.reader)
+        self.detail_url = reverse('posts:post_detail',
+                                  kwargs={'post_id': self.post.id})
+
+    def tearDown(self):
+        for name in os.listdir(TEMP_SPOOL):
+            os.remove(os.path.join(TEMP_SPOOL, name))
+
+    def toggle_like(self, **data):
+        return self.client.post(
+            reverse('posts:post_like_toggle',
+                    kwargs={'post_id': self.post.id}),
+            data, HTTP_ACCEPT='application/json')
+
+    def like_count(self):
+        return Post.objects.values_list('like_count', flat=True).get(
+            id=self.post.id)
+
+    def test_click_waits_for_flush(self):
+        """Клик попадает в базу только при сбросе, но виден сразу"""
+        response = self.toggle_like()
+        self.assertEqual(response.json(), {'liked': True, 'like_count': 1})
+        self.assertFalse(Like.objects.exists())
+        post = self.client.get(self.detail_url).context['post']
+        self.assertTrue(post.is_liked)
+        self.assertEqual(post.like_count, 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            stats = flush_likes()
+        self.assertEqual(stats['inserted'], 1)
+        self.assertTrue(Like.objects.filter(
+            user=self.reader, post=self.post).exists())
+        self.assertEqual(self.like_count(), 1)
+        post = self.client.get(self.detail_url).context['post']
+        self.assertTrue(post.is_liked)
+        self.assertEqual(post.like_count, 1)
+
+    def test_events_fold_per_pair(self):
+        """Из серии кликов пары применяется только последнее состояние"""
+        for _ in range(3):
+            self.toggle_like()
+        self.assertEqual(self.toggle_like(liked='1').json()['like_count'], 1)
+        other = User.objects.create_user(username='other')
+        append_event(other.id, self.post.id, True)
+        append_event(other.id, self.post.id, False)
+
+        stats = flush_likes()
+        self.assertEqual(stats['events'], 5)
+        self.assertEqual(stats['pairs'], 2)
+        self.assertEqual((stats['inserted'], stats['deleted']), (1, 0))
+        self.assertEqual(Like.objects.count(), 1)
+        self.assertEqual(self.like_count(), 1)
+
+    def test_unlike_and_repeat_flush(self):
+        """Снятие уменьшает счетчик, повторный сброс ничего не меняет"""
+        Like.objects.create(user=self.reader, post=self.post)
+        Post.objects.filter(id=self.post.id).update(like_count=1)
+        response = self.toggle_like(liked='0')
+        self.assertEqual(response.json(), {'liked': False, 'like_count': 0})
+        self.assertEqual(flush_likes()['deleted'], 1)
+        self.assertEqual(flush_likes()['events'], 0)
+        self.assertFalse(Like.objects.exists())
+        self.assertEqual(self.like_count(), 0)
+
+    def test_late_unlike_removes_own_boost(self):
+        """Нравлик, снятый через сутки, снимает только свой вклад"""
+        other = User.objects.create_user(username='other')
+        append_event(self.reader.id, self.post.id, True)
+        append_event(other.id, self.post.id, True)
+        flush_likes()
+        score = Post.objects.get(id=self.post.id).trend_score
+        append_event(other.id, self.post.id, False)
+        later = timezone.now() + datetime.timedelta(days=1)
+        with mock.patch('django.utils.timezone.now', return_value=later):
+            self.assertEqual(flush_likes()['deleted'], 1)
+        self.assertAlmostEqual(
+            Post.objects.get(id=self.post.id).trend_score, score / 2,
+            places=6)
+
+    def test_has_events(self):
+        """Сброс нужен, пока в журнале есть события"""
+        self.assertFalse(has_events())
+        self.toggle_like()
+        self.assertTrue(has_events())
+        flush_likes()
+        self.assertFalse(has_events())
+
+    def test_deleted_post_is_skipped(self):
+        append_event(self.reader.id, self.post.id + 1000, True)
+        self.toggle_like()
+        stats = flush_likes()
+        self.assertEqual(stats['pairs'], 2)
+        self.assertEqual(stats['inserted'], 1)
+
+    def test_concurrent_appends_are_not_lost(self):
+        """Записи из потоков не теряются и не перемешиваются"""
+        def write(user_id):
+            for post_id in range(100):
+                append_event(user_id, post_id, True)
+
+        threads = [threading.Thread(target=write, args=(user_id,))
+                   for user_id in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        events = list(read_events(SPOOL_PATH))
+        self.assertEqual(len(events), 800)
+        self.assertEqual(len(set(events)), 800)
+
+    @override_settings(LIKE_BUFFER_PATH='')
+    def test_disabled_buffer_writes_immediately(self):
+        self.toggle_like()
+        self.assertTrue(Like.objects.exists())
+        self.assertIsNone(flush_likes())
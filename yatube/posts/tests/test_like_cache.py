@@ -0,0 +1,118 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..like_cache import load_liked_ids, update_liked_ids
+from ..models import Follow, Group, Like, Post
+
+User = get_user_model()
+
+
+class LikeCacheTest(TestCase):
+    """Тестирование кэша нравликов пользователя"""
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(title='Группа', slug='group')
+        cls.posts = [Post.objects.create(author=cls.author, group=cls.group,
+                                         text=f'Пост {i}')
+                     for i in range(5)]
+        Like.objects.create(user=cls.reader, post=cls.posts[1])
+        Post.objects.filter(id=cls.posts[1].id).update(like_count=1)
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.reader)
+
+    def like_queries(self, url):
+        with CaptureQueriesContext(connection) as captured:
+            response = self.client.get(url)
+        table = Like._meta.db_table
+        return response, [query for query in captured
+                          if f'FROM "{table}"' in query['sql']]
+
+    def test_page_reads_likes_once(self):
+        """Нравлики грузятся при первой странице, дальше считаются в памяти"""
+        url = reverse('posts:index')
+        _, queries = self.like_queries(url)
+        self.assertEqual(len(queries), 1)
+        response, queries = self.like_queries(url)
+        self.assertEqual(queries, [])
+        liked = {post.id for post in response.context['page_obj']
+                 if post.is_liked}
+        self.assertEqual(liked, {self.posts[1].id})
+
+    def test_toggle_updates_cached_ids(self):
+        """Клик правит массив в кэше, не перечитывая нравлики"""
+        load_liked_ids(self.reader.id)
+        url = reverse('posts:post_like_toggle',
+                      kwargs={'post_id': self.posts[3].id})
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(url, {'liked': '1'})
+        self.assertEqual(list(load_liked_ids(self.reader.id)),
+                         [self.posts[1].id, self.posts[3].id])
+        response, queries = self.like_queries(reverse(
+            'posts:post_detail', kwargs={'post_id': self.posts[3].id}))
+        self.assertEqual(queries, [])
+        self.assertTrue(response.context['post'].is_liked)
+
+    def test_orm_like_resets_cache(self):
+        load_liked_ids(self.reader.id)
+        with self.captureOnCommitCallbacks(execute=True):
+            Like.objects.create(user=self.reader, post=self.posts[0])
+        self.assertEqual(list(load_liked_ids(self.reader.id)),
+                         [self.posts[0].id, self.posts[1].id])
+
+    def test_untoggle_updates_cached_ids(self):
+        """Снятие нравлика тоже правит массив, а не сбрасывает его"""
+        load_liked_ids(self.reader.id)
+        url = reverse('posts:post_like_toggle',
+                      kwargs={'post_id': self.posts[1].id})
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(url, {'liked': '0'})
+        self.assertEqual(list(load_liked_ids(self.reader.id)), [])
+        _, queries = self.like_queries(reverse('posts:index'))
+        self.assertEqual(queries, [])
+
+    def test_orm_delete_resets_cache(self):
+        """Удаление через ORM, в том числе каскадом, сбрасывает кэш"""
+        Like.objects.create(user=self.reader, post=self.posts[2])
+        load_liked_ids(self.reader.id)
+        with self.captureOnCommitCallbacks(execute=True):
+            Like.objects.filter(post=self.posts[1]).delete()
+        self.assertEqual(list(load_liked_ids(self.reader.id)),
+                         [self.posts[2].id])
+        with self.captureOnCommitCallbacks(execute=True):
+            self.posts[2].delete()
+        self.assertEqual(list(load_liked_ids(self.reader.id)), [])
+
+    def test_all_feeds_mark_likes(self):
+        """Сердечки отмечены в ленте группы, профиля и подписок"""
+        urls = (
+            reverse('posts:group_list', kwargs={'slug': 'group'}),
+            reverse('posts:profile', kwargs={'username': 'author'}),
+            reverse('posts:follow_index'),
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                liked = {post.id for post in response.context['page_obj']
+                         if post.is_liked}
+                self.assertEqual(liked, {self.posts[1].id})
+                self.assertContains(
+                    response, 'name="liked" value="0"', count=1)
+
+    def test_update_keeps_ids_sorted(self):
+        load_liked_ids(self.author.id)
+        for post_id in (7, 3, 9, 3, 1):
+            update_liked_ids(self.author.id, post_id, True)
+        update_liked_ids(self.author.id, 9, False)
+        update_liked_ids(self.author.id, 4, False)
+        self.assertEqual(list(load_liked_ids(self.author.id)), [1, 3, 7])
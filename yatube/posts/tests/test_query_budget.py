@@ -0,0 +1,169 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from core.testing import over_budget, namespace_urls, query_counts
+from posts import urls as posts_urls
+from ..like_cache import load_liked_ids
+from ..models import Comment, Follow, Group, Like, Post
+
+User = get_user_model()
+
+FEW_ROWS = 10
+MANY_ROWS = 10_000
+# маршруты, которые меняют данные и на GET; их бюджет проверяется
+# отдельно, как у записи
+WRITE_ROUTES = ('posts:post_like', 'posts:profile_follow',
+                'posts:profile_unfollow')
+
+
+class QueryBudgetTest(TestCase):
+    """Число запросов к страницам не зависит от объема данных"""
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        cls.post = Post.objects.create(
+            author=cls.author, group=cls.group, text='Тестовый пост')
+        urls = namespace_urls(
+            posts_urls,
+            post_id=cls.post.id,
+            username=cls.author.username,
+            slug=cls.group.slug,
+        )
+        cls.write_urls = {name: urls.pop(name) for name in WRITE_ROUTES}
+        cls.urls = urls
+
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(self.reader)
+
+    def fill(self, amount):
+        """Догоняет объем постов, комментариев и нравликов до amount"""
+        readers = User.objects.bulk_create(
+            User(username=f'reader-{amount}-{i}')
+            for i in range(amount // 100))
+        Follow.objects.bulk_create(
+            Follow(user=reader, author=self.author) for reader in readers)
+        posts = Post.objects.bulk_create(
+            Post(author=self.author, group=self.group, text=f'Пост {i}')
+            for i in range(amount - Post.objects.count()))
+        Comment.objects.bulk_create(
+            Comment(author=readers[i % len(readers)], post=self.post,
+                    text=f'Комментарий {i}')
+            for i in range(amount // 100))
+        Like.objects.bulk_create(
+            Like(user=reader, post=post)
+            for reader in readers for post in posts[:100])
+
+    def test_query_ceiling_independent_of_rows(self):
+        """Бюджет запросов держится и на 10, и на 10 000 записей"""
+        self.fill(FEW_ROWS)
+        cache.clear()
+        few = query_counts(self.client, self.urls)
+        self.fill(MANY_ROWS)
+        cache.clear()
+        many = query_counts(self.client, self.urls)
+        self.assertEqual(over_budget(few), {})
+        self.assertEqual(over_budget(many), {})
+        self.assertEqual(few, many)
+
+    def write_counts(self):
+        """Нравлик, подписка и отписка; нравлик затем снимается"""
+        counts = query_counts(self.client, self.write_urls)
+        Like.objects.filter(user=self.reader).delete()
+        return counts
+
+    def test_write_routes_independent_of_rows(self):
+        """Записи через GET укладываются в бюджет на любом объеме"""
+        self.fill(FEW_ROWS)
+        cache.clear()
+        few = self.write_counts()
+        self.fill(MANY_ROWS)
+        cache.clear()
+        many = self.write_counts()
+        self.assertEqual(over_budget(few), {})
+        self.assertEqual(few, many)
+
+
+class FeedQueriesTest(TestCase):
+    """Авторы, группы и комментаторы грузятся пачкой, а не по строке"""
+    # сессия и пользователь + запросы самой страницы
+    FEED_QUERIES = {
+        'posts:index': 2 + 1,
+        'posts:group_list': 2 + 3,
+        'posts:profile': 2 + 4,
+        'posts:post_detail': 2 + 3,
+        'posts:follow_index': 2 + 1,
+    }
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.reader = User.objects.create_user(username='reader')
+        cls.author = User.objects.create_user(username='author')
+        cls.group = Group.objects.create(title='Группа', slug='group')
+        Follow.objects.create(user=cls.reader, author=cls.author)
+        for i in range(settings.POSTS_ON_PAGE):
+            author = User.objects.create_user(username=f'author{i}')
+            group = Group.objects.create(title=f'Группа {i}',
+                                         slug=f'group{i}')
+            Follow.objects.create(user=cls.reader, author=author)
+            Post.objects.create(author=author, group=group, text=f'Пост {i}')
+            Post.objects.create(author=cls.author, group=cls.group,
+                                text=f'Пост автора {i}')
+        cls.post = Post.objects.filter(author=cls.author).first()
+        for i in range(settings.POSTS_ON_PAGE):
+            commenter = User.objects.create_user(username=f'commenter{i}')
+            Comment.objects.create(author=commenter, post=cls.post,
+                                   text=f'Комментарий {i}')
+        cls.urls = {
+            'posts:index': reverse('posts:index'),
+            'posts:group_list': reverse('posts:group_list',
+                                        kwargs={'slug': cls.group.slug}),
+            'posts:profile': reverse('posts:profile',
+                                     kwargs={'username': cls.author}),
+            'posts:post_detail': reverse('posts:post_detail',
+                                         kwargs={'post_id': cls.post.id}),
+            'posts:follow_index': reverse('posts:follow_index'),
+        }
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.reader)
+
+    def test_feed_pages_run_fixed_queries(self):
+        """Каждая страница выполняет фиксированное число запросов"""
+        # нравлики читателя уже в кэше, страницы считают их в памяти
+        load_liked_ids(self.reader.id)
+        for view_name, url in self.urls.items():
+            with self.subTest(view_name=view_name):
+                with self.assertNumQueries(self.FEED_QUERIES[view_name]):
+                    self.client.get(url)
+
+
+@override_settings(QUERY_BUDGET_ENABLED=True)
+class QueryBudgetMiddlewareTest(TestCase):
+    """Тестирование middleware бюджета запросов"""
+
+    def test_server_timing_header(self):
+        """Число и время запросов отдаются в Server-Timing"""
+        response = Client().get(reverse('posts:index'))
+        self.assertRegex(response['Server-Timing'],
+                         r'^db;dur=[\d.]+;desc="\d+ queries", total;dur=')
+
+    @override_settings(QUERY_BUDGETS={'posts:index': 0})
+    def test_over_budget_is_logged(self):
+        """Превышение бюджета попадает в лог"""
+        with self.assertLogs('core.middleware', level='WARNING') as logs:
+            Client().get(reverse('posts:index'))
+        self.assertIn('posts:index', logs.output[0])
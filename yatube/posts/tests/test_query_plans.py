@@ -0,0 +1,76 @@
+from unittest import skipUnless
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..models import Comment, Follow, Group, Like, Post
+
+User = get_user_model()
+
+
+@skipUnless(connection.vendor == 'sqlite', 'EXPLAIN QUERY PLAN есть в SQLite')
+class FeedQueryPlanTest(TestCase):
+    """Запросы лент идут по индексам, без полного скана и сортировки"""
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        Follow.objects.create(user=cls.reader, author=cls.author)
+        for i in range(settings.POSTS_ON_PAGE * 2):
+            Post.objects.create(
+                author=cls.author, group=cls.group, text=f'Пост {i}')
+        cls.post = Post.objects.first()
+        Comment.objects.create(
+            author=cls.reader, post=cls.post, text='Комментарий')
+        Like.objects.create(user=cls.reader, post=cls.post)
+
+        cls.tested_urls = [
+            reverse('posts:index'),
+            reverse('posts:group_list', kwargs={'slug': cls.group.slug}),
+            reverse('posts:profile',
+                    kwargs={'username': cls.author.username}),
+            reverse('posts:post_detail', kwargs={'post_id': cls.post.id}),
+            reverse('posts:follow_index'),
+        ]
+
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(self.reader)
+
+    def query_plan(self, sql):
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+            return [row[-1] for row in cursor.fetchall()]
+
+    def feed_queries(self, url):
+        """Запросы к таблицам posts первой и второй страницы ленты"""
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+            page_obj = response.context.get('page_obj')
+            if page_obj is not None and page_obj.has_next():
+                self.client.get(url, {'cursor': page_obj.next_cursor})
+        return [query['sql'] for query in queries
+                if query['sql'].startswith('SELECT')
+                and 'posts_' in query['sql']]
+
+    def test_feed_queries_use_indexes(self):
+        """Ни один запрос ленты не сканирует таблицу и не сортирует"""
+        for url in self.tested_urls:
+            for sql in self.feed_queries(url):
+                plan = self.query_plan(sql)
+                with self.subTest(url=url, sql=sql, plan=plan):
+                    self.assertFalse(
+                        any('TEMP B-TREE' in step for step in plan))
+                    self.assertFalse(
+                        any(step.startswith('SCAN posts_')
+                            and 'INDEX' not in step for step in plan))
@@ -0,0 +1,126 @@
+from io import StringIO
+from unittest import skipUnless
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from ..models import Post
+from ..search import FTS_TABLE, build_match_query
+from .test_views import MALFORMED_CURSORS, raw_cursor
+
+User = get_user_model()
+
+
+class BuildMatchQueryTest(TestCase):
+    def test_operators_are_quoted(self):
+        """Операторы FTS5 из ввода пользователя не исполняются"""
+        self.assertEqual(build_match_query('кот OR "пес" NEAR(x'),
+                         '"кот" "or" "пес" "near" "x"*')
+        self.assertEqual(build_match_query(' !!! '), '')
+
+
+@skipUnless(connection.vendor == 'sqlite', 'FTS5 есть только в SQLite')
+class SearchViewTest(TestCase):
+    """Тестирование полнотекстового поиска"""
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.cat_posts = [
+            Post.objects.create(author=cls.author,
+                                text=f'Пост {i} про кота и <b>разметку</b>')
+            for i in range(15)
+        ]
+        cls.dog_post = Post.objects.create(author=cls.author,
+                                           text='Пост про пса')
+        cls.SEARCH_URL = reverse('posts:search')
+
+    def setUp(self):
+        self.client = Client()
+
+    def test_search_finds_and_highlights(self):
+        """Поиск находит посты и подсвечивает совпадение в сниппете"""
+        response = self.client.get(self.SEARCH_URL, {'q': 'пса'})
+        self.assertEqual(list(response.context['page_obj']),
+                         [self.dog_post])
+        self.assertContains(response, '<mark>пса</mark>')
+
+    def test_snippet_is_escaped(self):
+        """Разметка из текста поста в сниппете экранируется"""
+        response = self.client.get(self.SEARCH_URL, {'q': 'кота'})
+        self.assertContains(response, '&lt;b&gt;')
+        self.assertNotContains(response, '<b>разметку')
+
+    def test_search_follows_text_changes(self):
+        """Индекс следует за изменением и удалением постов"""
+        self.dog_post.text = 'Пост про ежа'
+        self.dog_post.save()
+        response = self.client.get(self.SEARCH_URL, {'q': 'ежа'})
+        self.assertEqual(list(response.context['page_obj']),
+                         [self.dog_post])
+        self.dog_post.delete()
+        response = self.client.get(self.SEARCH_URL, {'q': 'ежа'})
+        self.assertEqual(list(response.context['page_obj']), [])
+
+    def test_search_cursor_pages(self):
+        """Результаты листаются по курсорам без повторов"""
+        response = self.client.get(self.SEARCH_URL, {'q': 'кота'})
+        first_page = response.context['page_obj']
+        response = self.client.get(
+            self.SEARCH_URL, {'q': 'кота', 'cursor': first_page.next_cursor})
+        second_page = response.context['page_obj']
+        self.assertEqual(
+            {post.id for post in first_page} | {post.id
+                                                for post in second_page},
+            {post.id for post in self.cat_posts})
+        self.assertFalse(second_page.has_next())
+        response = self.client.get(
+            self.SEARCH_URL,
+            {'q': 'кота', 'cursor': second_page.previous_cursor})
+        self.assertEqual(list(response.context['page_obj']),
+                         list(first_page))
+
+    def test_forged_cursor_shows_first_page(self):
+        """Подделанный курсор поиска дает первую страницу, а не ошибку"""
+        response = self.client.get(self.SEARCH_URL, {'q': 'кота'})
+        first_page = list(response.context['page_obj'])
+        shapes = MALFORMED_CURSORS + [
+            ['n', [1e308, 10 ** 30]],
+            ['n', [1e308]],
+            ['n', [-1.5, 1, 2]],
+            ['n', ['rank', 1]],
+            ['n', [True, 1]],
+            ['n', [-1.5, 1.5]],
+        ]
+        for shape in shapes:
+            with self.subTest(shape=shape):
+                response = self.client.get(
+                    self.SEARCH_URL,
+                    {'q': 'кота', 'cursor': raw_cursor(shape)})
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(list(response.context['page_obj']),
+                                 first_page)
+
+    def test_admin_search_uses_index(self):
+        """Поиск в админке идет по полнотекстовому индексу"""
+        admin = User.objects.create_superuser(username='admin')
+        self.client.force_login(admin)
+        response = self.client.get(
+            reverse('admin:posts_post_changelist'), {'q': 'пса'})
+        self.assertEqual(list(response.context['cl'].result_list),
+                         [self.dog_post])
+
+    def test_rebuild_search_index(self):
+        """Команда заново наполняет индекс пачками"""
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('delete-all')")
+        response = self.client.get(self.SEARCH_URL, {'q': 'пса'})
+        self.assertEqual(list(response.context['page_obj']), [])
+        call_command('rebuild_search_index', batch_size=4, stdout=StringIO())
+        response = self.client.get(self.SEARCH_URL, {'q': 'пса'})
+        self.assertEqual(list(response.context['page_obj']),
+                         [self.dog_post])
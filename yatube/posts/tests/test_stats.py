@@ -0,0 +1,86 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from ..models import AuthorStats, Post
+
+User = get_user_model()
+
+
+class AuthorStatsTest(TestCase):
+    """Тестирование денормализованных счетчиков автора"""
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(self.reader)
+
+    def stats(self, user):
+        return AuthorStats.objects.get(user=user)
+
+    def test_post_create_and_delete(self):
+        """Создание и удаление поста меняют счетчик постов"""
+        post = Post.objects.create(author=self.author, text='Пост')
+        Post.objects.create(author=self.author, text='Еще пост')
+        self.assertEqual(self.stats(self.author).posts_count, 2)
+        post.delete()
+        self.assertEqual(self.stats(self.author).posts_count, 1)
+
+    def test_follow_and_unfollow(self):
+        """Подписка и отписка меняют счетчики обеих сторон"""
+        self.client.get(reverse('posts:profile_follow',
+                                kwargs={'username': self.author.username}))
+        self.assertEqual(self.stats(self.author).followers_count, 1)
+        self.assertEqual(self.stats(self.reader).following_count, 1)
+        self.client.get(reverse('posts:profile_unfollow',
+                                kwargs={'username': self.author.username}))
+        self.assertEqual(self.stats(self.author).followers_count, 0)
+        self.assertEqual(self.stats(self.reader).following_count, 0)
+
+    def test_views_show_post_amount(self):
+        """Профиль и страница поста берут число постов из счетчика"""
+        post = Post.objects.create(author=self.author, text='Пост')
+        AuthorStats.objects.filter(user=self.author).update(posts_count=42)
+        urls = (
+            reverse('posts:profile',
+                    kwargs={'username': self.author.username}),
+            reverse('posts:post_detail', kwargs={'post_id': post.id}),
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertEqual(response.context['post_amount'], 42)
+
+    def test_missing_stats_are_counted(self):
+        """Потерянная запись считается при показе, а создается записью"""
+        Post.objects.create(author=self.author, text='Пост')
+        AuthorStats.objects.filter(user=self.author).delete()
+        response = self.client.get(reverse(
+            'posts:profile', kwargs={'username': self.author.username}))
+        self.assertEqual(response.context['post_amount'], 1)
+        self.assertFalse(
+            AuthorStats.objects.filter(user=self.author).exists())
+        Post.objects.create(author=self.author, text='Еще пост')
+        self.assertEqual(self.stats(self.author).posts_count, 2)
+
+    def test_reconcile_author_stats(self):
+        """Команда сверки чинит разошедшиеся и потерянные счетчики"""
+        Post.objects.bulk_create(
+            Post(author=self.author, text=f'Пост {i}') for i in range(3))
+        AuthorStats.objects.filter(user=self.reader).delete()
+        AuthorStats.objects.filter(user=self.author).update(
+            followers_count=5)
+        out = StringIO()
+        call_command('reconcile_author_stats', stdout=out)
+        self.assertIn('Создано записей: 1', out.getvalue())
+        author_stats = self.stats(self.author)
+        self.assertEqual(author_stats.posts_count, 3)
+        self.assertEqual(author_stats.followers_count, 0)
+        self.assertTrue(AuthorStats.objects.filter(user=self.reader).exists())
@@ -0,0 +1,163 @@
+import datetime
+from io import StringIO
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from ..likes import set_like
+from ..models import Comment, Post, TrendingState
+from ..trending import rebuild_trending, trend_boost
+from .test_views import raw_cursor
+
+User = get_user_model()
+
+
+@override_settings(TRENDING_TOP_K=15)
+class TrendingTest(TestCase):
+    """Тестирование популярного"""
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.posts = Post.objects.bulk_create(
+            Post(author=cls.author, text=f'Пост {i}') for i in range(20))
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.reader)
+
+    def like(self, post):
+        self.client.get(
+            reverse('posts:post_like', kwargs={'post_id': post.id}),
+            HTTP_REFERER=reverse('posts:index'))
+
+    def score(self, post):
+        post.refresh_from_db()
+        return post.trend_score
+
+    def test_like_and_comment_add_score(self):
+        """Нравлик и комментарий прибавляют очки, снятый нравлик — убирает"""
+        post = self.posts[0]
+        self.like(post)
+        self.assertGreater(self.score(post), 0)
+        self.like(post)
+        self.assertAlmostEqual(self.score(post), 0, places=6)
+        Comment.objects.create(author=self.reader, post=post, text='Да')
+        self.assertAlmostEqual(
+            self.score(post), settings.TRENDING_COMMENT_WEIGHT, places=2)
+
+    def test_late_unlike_removes_own_boost(self):
+        """Нравлик, снятый через сутки, снимает только свой вклад"""
+        post = self.posts[0]
+        fans = [User.objects.create_user(username=f'fan{number}')
+                for number in range(10)]
+        for fan in fans:
+            set_like(fan, post, liked=True)
+        score = self.score(post)
+        later = timezone.now() + datetime.timedelta(days=1)
+        with mock.patch('django.utils.timezone.now', return_value=later):
+            set_like(fans[0], post, liked=False)
+        self.assertAlmostEqual(self.score(post), score * 9 / 10, places=6)
+        self.assertEqual([post_id for post_id, _ in rebuild_trending(later)],
+                         [post.id])
+
+    def test_newer_events_weigh_more(self):
+        """Событие через полупериод весит вдвое больше"""
+        now = timezone.now()
+        later = now + datetime.timedelta(
+            seconds=settings.TRENDING_HALF_LIFE)
+        self.assertAlmostEqual(
+            trend_boost(1, later) / trend_boost(1, now), 2)
+
+    def test_boost_reads_current_epoch(self):
+        """Перенос эпохи другим процессом сразу меняет прибавку"""
+        now = timezone.now()
+        trend_boost(1, now)
+        TrendingState.load()
+        TrendingState.objects.update(epoch=now)
+        self.assertAlmostEqual(trend_boost(1, now), 1)
+
+    def test_rebuild_keeps_top_k_by_score(self):
+        """Топ собирается по очкам и не длиннее TRENDING_TOP_K"""
+        for number, post in enumerate(self.posts):
+            Post.objects.filter(id=post.id).update(trend_score=number)
+        top = rebuild_trending()
+        self.assertEqual(len(top), 15)
+        self.assertEqual([post_id for post_id, _ in top],
+                         [post.id for post in self.posts[:4:-1]])
+
+    @override_settings(TRENDING_WINDOW=30 * 24 * 60 * 60)
+    def test_rebase_keeps_order(self):
+        """Перенос эпохи уменьшает очки, но не меняет порядок"""
+        Post.objects.filter(id=self.posts[0].id).update(trend_score=8)
+        Post.objects.filter(id=self.posts[1].id).update(trend_score=4)
+        state = TrendingState.load()
+        later = state.epoch + datetime.timedelta(
+            seconds=settings.TRENDING_REBASE_AFTER
+            + settings.TRENDING_HALF_LIFE)
+        top = rebuild_trending(later)
+        state.refresh_from_db()
+        self.assertEqual(state.epoch, later)
+        self.assertEqual([post_id for post_id, _ in top],
+                         [self.posts[0].id, self.posts[1].id])
+        self.assertLess(self.score(self.posts[0]), 8)
+
+    def test_popular_pages_walk_stored_top(self):
+        """Страница популярного идет по собранному топу курсорами"""
+        for number, post in enumerate(self.posts):
+            Post.objects.filter(id=post.id).update(trend_score=number + 1)
+        call_command('rebuild_trending', stdout=StringIO())
+        response = self.client.get(reverse('posts:popular'))
+        first_page = response.context['page_obj']
+        self.assertEqual([post.id for post in first_page],
+                         [post.id for post in self.posts[:-11:-1]])
+        response = self.client.get(reverse('posts:popular'),
+                                   {'cursor': first_page.next_cursor})
+        second_page = response.context['page_obj']
+        self.assertEqual(len(second_page), 5)
+        self.assertFalse(second_page.has_next())
+        response = self.client.get(reverse('posts:popular'),
+                                   {'cursor': second_page.previous_cursor})
+        self.assertEqual(list(response.context['page_obj']),
+                         list(first_page))
+
+    def test_popular_rejects_forged_rank(self):
+        """Курсор с чужим местом в топе дает первую страницу"""
+        for number, post in enumerate(self.posts):
+            Post.objects.filter(id=post.id).update(trend_score=number + 1)
+        rebuild_trending()
+        first_page = list(
+            self.client.get(reverse('posts:popular')).context['page_obj'])
+        for shape in (['n', [True]], ['p', [False]], ['n', [-5]],
+                      ['p', [15]], ['n', [10 ** 30]], ['n', ['1']],
+                      ['n', [1.5]], ['n', [1, 2]]):
+            with self.subTest(shape=shape):
+                response = self.client.get(reverse('posts:popular'),
+                                           {'cursor': raw_cursor(shape)})
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(list(response.context['page_obj']),
+                                 first_page)
+
+    def test_popular_reads_stored_top(self):
+        """Популярное берет посты по id из топа, без ORDER BY по очкам"""
+        Post.objects.filter(id=self.posts[0].id).update(trend_score=1)
+        rebuild_trending()
+        # сессия, пользователь, посты топа и отметки нравликов
+        with self.assertNumQueries(4) as queries:
+            response = self.client.get(reverse('posts:popular'))
+        self.assertEqual(list(response.context['page_obj']), [self.posts[0]])
+        for query in queries.captured_queries:
+            self.assertNotIn('trend_score', query['sql'].split('FROM')[-1])
+
+    def test_popular_without_top(self):
+        """Пока топ не собран, страница популярного пустая"""
+        response = self.client.get(reverse('posts:popular'))
+        self.assertContains(response, 'Популярных постов пока нет')
@@ -1,15 +1,37 @@
+import base64
+import json
+
 from django.contrib.auth import get_user_model
 from django.test import Client, TestCase
 from django.urls import reverse
 from django import forms
 from django.core.files.uploadedfile import SimpleUploadedFile
 from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 
-from posts.models import Group, Post, Comment, Follow
+from posts.models import Group, Post, Comment, Follow, Like, TimelineEntry
 from django.conf import settings
 
 User = get_user_model()
 
+# токены, которые декодируются, но не подходят ключу сортировки
+MALFORMED_CURSORS = [
+    ['n', ['garbage', 1]],
+    ['n', [None, None]],
+    ['n', [[1], {}]],
+    ['p', ['2022-01-01T00:00:00+00:00', 'id']],
+    [None, None],
+    [[1], {}],
+    ['n', ['2022-01-01T00:00:00+00:00', 10 ** 30]],
+    ['n', ['2022-01-01T00:00:00', 1]],
+    ['n', ['2022-01-01T00:00:00+00:00', True]],
+]
+
+
+def raw_cursor(shape):
+    return base64.urlsafe_b64encode(json.dumps(shape).encode()).decode()
+
 
 class PostsPagesTests(TestCase):
     """Тестирование view-функций приложения"""
@@ -59,6 +81,8 @@ class PostsPagesTests(TestCase):
 
         cls.POST_DETAIL_URL = reverse('posts:post_detail',
                                       kwargs={'post_id': cls.post.id})
+        cls.POST_LIKE_URL = reverse('posts:post_like',
+                                    kwargs={'post_id': cls.post.id})
 
         cls.PAGE_404 = '/non_existing/'
         cls.INDEX_URL = reverse('posts:index')
@@ -229,6 +253,111 @@ class PostsPagesTests(TestCase):
         self.assertNotEqual(response.content,
                             self.authorized_client.get(self.INDEX_URL).content)
 
+    def test_index_like_state(self):
+        """Отметки нравликов на главной не зависят от числа постов"""
+        self.authorized_reader.get(self.POST_LIKE_URL,
+                                   HTTP_REFERER=self.INDEX_URL)
+        response = self.authorized_reader.get(self.INDEX_URL)
+        first_post = response.context['page_obj'][0]
+        self.assertEqual(first_post.like_count, 1)
+        self.assertTrue(first_post.is_liked)
+        response = self.authorized_client.get(self.INDEX_URL)
+        self.assertFalse(response.context['page_obj'][0].is_liked)
+
+        with CaptureQueriesContext(connection) as few_posts:
+            self.authorized_reader.get(self.INDEX_URL)
+        Post.objects.bulk_create(
+            Post(author=self.author, text=f'Пост {i}')
+            for i in range(settings.POSTS_ON_PAGE * 2))
+        with CaptureQueriesContext(connection) as many_posts:
+            self.authorized_reader.get(self.INDEX_URL)
+        self.assertEqual(len(few_posts), len(many_posts))
+
+    def test_post_like_updates_counter(self):
+        """Нравлик меняет счетчик поста вместе с записью Like"""
+        self.authorized_reader.get(self.POST_LIKE_URL,
+                                   HTTP_REFERER=self.POST_DETAIL_URL)
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.like_count, 1)
+        self.assertTrue(
+            Like.objects.filter(user=self.reader, post=self.post).exists())
+        self.authorized_reader.get(self.POST_LIKE_URL,
+                                   HTTP_REFERER=self.POST_DETAIL_URL)
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.like_count, 0)
+        self.assertFalse(
+            Like.objects.filter(user=self.reader, post=self.post).exists())
+
+    def toggle_like(self, client, **data):
+        return client.post(
+            reverse('posts:post_like_toggle',
+                    kwargs={'post_id': self.post.id}),
+            data, HTTP_ACCEPT='application/json')
+
+    def test_like_toggle_returns_state(self):
+        """Переключатель отдает новое состояние и счетчик в JSON"""
+        response = self.toggle_like(self.authorized_reader)
+        self.assertEqual(response.json(), {'liked': True, 'like_count': 1})
+        response = self.toggle_like(self.authorized_reader)
+        self.assertEqual(response.json(), {'liked': False, 'like_count': 0})
+
+    def test_like_toggle_is_idempotent(self):
+        """Повторный запрос с тем же liked не меняет ни Like, ни счетчик"""
+        for _ in range(2):
+            response = self.toggle_like(self.authorized_reader, liked='1')
+            self.assertEqual(response.json(),
+                             {'liked': True, 'like_count': 1})
+        self.assertEqual(
+            Like.objects.filter(user=self.reader, post=self.post).count(), 1)
+        for _ in range(2):
+            response = self.toggle_like(self.authorized_reader, liked='0')
+            self.assertEqual(response.json(),
+                             {'liked': False, 'like_count': 0})
+
+    def test_like_toggle_survives_existing_like(self):
+        """Уже стоящий нравлик не приводит к ошибке unique_like"""
+        Like.objects.create(user=self.reader, post=self.post)
+        Post.objects.filter(id=self.post.id).update(like_count=1)
+        response = self.toggle_like(self.authorized_reader, liked='1')
+        self.assertEqual(response.json(), {'liked': True, 'like_count': 1})
+
+    def test_like_toggle_rejects_guests_and_get(self):
+        self.assertEqual(self.toggle_like(Client()).status_code, 401)
+        response = self.authorized_reader.get(reverse(
+            'posts:post_like_toggle', kwargs={'post_id': self.post.id}))
+        self.assertEqual(response.status_code, 405)
+
+    def test_like_toggle_form_without_js_redirects_back(self):
+        response = self.authorized_reader.post(
+            reverse('posts:post_like_toggle',
+                    kwargs={'post_id': self.post.id}),
+            {'liked': '1'}, HTTP_REFERER=self.INDEX_URL)
+        self.assertRedirects(response, self.INDEX_URL)
+        self.assertTrue(
+            Like.objects.filter(user=self.reader, post=self.post).exists())
+
+    def test_post_card_fragment_cache(self):
+        """Карточка поста берется из кэша, пока не выросла версия поста"""
+        self.authorized_client.get(self.INDEX_URL)
+        Post.objects.filter(id=self.post.id).update(text='Новый текст')
+        response = self.authorized_client.get(self.INDEX_URL)
+        self.assertContains(response, self.post.text)
+        self.assertNotContains(response, 'Новый текст')
+        post = Post.objects.get(id=self.post.id)
+        post.save()
+        response = self.authorized_client.get(self.INDEX_URL)
+        self.assertContains(response, 'Новый текст')
+
+    def test_post_version_bumps(self):
+        """Версия поста растет при нравлике и комментарии"""
+        version = Post.objects.get(id=self.post.id).version
+        self.authorized_reader.get(self.POST_LIKE_URL,
+                                   HTTP_REFERER=self.POST_DETAIL_URL)
+        Comment.objects.create(author=self.reader, post=self.post,
+                               text='Комментарий')
+        self.assertEqual(Post.objects.get(id=self.post.id).version,
+                         version + 2)
+
     def test_follow(self):
         """Тестирование подписки"""
         response = self.authorized_reader.get(self.FOLLOW_INDEX_URL)
@@ -268,6 +397,20 @@ class PostsPagesTests(TestCase):
             len(response_follow.context['page_obj'].object_list),
             post_counter_follow + 1)
 
+    def test_follow_index_reads_timeline(self):
+        """Лента подписок читается из TimelineEntry без join по Follow"""
+        self.authorized_reader.get(self.FOLLOW_URL)
+        self.assertTrue(TimelineEntry.objects.filter(
+            user=self.reader, post=self.post).exists())
+        with CaptureQueriesContext(connection) as queries:
+            response = self.authorized_reader.get(self.FOLLOW_INDEX_URL)
+        self.assertEqual(list(response.context['page_obj']), [self.post])
+        for query in queries:
+            self.assertNotIn('posts_follow', query['sql'])
+        self.authorized_reader.get(self.UNFOLLOW_URL)
+        self.assertFalse(
+            TimelineEntry.objects.filter(user=self.reader).exists())
+
     def test_follow_index_page_not_shows(self):
         """Пост не попал неподписавшимся"""
         response_not_follow = self.authorized_client.get(self.FOLLOW_INDEX_URL)
@@ -334,3 +477,108 @@ class PaginatorViewTest(TestCase):
                 response = self.client.get(url + '?page=2')
                 self.assertEqual(len(response.context['page_obj']),
                                  self.posts_amount % settings.POSTS_ON_PAGE)
+
+    def test_cursor_pages_walk_whole_feed(self):
+        """Курсоры ведут по всей ленте вперед и обратно без повторов"""
+        response = self.client.get(self.INDEX_URL)
+        first_page = list(response.context['page_obj'])
+        next_cursor = response.context['page_obj'].next_cursor
+        response = self.client.get(self.INDEX_URL, {'cursor': next_cursor})
+        second_page = response.context['page_obj']
+        self.assertEqual(len(second_page),
+                         self.posts_amount % settings.POSTS_ON_PAGE)
+        self.assertFalse(second_page.has_next())
+        self.assertFalse(set(first_page) & set(second_page))
+        response = self.client.get(
+            self.INDEX_URL, {'cursor': second_page.previous_cursor})
+        self.assertEqual(list(response.context['page_obj']), first_page)
+        self.assertFalse(response.context['page_obj'].has_previous())
+
+    def test_cursor_page_avoids_count_and_offset(self):
+        """Страница по курсору не считает записи и не использует OFFSET"""
+        response = self.client.get(self.INDEX_URL)
+        next_cursor = response.context['page_obj'].next_cursor
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(self.INDEX_URL, {'cursor': next_cursor})
+        for query in queries:
+            with self.subTest(sql=query['sql']):
+                self.assertNotIn('COUNT(', query['sql'].upper())
+                self.assertNotIn('OFFSET', query['sql'].upper())
+
+    def test_broken_cursor_shows_first_page(self):
+        """Испорченный курсор не ломает страницу"""
+        response = self.client.get(self.INDEX_URL, {'cursor': 'garbage'})
+        self.assertEqual(len(response.context['page_obj']),
+                         settings.POSTS_ON_PAGE)
+
+    def test_malformed_cursor_shows_first_page(self):
+        """Курсор с чужими типами значений ведет на первую страницу"""
+        for shape in MALFORMED_CURSORS:
+            with self.subTest(shape=shape):
+                response = self.client.get(
+                    self.INDEX_URL, {'cursor': raw_cursor(shape)})
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(len(response.context['page_obj']),
+                                 settings.POSTS_ON_PAGE)
+
+
+class CommentsPaginationTest(TestCase):
+    """Тестирование постраничных комментариев"""
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.post = Post.objects.create(author=cls.author, text='Пост')
+        cls.comments_amount = settings.COMMENTS_ON_PAGE + 5
+        commenters = [User.objects.create_user(username=f'commenter{i}')
+                      for i in range(cls.comments_amount)]
+        Comment.objects.bulk_create(
+            Comment(author=commenter, post=cls.post, text=f'Комментарий {i}')
+            for i, commenter in enumerate(commenters))
+        cls.POST_DETAIL_URL = reverse('posts:post_detail',
+                                      kwargs={'post_id': cls.post.id})
+        cls.POST_COMMENTS_URL = reverse('posts:post_comments',
+                                        kwargs={'post_id': cls.post.id})
+
+    def test_post_detail_shows_first_comments(self):
+        """На странице поста только первая порция комментариев"""
+        response = self.client.get(self.POST_DETAIL_URL)
+        comments = response.context['comments']
+        self.assertEqual(len(comments), settings.COMMENTS_ON_PAGE)
+        self.assertEqual(comments[0].text, 'Комментарий 0')
+        self.assertTrue(comments.has_next())
+        self.assertContains(response, self.POST_COMMENTS_URL)
+
+    def test_comments_fragment_of_missing_post_is_404(self):
+        response = self.client.get(reverse(
+            'posts:post_comments', kwargs={'post_id': self.post.id + 1000}))
+        self.assertEqual(response.status_code, 404)
+
+    def test_comments_fragment_ignores_malformed_cursor(self):
+        for shape in MALFORMED_CURSORS:
+            with self.subTest(shape=shape):
+                response = self.client.get(
+                    self.POST_COMMENTS_URL, {'cursor': raw_cursor(shape)})
+                self.assertEqual(len(response.context['comments']),
+                                 settings.COMMENTS_ON_PAGE)
+
+    def test_comments_fragment_continues_from_cursor(self):
+        """Фрагмент отдает оставшиеся комментарии без разметки страницы"""
+        response = self.client.get(self.POST_DETAIL_URL)
+        next_cursor = response.context['comments'].next_cursor
+        response = self.client.get(self.POST_COMMENTS_URL,
+                                   {'cursor': next_cursor})
+        self.assertTemplateUsed(response, 'posts/includes/comment_list.html')
+        self.assertTemplateNotUsed(response, 'base.html')
+        comments = response.context['comments']
+        self.assertEqual(len(comments), 5)
+        self.assertEqual(comments[0].text,
+                         f'Комментарий {settings.COMMENTS_ON_PAGE}')
+        self.assertFalse(comments.has_next())
+        self.assertNotContains(response, 'data-comments-more')
+
+    def test_comments_fragment_runs_fixed_queries(self):
+        """Авторы комментариев грузятся тем же запросом"""
+        # проверка, что пост есть, и сами комментарии с авторами
+        with self.assertNumQueries(2):
+            self.client.get(self.POST_COMMENTS_URL)
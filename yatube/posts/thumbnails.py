@@ -0,0 +1,35 @@
+from django.conf import settings
+from django.db.models import F
+from django.utils import timezone
+from jobs.registry import enqueue
+from sorl.thumbnail import get_thumbnail
+
+from .freshness import post_markers, touch
+from .models import Post
+
+
+def generate_thumbnails(post_id):
+    """Нарезает все миниатюры POST_THUMBNAILS и сохраняет их адреса в пост"""
+    post = Post.objects.filter(id=post_id).only(
+        'id', 'image', 'author_id', 'group_id').first()
+    if post is None or not post.image:
+        return
+    thumbnails = {
+        name: get_thumbnail(post.image, geometry, **options).url
+        for name, (geometry, options) in settings.POST_THUMBNAILS.items()
+    }
+    # картинку могли заменить, пока нарезались миниатюры старой
+    updated = Post.objects.filter(id=post_id, image=post.image.name).update(
+        thumbnails=thumbnails, version=F('version') + 1,
+        modified_at=timezone.now())
+    if updated:
+        touch(*post_markers(post.author_id, post.group_id))
+
+
+def queue_thumbnails(post):
+    """Ставит нарезку миниатюр в очередь фоновых задач"""
+    enqueue(
+        'posts.generate_thumbnails',
+        {'post_id': post.id},
+        idempotency_key=f'thumbnails:{post.id}:{post.image.name}',
+    )
@@ -0,0 +1,41 @@
+from django.db import connection
+
+from .models import Follow, Post, TimelineEntry
+
+
+def _insert_from_select(select_sql, params):
+    """Вставляет записи ленты одним INSERT ... SELECT, пропуская дубли"""
+    table = connection.ops.quote_name(TimelineEntry._meta.db_table)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'INSERT INTO {table} (user_id, post_id, pub_date) '
+            f'{select_sql} ON CONFLICT DO NOTHING',
+            params,
+        )
+
+
+def fan_out_post(post):
+    """Раскладывает новый пост в ленты всех подписчиков автора"""
+    follow_table = connection.ops.quote_name(Follow._meta.db_table)
+    pub_date = TimelineEntry._meta.get_field('pub_date').get_db_prep_value(
+        post.pub_date, connection)
+    _insert_from_select(
+        f'SELECT user_id, %s, %s FROM {follow_table} '
+        f'WHERE author_id = %s AND user_id IS NOT NULL',
+        [post.id, pub_date, post.author_id],
+    )
+
+
+def add_author_posts(user_id, author_id):
+    """Добавляет в ленту пользователя посты автора после подписки"""
+    post_table = connection.ops.quote_name(Post._meta.db_table)
+    _insert_from_select(
+        f'SELECT %s, id, pub_date FROM {post_table} WHERE author_id = %s',
+        [user_id, author_id],
+    )
+
+
+def remove_author_posts(user_id, author_id):
+    """Убирает из ленты пользователя посты автора, от которого он отписался"""
+    TimelineEntry.objects.filter(
+        user_id=user_id, post__author_id=author_id).delete()
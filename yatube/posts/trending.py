@@ -0,0 +1,178 @@
+import datetime
+
+import numpy as np
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F, Value
+from django.db.models.functions import Greatest
+from django.utils import timezone
+from django.utils.functional import cached_property
+
+from .models import Post, TrendingState
+from .paginator import NEXT, CursorPaginator, decode_cursor
+
+TOP_KEY = 'trending:top'
+
+
+def epoch():
+    """Эпоха отсчета популярности.
+
+    Читается из базы в транзакции записи, рядом с очками: прибавка по
+    эпохе до перебазирования в 2 ** (TRENDING_REBASE_AFTER /
+    TRENDING_HALF_LIFE) раз больше правильной.
+    """
+    value = TrendingState.objects.filter(pk=1).values_list(
+        'epoch', flat=True).first()
+    if value is None:
+        value = TrendingState.load().epoch
+    return value.timestamp()
+
+
+def trend_boost(weight, now=None):
+    """Вклад события в trend_score.
+
+    Вместо того чтобы уменьшать все старые очки, новые события
+    умножаются на 2 в степени прошедших с эпохи полупериодов, поэтому
+    событие половину периода назад весит вдвое меньше нового.
+    """
+    now = timezone.now() if now is None else now
+    elapsed = now.timestamp() - epoch()
+    return weight * 2 ** (elapsed / settings.TRENDING_HALF_LIFE)
+
+
+def trend_update(weight):
+    """Выражение прибавки к trend_score для update()"""
+    return F('trend_score') + trend_boost(weight)
+
+
+def trend_change(weight, added=0, removed=()):
+    """Выражение trend_score для update(): added новых событий минус
+    отмененные события, случившиеся в моменты removed.
+
+    Отмененное событие снимается с тем множителем, с каким его
+    прибавили, а не с нынешним: иначе отмена через сутки снимала бы
+    в десятки раз больше. Очки не уходят ниже нуля.
+    """
+    start = epoch()
+    half_life = settings.TRENDING_HALF_LIFE
+    change = weight * (
+        added * 2 ** ((timezone.now().timestamp() - start) / half_life)
+        - sum(2 ** ((moment.timestamp() - start) / half_life)
+              for moment in removed))
+    score = F('trend_score') + change
+    return Greatest(score, Value(0.0)) if removed else score
+
+
+def rebase(state, now):
+    """Переносит эпоху в now, пока множители не ушли за пределы float.
+
+    Эпоха и очки меняются одной транзакцией, поэтому завышенной может
+    оказаться прибавка только той записи, что прочла эпоху до
+    фиксации переноса и пишет после нее.
+    """
+    with transaction.atomic():
+        state = TrendingState.objects.select_for_update().get(pk=state.pk)
+        factor = 2 ** -((now - state.epoch).total_seconds()
+                        / settings.TRENDING_HALF_LIFE)
+        state.epoch = now
+        state.save(update_fields=['epoch'])
+        Post.objects.filter(trend_score__gt=0).update(
+            trend_score=F('trend_score') * factor)
+    return state
+
+
+def rebuild_trending(now=None):
+    """Собирает топ TRENDING_TOP_K постов за TRENDING_WINDOW и сохраняет его"""
+    now = timezone.now() if now is None else now
+    state = TrendingState.load()
+    rebase_after = datetime.timedelta(seconds=settings.TRENDING_REBASE_AFTER)
+    if now - state.epoch > rebase_after:
+        state = rebase(state, now)
+
+    window_start = now - datetime.timedelta(
+        seconds=settings.TRENDING_WINDOW)
+    rows = Post.objects.filter(
+        pub_date__gte=window_start, trend_score__gt=0
+    ).values_list('id', 'trend_score')
+    candidates = np.array(list(rows), dtype=np.float64).reshape(-1, 2)
+    # очки к текущему моменту: одинаковый множитель для всех постов
+    # не меняет порядок, но дает сравнимые между сборками числа
+    scores = candidates[:, 1] * np.exp2(
+        (state.epoch.timestamp() - now.timestamp())
+        / settings.TRENDING_HALF_LIFE)
+    top_k = min(settings.TRENDING_TOP_K, len(scores))
+    if top_k:
+        best = np.argpartition(-scores, top_k - 1)[:top_k]
+        best = best[np.lexsort((-candidates[best, 0], -scores[best]))]
+    else:
+        best = np.array([], dtype=np.int64)
+    state.top = [[int(candidates[i, 0]), float(scores[i])] for i in best]
+    state.built_at = now
+    state.save(update_fields=['top', 'built_at'])
+    cache.set(TOP_KEY, state.top, settings.TRENDING_TOP_TIMEOUT)
+    return state.top
+
+
+def trending_top():
+    """Последний собранный топ, без обращения к базе при живом кэше"""
+    top = cache.get(TOP_KEY)
+    if top is None:
+        top = TrendingState.objects.filter(pk=1).values_list(
+            'top', flat=True).first() or []
+        cache.set(TOP_KEY, top, settings.TRENDING_TOP_TIMEOUT)
+    return top
+
+
+class TrendingPaginator(CursorPaginator):
+    """Курсорная пагинация по месту поста в собранном топе"""
+
+    def __init__(self, top, per_page):
+        super().__init__(Post.objects.none(), per_page, ordering=('rank',))
+        self.top = top
+
+    @cached_property
+    def approximate_count(self):
+        return len(self.top)
+
+    def _posts(self, ranked):
+        """Посты топа в порядке мест; удаленные посты пропускаются"""
+        posts = (
+            Post.objects.select_related('author', 'group')
+            .defer('group__description')
+            .in_bulk([post_id for _, (post_id, _) in ranked])
+        )
+        result = []
+        for rank, (post_id, score) in ranked:
+            post = posts.get(post_id)
+            if post is None:
+                continue
+            post.rank = rank
+            post.score = score
+            result.append(post)
+        return result
+
+    def valid_rank(self, values):
+        """Курсор хранит одно место, и оно есть в текущем топе"""
+        if len(values) != 1:
+            return False
+        rank = values[0]
+        return (isinstance(rank, int) and not isinstance(rank, bool)
+                and 0 <= rank < len(self.top))
+
+    def get_page(self, cursor=None):
+        decoded = decode_cursor(cursor) if cursor else None
+        if decoded is None or not self.valid_rank(decoded[1]):
+            direction, rank, had_cursor = NEXT, -1, False
+        else:
+            (direction, (rank,)), had_cursor = decoded, True
+        ranked = list(enumerate(self.top))
+        if direction == NEXT:
+            rows = ranked[rank + 1:rank + 2 + self.per_page]
+            has_more = len(rows) > self.per_page
+            rows = rows[:self.per_page]
+        else:
+            start = max(rank - self.per_page, 0)
+            rows = ranked[start:rank][::-1]
+            has_more = start > 0
+        return self._page(self._posts(rows), has_more, direction, had_cursor)
@@ -1,6 +1,6 @@
 from django.urls import path
 
-from . import views
+from . import api, views
 
 app_name = 'posts'
 
@@ -16,10 +16,22 @@ urlpatterns = [
     path('', views.index,
          name='index'),
 
+    path('popular/',
+         views.popular,
+         name='popular'),
+
+    path('search/',
+         views.search,
+         name='search'),
+
     path('posts/<int:post_id>/',
          views.post_detail,
          name='post_detail'),
 
+    path('posts/<int:post_id>/comments/',
+         views.post_comments,
+         name='post_comments'),
+
     path('create/',
          views.post_create,
          name='post_create'),
@@ -47,4 +59,32 @@ urlpatterns = [
      path('posts/<int:post_id>/like/',
          views.post_like,
          name='post_like'),
+
+    path('posts/<int:post_id>/like/toggle/',
+         views.post_like_toggle,
+         name='post_like_toggle'),
+
+    path('api/v1/posts/',
+         api.index,
+         name='api_index'),
+
+    path('api/v1/posts/<int:post_id>/',
+         api.post_detail,
+         name='api_post_detail'),
+
+    path('api/v1/posts/<int:post_id>/comments/',
+         api.post_comments,
+         name='api_post_comments'),
+
+    path('api/v1/groups/<slug:slug>/posts/',
+         api.group_posts,
+         name='api_group_posts'),
+
+    path('api/v1/profiles/<str:username>/posts/',
+         api.profile_posts,
+         name='api_profile_posts'),
+
+    path('api/v1/follow/posts/',
+         api.follow_posts,
+         name='api_follow_posts'),
          ]
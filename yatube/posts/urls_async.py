@@ -0,0 +1,26 @@
+import copy
+
+from . import async_views, urls
+
+app_name = urls.app_name
+
+# ленты заменяются async-версиями, остальные маршруты те же
+ASYNC_VIEWS = {
+    'index': async_views.index,
+    'group_list': async_views.group_posts,
+    'profile': async_views.profile,
+    'post_detail': async_views.post_detail,
+    'follow_index': async_views.follow_index,
+}
+
+
+def async_pattern(pattern):
+    view = ASYNC_VIEWS.get(pattern.name)
+    if view is None:
+        return pattern
+    pattern = copy.copy(pattern)
+    pattern.callback = view
+    return pattern
+
+
+urlpatterns = [async_pattern(pattern) for pattern in urls.urlpatterns]
@@ -1,45 +1,165 @@
 from django.shortcuts import get_object_or_404, render, redirect
-from django.core.paginator import Paginator
 from django.contrib.auth.decorators import login_required
 from django.urls import reverse
 from django.views.decorators.cache import cache_page
-from django.http import HttpResponseRedirect
+from django.contrib.auth.views import redirect_to_login
+from django.http import HttpResponseRedirect, JsonResponse
+from django.views.decorators.http import require_POST
+from django.db import transaction
 
 from django.conf import settings
-from .models import Group, Post, User, Follow, Like
+from core.routers import read_from_replica
+from .models import Comment, Group, Post, User, Follow, TimelineEntry
 from .forms import PostForm, CommentForm
+from .like_buffer import pending_likes
+from .like_cache import liked_among
+from .likes import set_like
+from .freshness import changed_at, conditional_page, marker
+from .paginator import CursorPaginator
+from .search import SearchPaginator, fts_available
+from .stats import get_stats
+from .thumbnails import queue_thumbnails
+from .trending import TrendingPaginator, trending_top
 
 
-def pagination(request, some_objs, obj_on_page):
+def pagination(request, some_objs, obj_on_page, **kwargs):
     """Возвращает выбранное количество постов на странице"""
-    paginator = Paginator(some_objs, obj_on_page)
-    page_number = request.GET.get('page')
-    return paginator.get_page(page_number)
+    paginator = CursorPaginator(some_objs, obj_on_page, **kwargs)
+    cursor = request.GET.get(paginator.cursor_query_param)
+    page_number = request.GET.get(paginator.page_query_param)
+    if cursor is None and page_number is not None:
+        page_obj = paginator.page_by_number(page_number)
+    else:
+        page_obj = paginator.get_page(cursor)
+    page_obj.params = request.GET
+    return page_obj
+
+
+def feed_posts():
+    """Посты с автором и группой одним запросом, без описания группы"""
+    return Post.objects.select_related('author', 'group').defer(
+        'group__description')
+
+
+def comments_page(request, post_id):
+    """Страница комментариев поста по курсору, от старых к новым"""
+    comments = Comment.objects.filter(post_id=post_id).select_related(
+        'author').order_by('pub_date', 'id')
+    return pagination(request, comments, settings.COMMENTS_ON_PAGE,
+                      ordering=('pub_date', 'id'))
+
+
+def liked_post_ids(request, post_ids):
+    """id постов, которые нравятся пользователю; None для анонима"""
+    if not request.user.is_authenticated:
+        return None
+    return liked_among(request.user.pk, post_ids)
+
+
+def apply_like_state(request, posts, liked_ids):
+    """Отмечает нравлики, учитывая еще не записанные из журнала"""
+    if liked_ids is None:
+        return posts
+    pending = pending_likes(request.user.pk, [post.id for post in posts])
+    for post in posts:
+        post.is_liked = post.id in liked_ids
+        if post.id in pending:
+            post.is_liked, delta = pending[post.id]
+            post.like_count += delta
+    return posts
+
+
+def set_like_state(request, posts):
+    """Отмечает посты страницы, которые нравятся пользователю"""
+    posts = list(posts)
+    return apply_like_state(
+        request, posts, liked_post_ids(request, [post.id for post in posts]))
+
+
+def feed_page(request, posts):
+    """Страница ленты с отметками нравликов"""
+    page_obj = pagination(request, posts, settings.POSTS_ON_PAGE)
+    page_obj.object_list = set_like_state(request, page_obj.object_list)
+    return page_obj
+
+
+def follow_page(request):
+    """Страница ленты подписок из таймлайна пользователя"""
+    entries = TimelineEntry.objects.filter(
+        user=request.user).select_related(
+            'post__author', 'post__group').defer('post__group__description')
+    page_obj = pagination(request, entries, settings.POSTS_ON_PAGE,
+                          ordering=('-pub_date', '-post_id'))
+    page_obj.object_list = set_like_state(
+        request, [entry.post for entry in page_obj.object_list])
+    return page_obj
+
+
+def is_following(request, username):
+    """Подписан ли пользователь на автора"""
+    return (request.user.is_authenticated
+            and Follow.objects.filter(
+                user=request.user, author__username=username).exists())
+
+
+def index_state(request):
+    return (changed_at([marker('index')]),)
+
+
+def group_state(request, slug):
+    group_id = Group.objects.filter(
+        slug=slug).values_list('id', flat=True).first()
+    if group_id is None:
+        return None
+    return (changed_at([marker('group', group_id)]),)
+
+
+def profile_state(request, username):
+    author_id = User.objects.filter(
+        username=username).values_list('id', flat=True).first()
+    if author_id is None:
+        return None
+    markers = [marker('profile', author_id)]
+    if request.user.is_authenticated:
+        markers.append(marker('follow', request.user.pk))
+    return (changed_at(markers),)
+
+
+def post_state(request, post_id):
+    row = Post.objects.filter(id=post_id).values_list(
+        'modified_at', 'version', 'author_id').first()
+    if row is None:
+        return None
+    modified_at, version, author_id = row
+    # число постов автора в сайдбаре меняется вместе с его лентой
+    changed = max(modified_at.timestamp(),
+                  changed_at([marker('profile', author_id)]))
+    return changed, version
+
+
+def follow_state(request):
+    # лента подписок меняется только вместе с каким-то постом, а любой
+    # пост отмечает главную; так не нужно читать список подписок
+    return (changed_at([marker('index'), marker('follow', request.user.pk)]),)
 
 
 # @cache_page(20, key_prefix='index_page')
+@read_from_replica
+@conditional_page(index_state)
 def index(request):
     """Отображает посты в хронологическом порядке"""
-    posts = Post.objects.all()
-    print(request.user)
-    for post in posts:
-            post.like_amount = Like.objects.filter(post=post).count()
-    if request.user.is_authenticated:
-        for post in posts:
-            is_liked = (Like.objects.filter(user=request.user, post=post).first())
-            if is_liked:
-                post.is_liked = True
-    page_obj = pagination(request, posts, settings.POSTS_ON_PAGE)
+    page_obj = feed_page(request, feed_posts())
     context = {'page_obj': page_obj}
     template = 'posts/index.html'
     return render(request, template, context)
 
 
+@read_from_replica
+@conditional_page(group_state)
 def group_posts(request, slug):
     """Отображает все посты выбранной группы"""
     group = get_object_or_404(Group, slug=slug)
-    posts = group.posts.all()
-    page_obj = pagination(request, posts, settings.POSTS_ON_PAGE)
+    page_obj = feed_page(request, feed_posts().filter(group=group))
     context = {
         'group': group,
         'page_obj': page_obj,
@@ -47,24 +167,54 @@ def group_posts(request, slug):
     return render(request, 'posts/group_list.html', context)
 
 
+@read_from_replica
+@conditional_page(profile_state)
 def profile(request, username):
     """Отображает все посты пользователя"""
-    author = get_object_or_404(User, username=username)
-    posts = Post.objects.select_related('author').filter(author=author)
-    post_amount = posts.count()
-    page_obj = pagination(request, posts, settings.POSTS_ON_PAGE)
-    following = (
-        request.user.is_authenticated
-        and Follow.objects.filter(user=request.user, author=author)
-    )
+    author = get_object_or_404(
+        User.objects.select_related('stats'), username=username)
+    stats = get_stats(author)
+    page_obj = feed_page(request, feed_posts().filter(author=author))
+    following = is_following(request, username)
     context = {'page_obj': page_obj,
                'author': author,
-               'post_amount': post_amount,
+               'post_amount': stats.posts_count,
+               'stats': stats,
                'following': following,
                }
     return render(request, 'posts/profile.html', context)
 
 
+def search(request):
+    """Полнотекстовый поиск по постам"""
+    query = request.GET.get('q', '').strip()
+    if fts_available():
+        paginator = SearchPaginator(query, settings.POSTS_ON_PAGE)
+        page_obj = paginator.get_page(
+            request.GET.get(paginator.cursor_query_param))
+        page_obj.params = request.GET
+    else:
+        posts = feed_posts().filter(
+            text__icontains=query) if query else Post.objects.none()
+        page_obj = pagination(request, posts, settings.POSTS_ON_PAGE)
+    context = {'page_obj': page_obj,
+               'query': query,
+               }
+    return render(request, 'posts/search.html', context)
+
+
+@read_from_replica
+def popular(request):
+    """Популярные посты из последнего собранного топа"""
+    paginator = TrendingPaginator(trending_top(), settings.POSTS_ON_PAGE)
+    page_obj = paginator.get_page(
+        request.GET.get(paginator.cursor_query_param))
+    page_obj.params = request.GET
+    page_obj.object_list = set_like_state(request, page_obj.object_list)
+    context = {'page_obj': page_obj}
+    return render(request, 'posts/popular.html', context)
+
+
 @login_required
 def post_create(request):
     """Позволяет создавать новые посты и выбирать теги"""
@@ -74,50 +224,87 @@ def post_create(request):
         return render(request, 'posts/post_create_form.html', {'form': form})
 
     form.instance.author = request.user
-    form.save()
+    with transaction.atomic():
+        post = form.save()
+    if post.image:
+        queue_thumbnails(post)
     return redirect(
         reverse('posts:profile', kwargs={'username': request.user.username})
     )
 
 
+@read_from_replica
+@conditional_page(post_state)
 def post_detail(request, post_id):
     """Отображает полный текст поста и детали"""
-    post = get_object_or_404(Post, id=post_id)
-    post_amount = (
-        Post.objects.select_related('author').
-        filter(author=post.author).count())
+    post = get_object_or_404(
+        feed_posts().select_related('author__stats'), id=post_id)
     form = CommentForm(request.POST or None)
-    post.like_amount = Like.objects.filter(post=post).count()
-    if request.user.is_authenticated:
-        already_liked = Like.objects.filter(user=request.user, post=post).count()
-        if already_liked:
-            post.is_liked = True
+    set_like_state(request, [post])
+    comments = comments_page(request, post.id)
     context = {'post': post,
-               'post_amount': post_amount,
-               'comments': post.comments.all(),
+               'post_amount': get_stats(post.author).posts_count,
+               'comments': comments,
                'form': form,}
     return render(request, 'posts/post_detail.html', context)
 
 
+def post_comments(request, post_id):
+    """Отдает следующую порцию комментариев HTML-фрагментом"""
+    post = get_object_or_404(Post.objects.only('id'), pk=post_id)
+    context = {'post_id': post.id,
+               'comments': comments_page(request, post.id),
+               }
+    return render(request, 'posts/includes/comment_list.html', context)
+
+
 @login_required
 def post_like(request, post_id):
     """Позволяет ставить постам нравлики"""
-    print(request)
-    post = get_object_or_404(Post, id=post_id)
-    existing_like = Like.objects.filter(user=request.user, post=post).first()
-    if not existing_like:
-        Like(user=request.user, post=post).save()
-        # return redirect('posts:post_detail', post_id=post_id)
-        return HttpResponseRedirect(request.META.get('HTTP_REFERER'))
-    existing_like.delete()
+    post = get_object_or_404(
+        Post.objects.only('id', 'author_id', 'group_id'), id=post_id)
+    set_like(request.user, post)
     # return redirect('posts:post_detail', post_id=post_id)
-    return HttpResponseRedirect(request.META.get('HTTP_REFERER'))
+    return HttpResponseRedirect(
+        request.META.get('HTTP_REFERER')
+        or reverse('posts:post_detail', kwargs={'post_id': post_id}))
+
+
+LIKED_VALUES = {'1': True, 'true': True, '0': False, 'false': False}
+
+
+@require_POST
+def post_like_toggle(request, post_id):
+    """Ставит или снимает нравлик и отдает новое состояние в JSON.
+
+    Параметр liked задает нужное состояние, поэтому повторный клик
+    ничего не ломает; без него нравлик переключается. Запрос формы без
+    JavaScript возвращается на прежнюю страницу.
+    """
+    wants_json = 'application/json' in request.headers.get('Accept', '')
+    if not request.user.is_authenticated:
+        if wants_json:
+            return JsonResponse({'error': 'Нужна авторизация'}, status=401)
+        return redirect_to_login(request.get_full_path())
+    liked = request.POST.get('liked', '').lower()
+    if liked and liked not in LIKED_VALUES:
+        return JsonResponse({'error': 'liked: 1 или 0'}, status=400)
+    post = get_object_or_404(
+        Post.objects.only('id', 'author_id', 'group_id'), id=post_id)
+    liked, like_count = set_like(
+        request.user, post, LIKED_VALUES.get(liked))
+    if not wants_json:
+        return HttpResponseRedirect(
+            request.META.get('HTTP_REFERER')
+            or reverse('posts:post_detail', kwargs={'post_id': post_id}))
+    return JsonResponse({'liked': liked, 'like_count': like_count})
 
 
 @login_required
 def post_edit(request, post_id):
     """Редактирования поста"""
-    post = get_object_or_404(Post, id=post_id)
+    post = get_object_or_404(
+        Post.objects.select_related('author'), id=post_id)
     if post.author != request.user:
         return redirect('posts:post_detail', post_id=post_id)
 
@@ -127,7 +314,11 @@ def post_edit(request, post_id):
         instance=post
     )
     if form.is_valid():
-        form.save()
+        if 'image' in form.changed_data:
+            form.instance.thumbnails = {}
+        post = form.save()
+        if 'image' in form.changed_data and post.image:
+            queue_thumbnails(post)
         return redirect('posts:post_detail', post_id=post_id)
     context = {
         'post': post,
@@ -151,11 +342,11 @@ def add_comment(request, post_id):
 
 
 @login_required
+@read_from_replica
+@conditional_page(follow_state)
 def follow_index(request):
     """Выводит посты авторов на которых подписан пользователь"""
-    posts = Post.objects.filter(author__following__user=request.user)
-    page_obj = pagination(request, posts, settings.POSTS_ON_PAGE)
-    context = {'page_obj': page_obj, }
+    context = {'page_obj': follow_page(request), }
     return render(request, 'posts/follow.html', context)
 
 
@@ -164,9 +355,10 @@ def profile_follow(request, username):
     """Подписаться на автора"""
     author = get_object_or_404(User, username=username)
     if author != request.user:
-        Follow.objects.get_or_create(
-            user=request.user,
-            author=author)
+        with transaction.atomic():
+            Follow.objects.get_or_create(
+                user=request.user,
+                author=author)
     return redirect('posts:profile', username=username)
 
 
@@ -174,5 +366,6 @@ def profile_follow(request, username):
 def profile_unfollow(request, username):
     """Отписаться от автора"""
     author = get_object_or_404(User, username=username)
-    Follow.objects.get(user=request.user, author=author).delete()
+    with transaction.atomic():
+        Follow.objects.get(user=request.user, author=author).delete()
     return redirect('posts:profile', username=username)
@@ -45,20 +45,24 @@ INSTALLED_APPS = [
     'posts.apps.PostsConfig',
     'users.apps.UsersConfig',
     'core.apps.CoreConfig',
+    'jobs.apps.JobsConfig',
     'sorl.thumbnail',
 ]
 
 MIDDLEWARE = [
+    'core.middleware.QueryBudgetMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'core.middleware.PrimaryStickinessMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
-ROOT_URLCONF = 'yatube.urls'
+# asgi.py подставляет yatube.urls_async с async-версиями лент
+ROOT_URLCONF = os.environ.get('ROOT_URLCONF', 'yatube.urls')
 
 TEMPLATES = [
     {
@@ -82,11 +86,86 @@ WSGI_APPLICATION = 'yatube.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/2.2/ref/settings/#databases
 
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+# База выбирается переменными окружения: DB_ENGINE=postgresql включает
+# PostgreSQL, без нее используется SQLite из DB_NAME или db.sqlite3
+DB_ENGINE = os.environ.get('DB_ENGINE', 'sqlite3')
+
+if DB_ENGINE == 'postgresql':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': os.environ.get('DB_NAME', 'yatube'),
+            'USER': os.environ.get('DB_USER', 'yatube'),
+            'PASSWORD': os.environ.get('DB_PASSWORD', ''),
+            'HOST': os.environ.get('DB_HOST', 'localhost'),
+            'PORT': os.environ.get('DB_PORT', '5432'),
+            # постоянные соединения живут CONN_MAX_AGE секунд
+            'CONN_MAX_AGE': int(os.environ.get('DB_CONN_MAX_AGE', 60)),
+            # проверка соединения перед повторным использованием,
+            # учитывается начиная с Django 4.1
+            'CONN_HEALTH_CHECKS': os.environ.get(
+                'DB_CONN_HEALTH_CHECKS', '1') == '1',
+            'OPTIONS': {
+                'connect_timeout': int(
+                    os.environ.get('DB_CONNECT_TIMEOUT', 5)),
+            },
+        }
     }
+    # DB_POOL=pgbouncer: соединения держит пулер в режиме транзакций,
+    # поэтому свои постоянные соединения и серверные курсоры выключены
+    if os.environ.get('DB_POOL') == 'pgbouncer':
+        DATABASES['default'].update(
+            CONN_MAX_AGE=0,
+            DISABLE_SERVER_SIDE_CURSORS=True,
+        )
+    # DB_REPLICA_HOSTS — реплики для чтения через запятую
+    for number, host in enumerate(
+            filter(None, os.environ.get('DB_REPLICA_HOSTS', '').split(',')),
+            1):
+        DATABASES[f'replica_{number}'] = {
+            **DATABASES['default'],
+            'HOST': host.strip(),
+        }
+else:
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.environ.get(
+                'DB_NAME', os.path.join(BASE_DIR, 'db.sqlite3')),
+            # без этого каждое новое соединение заново выставляет PRAGMA
+            'CONN_MAX_AGE': int(os.environ.get('DB_CONN_MAX_AGE', 60)),
+            'OPTIONS': {
+                'timeout': int(os.environ.get('DB_BUSY_TIMEOUT', 5000)) / 1000,
+            },
+        }
+    }
+    # DB_REPLICA_NAMES — файлы SQLite, которые служат репликами; их
+    # копирует сама инсталляция, тесты создают для них отдельные базы
+    for number, name in enumerate(
+            filter(None, os.environ.get('DB_REPLICA_NAMES', '').split(',')),
+            1):
+        DATABASES[f'replica_{number}'] = {
+            **DATABASES['default'],
+            'NAME': name.strip(),
+            'TEST': {'NAME': f'{name.strip()}.test'},
+        }
+    if len(DATABASES) > 1:
+        DATABASES['default']['TEST'] = {
+            'NAME': f'{DATABASES["default"]["NAME"]}.test'}
+
+DATABASE_ROUTERS = ['core.routers.ReplicaRouter']
+# реплики, на которые уходят чтения view с @read_from_replica
+DATABASE_REPLICAS = [alias for alias in DATABASES if alias != 'default']
+# сколько секунд после записи чтения пользователя идут в основную базу
+REPLICA_STICKY_SECONDS = int(os.environ.get('DB_REPLICA_STICKY_SECONDS', 10))
+REPLICA_STICKY_COOKIE = 'use_primary'
+
+# PRAGMA, которые выставляются каждому новому соединению SQLite
+SQLITE_PRAGMAS = {
+    'journal_mode': 'wal',
+    'synchronous': 'normal',
+    'busy_timeout': int(os.environ.get('DB_BUSY_TIMEOUT', 5000)),
+    'mmap_size': int(os.environ.get('DB_MMAP_SIZE', 256 * 1024 * 1024)),
 }
 
 
@@ -141,8 +220,107 @@ EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
 # указываем директорию, в которую будут складываться файлы писем
 EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
 
+# в кэше маркеры свежести лент, эпоха популярного и нравлики
+# пользователей. По умолчанию это LocMem Django: быстрый, но свой у
+# каждого процесса, что годится для одного процесса сайта. Если
+# процессов несколько или запущен runworkers, нужен общий кэш: REDIS_URL
+if os.environ.get('REDIS_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.environ['REDIS_URL'],
+        }
+    }
+TEST_RUNNER = 'core.testing.TestRunner'
+
 POSTS_ON_PAGE = 10
+COMMENTS_ON_PAGE = 20
+# сколько секунд хранится приблизительное число записей ленты
+PAGINATOR_COUNT_TIMEOUT = 60
+# async-view ходят в базу из пула ASYNC_DB_THREADS потоков, каждый со
+# своим соединением; без ASYNC_PARALLEL_QUERIES — по очереди в общем
+# потоке Django
+ASYNC_PARALLEL_QUERIES = os.environ.get('ASYNC_PARALLEL_QUERIES', '1') == '1'
+ASYNC_DB_THREADS = int(os.environ.get('ASYNC_DB_THREADS', 16))
+# сколько постов или авторов выгрузка аналитики читает за один запрос
+ANALYTICS_CHUNK = 5000
 SHORT_POST_LENGTH = 15
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 CSRF_FAILURE_VIEW = 'core.views.csrf_failure'
+# фоновые задачи: число процессов manage.py runworkers, пауза опроса
+# пустой очереди, число попыток и базовая задержка повтора в секундах
+JOBS_WORKERS = 2
+JOBS_POLL_INTERVAL = 1
+JOBS_BATCH_SIZE = 10
+JOBS_MAX_ATTEMPTS = 3
+JOBS_RETRY_DELAY = 10
+# через сколько секунд задачу упавшего обработчика можно взять снова
+JOBS_LOCK_TIMEOUT = 300
+# как запускать процессы обработчиков: spawn ведет себя одинаково на
+# всех платформах и не наследует соединения с базой
+JOBS_START_METHOD = os.environ.get('JOBS_START_METHOD', 'spawn')
+# периодические задачи: имя задачи -> период в секундах; каждый
+# период добавляет строку в очередь, поэтому выполненные задачи
+# старше JOBS_RETENTION секунд раз в час удаляет jobs.prune
+JOBS_PERIODIC = {
+    'jobs.prune': 60 * 60,
+    'posts.rebuild_trending': 300,
+}
+JOBS_RETENTION = 24 * 60 * 60
+# буфер нравликов: путь к журналу кликов (пусто — клики пишутся в базу
+# сразу), период сброса в секундах, пар за транзакцию и сколько секунд
+# пользователь видит свой еще не записанный нравлик
+LIKE_BUFFER_PATH = os.environ.get('LIKE_BUFFER_PATH', '')
+LIKE_BUFFER_FLUSH_INTERVAL = int(os.environ.get('LIKE_BUFFER_FLUSH', 10))
+LIKE_BUFFER_BATCH = 1000
+LIKE_BUFFER_PENDING_TIMEOUT = 600
+# сколько секунд хранится отсортированный массив нравликов пользователя;
+# правки в обход set_like и сигналов он переживет не дольше этого
+LIKED_IDS_TIMEOUT = 60 * 60
+if LIKE_BUFFER_PATH:
+    JOBS_PERIODIC['posts.flush_likes'] = LIKE_BUFFER_FLUSH_INTERVAL
+# популярное: полупериод затухания и окно кандидатов в секундах, веса
+# событий, размер топа, сколько секунд топ живет в кэше и как часто
+# переносить эпоху отсчета очков
+TRENDING_HALF_LIFE = 6 * 60 * 60
+TRENDING_WINDOW = 7 * 24 * 60 * 60
+TRENDING_LIKE_WEIGHT = 1.0
+TRENDING_COMMENT_WEIGHT = 2.0
+TRENDING_TOP_K = 100
+TRENDING_TOP_TIMEOUT = 60
+TRENDING_REBASE_AFTER = 14 * 24 * 60 * 60
+# миниатюры, которые нарезаются при сохранении картинки поста:
+# название -> (геометрия sorl-thumbnail, параметры)
+POST_THUMBNAILS = {
+    'feed': ('900x500', {'crop': 'center', 'upscale': True}),
+    'detail': ('960x460', {'crop': 'center', 'upscale': True}),
+}
+
+# считать SQL-запросы каждого запроса и отдавать их в Server-Timing
+QUERY_BUDGET_ENABLED = DEBUG
+# бюджет SQL-запросов на один запрос к view, сверх него пишем в лог
+QUERY_BUDGET_DEFAULT = 10
+QUERY_BUDGETS = {
+    'posts:index': 4,
+    'posts:group_list': 6,
+    'posts:profile': 7,
+    'posts:post_detail': 6,
+    'posts:follow_index': 4,
+    'posts:post_create': 13,
+    'posts:post_edit': 8,
+    'posts:add_comment': 6,
+    'posts:post_comments': 4,
+    'posts:post_like': 10,
+    'posts:post_like_toggle': 10,
+    'posts:profile_follow': 12,
+    'posts:profile_unfollow': 10,
+    'posts:search': 4,
+    'posts:popular': 5,
+    'posts:api_index': 4,
+    'posts:api_post_detail': 5,
+    'posts:api_post_comments': 5,
+    'posts:api_group_posts': 6,
+    'posts:api_profile_posts': 6,
+    'posts:api_follow_posts': 4,
+}
@@ -0,0 +1,12 @@
+"""Маршруты для ASGI: те же, что в yatube.urls, но ленты posts — async."""
+from django.urls import include, path
+
+from . import urls
+
+handler404 = urls.handler404
+handler403 = urls.handler403
+urlpatterns = [
+    path('', include('posts.urls_async', namespace='posts'))
+    if getattr(pattern, 'namespace', None) == 'posts' else pattern
+    for pattern in urls.urlpatterns
+]